@@ -0,0 +1,208 @@
+"""
+Per-route admission control.
+
+Every API route runs behind its own ``ConcurrencyLimiter``: at most
+``concurrency`` requests execute at once, up to ``queue_size`` more wait (for
+at most ``ADMISSION_MAX_WAIT`` seconds), and anything beyond that is rejected
+right away with ``503`` and a ``Retry-After`` estimate. Waiting requests hold
+no threadpool slot and no database session, so a pile-up of writes behind the
+single SQLite writer cannot starve reads, which have their own, larger budget.
+
+A streamed response (``?stream=json|ndjson``) does its reads and encoding
+while its body is sent, after the handler has returned, so it keeps its slot
+until the body is done or the client goes away. Server-sent event streams are
+the exception: their body lasts as long as the client stays connected, so
+they give the slot back when the handler returns, like any other response.
+
+Limiters are per worker process. Routers opt in with
+``APIRouter(route_class=AdmissionRoute)``.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request, Response, status
+from fastapi.routing import APIRoute
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+
+WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+# Streamed media types whose body never finishes on its own; they do not keep their slot.
+LONG_LIVED_MEDIA_TYPES = {"text/event-stream"}
+
+# Weight of the newest sample in the moving average of handler time (Retry-After estimate).
+_HOLD_TIME_SMOOTHING = 0.2
+
+
+class ConcurrencyLimiter:
+    """Counting semaphore with a bounded FIFO wait queue. Event-loop only, not thread-safe."""
+
+    def __init__(self, name: str, kind: str, concurrency: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.kind = kind
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.hold_seconds_avg = 0.0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained, at least 1."""
+        backlog = (self.queued + 1) / max(self.concurrency, 1)
+        return max(1, math.ceil(self.hold_seconds_avg * backlog))
+
+    def _reject(self, reason: str) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server busy ({self.name}: {reason}). Retry later.",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    def _record_wait(self, waited: float) -> None:
+        self.admitted += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    async def acquire(self) -> None:
+        """Takes a slot, waiting in line if needed. Raises a 503 HTTPException when shed."""
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            self._record_wait(0.0)
+            return
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise self._reject("queue full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait((waiter,), timeout=self.max_wait)
+        except asyncio.CancelledError:
+            # Client went away while queued; give back a slot handed over meanwhile.
+            if waiter.done():
+                self.release()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        if not waiter.done():
+            self._waiters.remove(waiter)
+            self.rejected_timeout += 1
+            raise self._reject("timed out in queue")
+        # release() handed its slot straight to this waiter; ``active`` is unchanged.
+        self._record_wait(time.perf_counter() - started)
+
+    def release(self, hold_seconds: Optional[float] = None) -> None:
+        if hold_seconds is not None:
+            self.hold_seconds_avg += _HOLD_TIME_SMOOTHING * (hold_seconds - self.hold_seconds_avg)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "route": self.name,
+            "kind": self.kind,
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "wait_seconds_avg": self.wait_seconds_total / self.admitted if self.admitted else 0.0,
+            "wait_seconds_max": self.wait_seconds_max,
+            "hold_seconds_avg": self.hold_seconds_avg,
+        }
+
+
+_limiters: Dict[str, ConcurrencyLimiter] = {}
+
+
+def _budget(name: str, kind: str) -> Tuple[int, int]:
+    if name in settings.ADMISSION_ROUTE_LIMITS:
+        return settings.ADMISSION_ROUTE_LIMITS[name]
+    if kind == "write":
+        return settings.ADMISSION_WRITE_CONCURRENCY, settings.ADMISSION_WRITE_QUEUE
+    return settings.ADMISSION_READ_CONCURRENCY, settings.ADMISSION_READ_QUEUE
+
+
+def get_limiter(name: str, kind: str) -> ConcurrencyLimiter:
+    """
+    One limiter per route name (``"POST /orders/"``), shared by every route
+    object registered under it (``include_router`` copies routes).
+    """
+    limiter = _limiters.get(name)
+    if limiter is None:
+        concurrency, queue_size = _budget(name, kind)
+        limiter = _limiters[name] = ConcurrencyLimiter(
+            name, kind, concurrency, queue_size, settings.ADMISSION_MAX_WAIT)
+    return limiter
+
+
+def all_limiters() -> List[ConcurrencyLimiter]:
+    return sorted(_limiters.values(), key=lambda limiter: limiter.name)
+
+
+class _ReleasingAfterBody:
+    """ASGI wrapper around a streamed response that runs ``release`` once the body is sent or abandoned."""
+
+    def __init__(self, response: StreamingResponse, release: Callable[[], None]):
+        self.response = response
+        self.release = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.release()
+
+
+class AdmissionRoute(APIRoute):
+    """APIRoute whose handler runs only once its route's limiter admits the request."""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not settings.ADMISSION_CONTROL:
+            return handler
+
+        kind = "write" if self.methods & WRITE_METHODS else "read"
+        limiter = get_limiter(f"{'|'.join(sorted(self.methods))} {self.path}", kind)
+
+        async def admitted_handler(request: Request) -> Union[Response, _ReleasingAfterBody]:
+            await limiter.acquire()
+            started = time.perf_counter()
+
+            def release() -> None:
+                limiter.release(time.perf_counter() - started)
+
+            try:
+                response = await handler(request)
+            except BaseException:
+                release()
+                raise
+            if isinstance(response, StreamingResponse) and response.media_type not in LONG_LIVED_MEDIA_TYPES:
+                return _ReleasingAfterBody(response, release)
+            release()
+            return response
+
+        return admitted_handler
@@ -0,0 +1,108 @@
+"""
+Streaming record readers for bulk endpoints and CLI scripts.
+
+Both readers take an iterable of text lines (a file object, or the request
+body split into lines) and yield ``(line_number, record)`` pairs one at a
+time, so arbitrarily large uploads are never held in memory. A record that
+cannot be decoded is yielded as ``(line_number, ValueError)`` so callers can
+reject it and keep going. The lines may include ``ValueError`` instances in
+place of lines that are not valid UTF-8 (see ``iter_body_lines``); each is
+reported the same way.
+"""
+import csv
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+import anyio.from_thread
+
+Record = Union[Dict[str, Any], ValueError]
+Line = Union[str, ValueError]
+
+
+def iter_csv_records(lines: Iterable[Line]) -> Iterator[Tuple[int, Record]]:
+    """Header row required. Empty cells are returned as ``None``."""
+    line_number = 0
+    undecodable: List[Tuple[int, ValueError]] = []
+
+    def decoded_lines() -> Iterator[str]:
+        nonlocal line_number
+        for line in lines:
+            line_number += 1
+            if isinstance(line, ValueError):
+                undecodable.append((line_number, line))
+                continue
+            yield line
+
+    reader = csv.DictReader(decoded_lines())
+    for row in reader:
+        # Lines the reader skipped come before the row that follows them.
+        yield from undecodable
+        undecodable.clear()
+        if None in row:
+            yield line_number, ValueError("Row has more cells than the header.")
+            continue
+        yield line_number, {key: (value if value != "" else None) for key, value in row.items()}
+    yield from undecodable
+
+
+def iter_ndjson_records(lines: Iterable[Line]) -> Iterator[Tuple[int, Record]]:
+    """One JSON object per line; blank lines are skipped."""
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, ValueError):
+            yield line_number, line
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(record, dict):
+            yield line_number, ValueError("Each line must be a JSON object.")
+            continue
+        yield line_number, record
+
+
+def iter_records(lines: Iterable[Line], fmt: str) -> Iterator[Tuple[int, Record]]:
+    if fmt == "csv":
+        return iter_csv_records(lines)
+    if fmt == "ndjson":
+        return iter_ndjson_records(lines)
+    raise ValueError(f"Unsupported format '{fmt}'. Use 'csv' or 'ndjson'.")
+
+
+def _decode_line(raw_line: bytes) -> Line:
+    try:
+        return raw_line.decode("utf-8")
+    except UnicodeDecodeError as e:
+        return ValueError(f"Line is not valid UTF-8 ({e.reason} at byte {e.start + 1}).")
+
+
+def iter_body_lines(stream) -> Iterator[Line]:
+    """
+    Turns a Starlette ``request.stream()`` into text lines for code running in a
+    worker thread (``run_in_threadpool``): each chunk is awaited on the event loop.
+    A line that is not valid UTF-8 comes out as a ``ValueError``.
+    """
+    buffer = b""
+    first = True
+    while True:
+        try:
+            chunk = anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            break
+        buffer += chunk
+        *complete, buffer = buffer.split(b"\n")
+        for raw_line in complete:
+            line = _decode_line(raw_line)
+            if isinstance(line, ValueError):
+                first = False
+                yield line
+                continue
+            if first:
+                line, first = line.lstrip("\ufeff"), False
+            yield line + "\n"
+    if buffer:
+        line = _decode_line(buffer)
+        yield line.lstrip("\ufeff") if first and isinstance(line, str) else line
@@ -1,10 +1,122 @@
 from pydantic_settings import BaseSettings
+from typing import Dict, Optional, Tuple
 
 SQLITE_DB_FILE = "./test_database.db"
 
 class Settings(BaseSettings):
     DATABASE_URL: str = f"sqlite+pysqlite:///{SQLITE_DB_FILE}"
 
+    # Connection pool, opened and validated at startup (DB_POOL_WARM_CONNECTIONS).
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_WARM_CONNECTIONS: int = 5
+
+    # Applied to every new SQLite connection. WAL lets readers run while a write is in progress.
+    SQLITE_PRAGMAS: Dict[str, str] = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "5000",
+    }
+
+    # Print the import / warmup time breakdown when the app starts.
+    STARTUP_REPORT: bool = True
+
     LOW_STOCK_THRESHOLD: int = 10 
 
+    # Seconds between checks of the change_versions table for writes made by other workers.
+    CACHE_INVALIDATION_POLL_INTERVAL: float = 1.0
+
+    # GET /inventory/stream: seconds between reads of new inventory logs,
+    # keep-alive comment interval, and per-client backlog before it is dropped.
+    STOCK_STREAM_POLL_INTERVAL: float = 2.0
+    STOCK_STREAM_HEARTBEAT_INTERVAL: float = 15.0
+    STOCK_STREAM_QUEUE_SIZE: int = 100
+
+    # Records per transaction for POST /products/import and import_products.py.
+    PRODUCT_IMPORT_CHUNK_SIZE: int = 1000
+
+    # include_total on list endpoints: seconds a filtered COUNT(*) is reused when
+    # the filter combination has no maintained counter (see crud_counters).
+    COUNT_CACHE_TTL: float = 30.0
+
+    # row_counters rows per counter: each write adds to one picked at random, so
+    # concurrent writers (orders in particular) rarely update the same row.
+    ROW_COUNTER_SLOTS: int = 16
+
+    # Streamed list responses (?stream=json|ndjson): rows per database batch, and
+    # the body size from which the response is compressed (gzip, or zstd if installed).
+    STREAM_BATCH_SIZE: int = 500
+    STREAM_COMPRESSION_MIN_SIZE: int = 1024
+
+    # Admission control (app/core/admission.py), per route and per worker: requests
+    # beyond CONCURRENCY wait in a queue of QUEUE for up to ADMISSION_MAX_WAIT
+    # seconds, the rest get 503 + Retry-After. Writes get a small budget because
+    # SQLite has a single writer. ADMISSION_ROUTE_LIMITS overrides single routes,
+    # e.g. {"POST /orders/": (2, 8)}.
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_READ_CONCURRENCY: int = 32
+    ADMISSION_READ_QUEUE: int = 64
+    ADMISSION_WRITE_CONCURRENCY: int = 4
+    ADMISSION_WRITE_QUEUE: int = 16
+    ADMISSION_MAX_WAIT: float = 2.0
+    ADMISSION_ROUTE_LIMITS: Dict[str, Tuple[int, int]] = {}
+
+    # Seconds a PENDING order holds its stock reservation, and seconds between
+    # background sweeps that delete expired reservations.
+    RESERVATION_TTL: float = 900.0
+    RESERVATION_SWEEP_INTERVAL: float = 60.0
+
+    # Seconds between background rebalances of sharded stock, which also refresh
+    # the products.quantity copy of sharded products (see crud_stock_shards).
+    STOCK_SHARD_REBALANCE_INTERVAL: float = 5.0
+
+    # GET /inventory/forecast defaults: supplier lead time and the stock, in days
+    # of sales, that a suggested reorder should leave on hand after it.
+    FORECAST_LEAD_TIME_DAYS: float = 7.0
+    FORECAST_TARGET_COVER_DAYS: float = 30.0
+
+    # GET /dashboard/summary snapshot (app/core/dashboard.py): seconds between
+    # background refreshes of a snapshot marked dirty by writes, and the age at
+    # which it is refreshed even without writes.
+    DASHBOARD_REFRESH_INTERVAL: float = 5.0
+    DASHBOARD_MAX_AGE: float = 300.0
+
+    # GET /products/{id}/sales: default (and per-request maximum) number of points
+    # returned, and seconds a worker reuses cached closed buckets at most.
+    SALES_SERIES_MAX_POINTS: int = 500
+    SALES_SERIES_CACHE_TTL: float = 3600.0
+
+    # Products stocked per warehouse (app/crud/crud_warehouse_stock.py): how an
+    # order's quantity is split across warehouses ("priority" or
+    # "fewest_warehouses", or a name registered with register_allocation_strategy),
+    # and seconds between background refreshes of their products.quantity copy.
+    WAREHOUSE_ALLOCATION_STRATEGY: str = "priority"
+    WAREHOUSE_TOTALS_REFRESH_INTERVAL: float = 5.0
+
+    # Post-commit background tasks (app/core/tasks.py), per worker: threads and
+    # queue bound, retries of a failing task with TASK_RETRY_DELAY seconds doubling
+    # between attempts, and TASKS_SYNCHRONOUS to run them inline after the commit.
+    TASK_WORKERS: int = 2
+    TASK_QUEUE_SIZE: int = 10000
+    TASK_MAX_RETRIES: int = 3
+    TASK_RETRY_DELAY: float = 0.1
+    TASKS_SYNCHRONOUS: bool = False
+
+    # Order archival (archive_orders.py, app/crud/crud_archive.py): COMPLETED and
+    # CANCELLED orders older than ORDER_ARCHIVE_AFTER_DAYS move, with their items,
+    # into gzip-compressed JSON-lines files under ORDER_ARCHIVE_DIR, one file per
+    # order day and run, ORDER_ARCHIVE_BATCH_SIZE orders per transaction.
+    ORDER_ARCHIVE_DIR: str = "archive"
+    ORDER_ARCHIVE_AFTER_DAYS: int = 365
+    ORDER_ARCHIVE_BATCH_SIZE: int = 5000
+
+    # Opt-in request profiling (app/core/profiling.py). A request is profiled when
+    # it sends ``X-Profile: <PROFILE_TOKEN>``, or with probability
+    # PROFILE_SAMPLE_RATE. With neither set the middleware is not installed.
+    # Profiles go to PROFILE_DIR; stacks are sampled every PROFILE_SAMPLE_INTERVAL seconds.
+    PROFILE_TOKEN: Optional[str] = None
+    PROFILE_SAMPLE_RATE: float = 0.0
+    PROFILE_DIR: str = "profiles"
+    PROFILE_SAMPLE_INTERVAL: float = 0.001
+
 settings = Settings()
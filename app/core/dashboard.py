@@ -0,0 +1,102 @@
+"""
+Precomputed admin dashboard.
+
+``GET /dashboard/summary`` never runs the aggregation itself: it returns the
+snapshot held by this worker. Every write that publishes the "orders" or
+"products" invalidation topic (orders created or changing status, restocks,
+product edits), by this worker or any other, marks the snapshot dirty.
+A background task refreshes a dirty snapshot every
+``DASHBOARD_REFRESH_INTERVAL`` seconds, and any snapshot older than
+``DASHBOARD_MAX_AGE``. A request that finds the snapshot dirty gets it as-is
+(``stale: true``) and starts the refresh in the background
+(stale-while-revalidate). Only the very first request of a worker whose
+startup refresh failed waits for a computation.
+"""
+import asyncio
+import threading
+import time
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app import crud, schemas
+from app.core.config import settings
+from app.core.periodic import PeriodicTask
+from app.db.invalidation import bus
+from app.db.session import SessionLocal
+
+
+class DashboardSnapshot:
+    def __init__(self, refresh_interval: float, max_age: float):
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.summary: Optional[schemas.DashboardSummary] = None
+        self.dirty = True
+        self._computed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._revalidation: Optional[asyncio.Future] = None
+        for topic in ("orders", "products"):
+            bus.subscribe(topic, self.mark_dirty)
+
+    def mark_dirty(self) -> None:
+        self.dirty = True
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self._computed_at
+
+    def refresh(self) -> schemas.DashboardSummary:
+        """
+        Recomputes the snapshot (blocking). Concurrent callers wait for the
+        refresh in progress and share its result.
+        """
+        with self._refresh_lock:
+            if self.summary is not None and not self.dirty and self.age < self.max_age:
+                return self.summary  # refreshed by the caller we waited for
+            # Cleared first: a write committed while computing marks it dirty again.
+            self.dirty = False
+            try:
+                with SessionLocal() as db:
+                    summary = schemas.DashboardSummary(**crud.crud_dashboard.get_dashboard_summary(db))
+            except Exception:
+                self.dirty = True
+                raise
+            self.summary, self._computed_at = summary, time.monotonic()
+            return summary
+
+    def refresh_if_stale(self) -> None:
+        """Background job: picks up other workers' writes, then refreshes if needed."""
+        with SessionLocal() as db:
+            bus.poll(db)
+        if self.summary is None or self.dirty or self.age >= self.max_age:
+            self.refresh()
+
+    def revalidate(self) -> None:
+        """Starts a background refresh unless one is running or the last one is too recent."""
+        if self._revalidation is not None and not self._revalidation.done():
+            return
+        if self.age < self.refresh_interval:
+            return
+        self._revalidation = asyncio.ensure_future(run_in_threadpool(self.refresh))
+        self._revalidation.add_done_callback(self._report_revalidation)
+
+    @staticmethod
+    def _report_revalidation(future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            print(f"Error refreshing the dashboard snapshot: {future.exception()}")
+
+    async def get(self) -> schemas.DashboardSummary:
+        summary = self.summary
+        if summary is None:
+            return await run_in_threadpool(self.refresh)
+        if self.dirty or self.age >= self.max_age:
+            self.revalidate()
+            return summary.model_copy(update={"stale": True})
+        return summary
+
+
+dashboard_snapshot = DashboardSnapshot(
+    refresh_interval=settings.DASHBOARD_REFRESH_INTERVAL, max_age=settings.DASHBOARD_MAX_AGE)
+
+dashboard_refresher = PeriodicTask(
+    "dashboard refresh", settings.DASHBOARD_REFRESH_INTERVAL, dashboard_snapshot.refresh_if_stale)
@@ -0,0 +1,24 @@
+"""
+Total-count headers for paginated list endpoints.
+
+Totals are opt-in (``include_total=true``) so plain page reads never pay for a
+count. ``X-Total-Count`` carries the total. ``X-Total-Count-Exact`` is ``true``
+when it was read from a maintained counter in the request's own transaction,
+and ``false`` when it came from a cached COUNT, which can miss writes made
+since; ``X-Total-Count-Age`` then says how many seconds ago it was taken.
+"""
+from typing import Optional
+
+from fastapi import Response
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+TOTAL_COUNT_EXACT_HEADER = "X-Total-Count-Exact"
+TOTAL_COUNT_AGE_HEADER = "X-Total-Count-Age"
+
+
+def set_total_count(response: Response, total: int, age: Optional[float] = None) -> None:
+    """``age`` is the age in seconds of a cached count, None for a counter read."""
+    response.headers[TOTAL_COUNT_HEADER] = str(total)
+    response.headers[TOTAL_COUNT_EXACT_HEADER] = "true" if age is None else "false"
+    if age is not None:
+        response.headers[TOTAL_COUNT_AGE_HEADER] = str(int(age))
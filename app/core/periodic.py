@@ -0,0 +1,39 @@
+"""
+Per-worker background loops, started and stopped by the app's lifespan.
+
+Each ``PeriodicTask`` runs its (blocking, database-bound) job in the
+threadpool, then sleeps ``interval`` seconds. A failing run is logged and the
+loop carries on with the next one.
+"""
+import asyncio
+import contextlib
+from typing import Callable, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+
+class PeriodicTask:
+    def __init__(self, name: str, interval: float, job: Callable[[], None]):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await run_in_threadpool(self.job)
+            except Exception as e:
+                print(f"Error in {self.name}: {e}")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,259 @@
+"""
+Opt-in per-request profiling.
+
+When ``PROFILE_TOKEN`` is set, a request carrying ``X-Profile: <token>`` is
+profiled; with ``PROFILE_SAMPLE_RATE`` > 0, that fraction of all requests is
+profiled too. Neither set (the default) means the middleware is not even
+installed, so normal requests pay nothing.
+
+A profiled request runs under a sampling profiler: a helper thread records
+the Python stack of the worker every ``PROFILE_SAMPLE_INTERVAL`` seconds.
+Samples are kept for the event-loop thread (async code, routing, response
+sending) and for the threadpool threads that are running this request's sync
+dependencies, endpoint or serialization, recognized by the request context
+they run in. Event-loop samples can include other requests in flight on the
+same worker. SQL statements executed for the request are timed as well.
+
+Each profile is written to ``PROFILE_DIR`` as three files sharing one name:
+``.pstats`` (``python -m pstats``, snakeviz), ``.collapsed`` (one
+``frame;frame;... count`` line per stack, for flamegraph.pl or speedscope) and
+``.json`` (route, status, timings and the SQL statements).
+"""
+import contextvars
+import datetime
+import json
+import marshal
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = b"x-profile"
+
+Frame = Tuple[str, int, str]  # (filename, first line, function): pstats' function key
+
+_current_profile: contextvars.ContextVar[Optional["RequestProfile"]] = contextvars.ContextVar(
+    "current_profile", default=None)
+
+
+class RequestProfile:
+    def __init__(self, interval: float):
+        self.id = uuid.uuid4().hex[:12]
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sql: List[Dict[str, object]] = []
+        self.started_at = datetime.datetime.now(datetime.timezone.utc)
+        self._started = time.perf_counter()
+        self.duration = 0.0
+        self._loop_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self) -> None:
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        self._stop.set()
+        self._sampler.join()
+
+    def _belongs_here(self, thread_id: int, frame) -> bool:
+        if thread_id == self._loop_thread:
+            # Idle event loop: waiting in the selector.
+            return not frame.f_code.co_filename.endswith("selectors.py")
+        # A threadpool worker runs each job as ``context.run(func)``; keep the
+        # thread only while that context is this request's.
+        while frame is not None:
+            if frame.f_code.co_name == "run" and "context" in frame.f_code.co_varnames:
+                context = frame.f_locals.get("context")
+                if isinstance(context, contextvars.Context):
+                    return context.get(_current_profile) is self
+            frame = frame.f_back
+        return False
+
+    def _sample(self) -> None:
+        names = {}
+        while not self._stop.wait(self.interval):
+            own = threading.get_ident()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or not self._belongs_here(thread_id, frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names[thread_id] = next(
+                        (thread.name for thread in threading.enumerate() if thread.ident == thread_id), str(thread_id))
+                self.samples[(names[thread_id], tuple(reversed(stack)))] += 1
+
+    def create_stats(self) -> None:
+        """
+        The ``pstats.Stats`` input format: per function, samples as call
+        counts, self and cumulative seconds (sample count times the interval),
+        and callers.
+        """
+        stats: Dict[Frame, list] = {}
+        for (_, stack), count in self.samples.items():
+            seconds = count * self.interval
+            for depth, function in enumerate(stack):
+                entry = stats.setdefault(function, [0, 0, 0.0, 0.0, {}])
+                if function not in stack[:depth]:  # recursion: count cumulative time once
+                    entry[0] += count
+                    entry[1] += count
+                    entry[3] += seconds
+                if depth == len(stack) - 1:
+                    entry[2] += seconds
+                if depth:
+                    caller = entry[4].get(stack[depth - 1], (0, 0, 0.0, 0.0))
+                    entry[4][stack[depth - 1]] = (caller[0] + count, caller[1] + count, caller[2], caller[3] + seconds)
+        self.stats = {function: tuple(entry) for function, entry in stats.items()}
+
+    def collapsed(self) -> str:
+        def label(function: Frame) -> str:
+            filename, line, name = function
+            return f"{name} ({os.path.basename(filename)}:{line})"
+        lines = [
+            ";".join([thread_name] + [label(function) for function in stack]) + f" {count}"
+            for (thread_name, stack), count in self.samples.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def save(self, directory: str, scope: Scope, status_code: int, trigger: str) -> str:
+        """Writes the profile files; returns their common path without extension."""
+        route = scope.get("route")
+        route_path = getattr(route, "path", None) or scope.get("path", "")
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route_path).strip("-") or "root"
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(
+            directory, f"{self.started_at:%Y%m%dT%H%M%S}-{scope.get('method', 'GET')}-{slug}-{self.id}")
+
+        self.create_stats()
+        if self.stats:  # pstats cannot load an empty profile (request shorter than one interval)
+            with open(base + ".pstats", "wb") as stats:
+                marshal.dump(self.stats, stats)  # the format pstats.Stats.dump_stats writes
+        with open(base + ".collapsed", "w", encoding="utf-8") as collapsed:
+            collapsed.write(self.collapsed())
+        with open(base + ".json", "w", encoding="utf-8") as meta:
+            json.dump({
+                "id": self.id,
+                "started_at": self.started_at.isoformat(),
+                "trigger": trigger,
+                "method": scope.get("method"),
+                "path": scope.get("path"),
+                "query_string": scope.get("query_string", b"").decode("latin-1"),
+                "route": route_path,
+                "endpoint": getattr(getattr(route, "endpoint", None), "__qualname__", None),
+                "status_code": status_code,
+                "duration_ms": round(self.duration * 1000, 3),
+                "sample_interval_ms": self.interval * 1000,
+                "samples": sum(self.samples.values()),
+                "sql_statements": len(self.sql),
+                "sql_ms": round(sum(query["duration_ms"] for query in self.sql), 3),
+                "sql": self.sql,
+            }, meta, indent=2)
+        return base
+
+
+# SQL timing listeners are attached only while at least one profile is running.
+_listeners_lock = threading.Lock()
+_active_profiles = 0
+_QUERY_STARTS_KEY = "profiling_query_starts"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault(_QUERY_STARTS_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    starts = conn.info.get(_QUERY_STARTS_KEY)
+    if profile is None or not starts:
+        return
+    profile.sql.append({
+        "statement": statement,
+        "executemany": executemany,
+        "duration_ms": round((time.perf_counter() - starts.pop()) * 1000, 3),
+    })
+
+
+def _attach_sql_timing() -> None:
+    global _active_profiles
+    with _listeners_lock:
+        _active_profiles += 1
+        if _active_profiles == 1:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _detach_sql_timing() -> None:
+    global _active_profiles
+    with _listeners_lock:
+        _active_profiles -= 1
+        if _active_profiles == 0:
+            event.remove(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.remove(Engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles requests selected by header token or sampling rate."""
+
+    def __init__(self, app: ASGIApp, token: Optional[str], sample_rate: float, directory: str, interval: float):
+        self.app = app
+        self.token = token.encode() if token else None
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self.interval = interval
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER and value == self.token:
+                    return "header"
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(self.interval)
+        status_code = 500
+
+        async def send_with_profile_id(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        token = _current_profile.set(profile)
+        _attach_sql_timing()
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.stop()
+            _detach_sql_timing()
+            _current_profile.reset(token)
+            try:
+                path = await run_in_threadpool(profile.save, self.directory, scope, status_code, trigger)
+                print(f"Profile of {scope.get('method')} {scope.get('path')} written to {path}.*")
+            except Exception as e:
+                print(f"Error writing profile {profile.id}: {e}")
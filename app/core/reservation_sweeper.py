@@ -0,0 +1,24 @@
+"""
+Background cleanup of expired stock reservations.
+
+Expired reservations already stop counting against available stock the moment
+they expire; the sweeper only deletes them so the table, and the per-product
+sums over it, stay small. Each worker runs one sweeper task every
+``RESERVATION_SWEEP_INTERVAL`` seconds; concurrent sweeps are harmless.
+"""
+from app import crud
+from app.core.config import settings
+from app.core.periodic import PeriodicTask
+from app.db.session import SessionLocal
+
+
+def sweep_once() -> int:
+    with SessionLocal() as db:
+        swept = crud.crud_reservation.sweep_expired_reservations(db)
+    if swept:
+        print(f"Released {swept} expired stock reservation(s).")
+    return swept
+
+
+reservation_sweeper = PeriodicTask(
+    "stock reservation sweep", settings.RESERVATION_SWEEP_INTERVAL, sweep_once)
@@ -0,0 +1,163 @@
+"""
+Per-worker feed of inventory log rows for the ``GET /inventory/stream`` SSE endpoint.
+
+One background task per worker reads new ``inventory_logs`` rows (``id > last
+seen``, a primary-key range read) and fans them out to every connected
+stream, so the database sees one cheap query per interval however many
+screens are open. The task sleeps ``STOCK_STREAM_POLL_INTERVAL`` seconds
+between reads and is woken early whenever the ``products`` invalidation topic
+fires, i.e. right after a local stock write commits.
+"""
+import asyncio
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from app import crud, schemas
+from app.core.config import settings
+from app.db.invalidation import bus
+from app.db.session import SessionLocal
+
+FETCH_BATCH_SIZE = 500
+
+LogEntry = Tuple[Dict[str, Any], Optional[int]]
+
+
+def fetch_log_entries(
+    after_id: int,
+    product_ids: Optional[List[int]] = None,
+    category_ids: Optional[List[int]] = None,
+    limit: int = FETCH_BATCH_SIZE,
+) -> List[LogEntry]:
+    """Reads logs after ``after_id`` as (serialized log, category id) pairs."""
+    with SessionLocal() as db:
+        rows = crud.crud_inventory.get_inventory_logs_after(
+            db, after_id=after_id, product_ids=product_ids, category_ids=category_ids, limit=limit)
+        return [
+            (schemas.InventoryLog.model_validate(log).model_dump(mode="json"), category_id)
+            for log, category_id in rows
+        ]
+
+
+def latest_log_id() -> int:
+    with SessionLocal() as db:
+        return crud.crud_inventory.get_latest_inventory_log_id(db)
+
+
+def build_events(log: Dict[str, Any], category_id: Optional[int]) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Turns one log row into SSE events: always a ``stock_change``, plus
+    ``low_stock`` / ``low_stock_cleared`` when the change crosses the threshold.
+    """
+    threshold = settings.LOW_STOCK_THRESHOLD
+    payload = dict(log, category_id=category_id)
+    events = [("stock_change", payload)]
+
+    new_quantity = log["new_quantity"]
+    previous_quantity = new_quantity - log["change_amount"]
+    crossing = None
+    if previous_quantity >= threshold > new_quantity:
+        crossing = "low_stock"
+    elif new_quantity >= threshold > previous_quantity:
+        crossing = "low_stock_cleared"
+    if crossing:
+        events.append((crossing, {
+            "product_id": log["product_id"],
+            "category_id": category_id,
+            "quantity": new_quantity,
+            "threshold": threshold,
+            "log_id": log["id"],
+        }))
+    return events
+
+
+class Subscription:
+    def __init__(self, product_ids: Optional[List[int]], category_ids: Optional[List[int]]):
+        self.product_ids: Optional[Set[int]] = set(product_ids) if product_ids else None
+        self.category_ids: Optional[Set[int]] = set(category_ids) if category_ids else None
+        self.queue: "asyncio.Queue[Optional[List[LogEntry]]]" = asyncio.Queue(
+            maxsize=settings.STOCK_STREAM_QUEUE_SIZE)
+
+    def matches(self, log: Dict[str, Any], category_id: Optional[int]) -> bool:
+        if self.product_ids is not None and log["product_id"] not in self.product_ids:
+            return False
+        if self.category_ids is not None and category_id not in self.category_ids:
+            return False
+        return True
+
+
+class StockFeed:
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_id = 0
+
+    async def subscribe(
+        self,
+        product_ids: Optional[List[int]] = None,
+        category_ids: Optional[List[int]] = None,
+    ) -> Subscription:
+        subscription = Subscription(product_ids, category_ids)
+        self._subscriptions.add(subscription)
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscriptions.discard(subscription)
+
+    def wake(self) -> None:
+        """Thread-safe: called from invalidation callbacks in request threads."""
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self) -> None:
+        # Subscribers catch up on history themselves; the live feed starts at "now".
+        self._last_id = await run_in_threadpool(latest_log_id)
+        while self._subscriptions:
+            entries = await run_in_threadpool(fetch_log_entries, self._last_id)
+            if entries:
+                self._last_id = entries[-1][0]["id"]
+                self._broadcast(entries)
+            if len(entries) == FETCH_BATCH_SIZE:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        self._task = None
+
+    def _broadcast(self, entries: List[LogEntry]) -> None:
+        for subscription in list(self._subscriptions):
+            try:
+                subscription.queue.put_nowait(entries)
+            except asyncio.QueueFull:
+                # Too slow to keep up: end its stream, the client resumes via Last-Event-ID.
+                self._subscriptions.discard(subscription)
+                subscription.queue.get_nowait()
+                subscription.queue.put_nowait(None)
+
+
+def format_event(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    body = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {event}\ndata: {body}\n\n"
+
+
+def iter_events(entries: Iterable[LogEntry], subscription: Subscription, after_id: int):
+    """Yields formatted SSE messages for matching entries newer than ``after_id``."""
+    for log, category_id in entries:
+        if log["id"] <= after_id or not subscription.matches(log, category_id):
+            continue
+        for event, data in build_events(log, category_id):
+            yield log["id"], format_event(log["id"], event, data)
+
+
+stock_feed = StockFeed(poll_interval=settings.STOCK_STREAM_POLL_INTERVAL)
+bus.subscribe("products", stock_feed.wake)
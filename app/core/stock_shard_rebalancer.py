@@ -0,0 +1,24 @@
+"""
+Background rebalancing of sharded stock.
+
+Orders take sharded stock from whichever shard has enough, so shards drift
+apart; once none holds a whole order's quantity, takes fall back to locking
+every shard of the product. Every ``STOCK_SHARD_REBALANCE_INTERVAL`` seconds
+each worker evens the shards out again and refreshes the ``products.quantity``
+copy of every sharded product, which bounds how stale that column can be
+(reads use the shard sum, ``Product.on_hand_quantity``). Concurrent
+rebalances are harmless.
+"""
+from app import crud
+from app.core.config import settings
+from app.core.periodic import PeriodicTask
+from app.db.session import SessionLocal
+
+
+def rebalance_once() -> int:
+    with SessionLocal() as db:
+        return crud.crud_stock_shards.rebalance_stock_shards(db)
+
+
+stock_shard_rebalancer = PeriodicTask(
+    "stock shard rebalance", settings.STOCK_SHARD_REBALANCE_INTERVAL, rebalance_once)
@@ -0,0 +1,234 @@
+"""
+Post-commit background tasks.
+
+Work that follows from a write but does not have to be part of its
+transaction (rollups derived from it, refreshes of cached values, the
+invalidation bus's version bumps) is
+registered by the crud function with ``after_commit(db, name, fn, *args)``.
+Nothing is queued unless the session commits: a rollback discards the
+session's pending tasks. On commit they go to this worker's
+``TaskExecutor``, a bounded queue drained by ``TASK_WORKERS`` threads, so the
+request only pays for its own transaction.
+
+Each run calls ``fn(session, *args)`` with a new session bound to the same
+engine as the committing one; the task commits its own work. A failing run is
+retried up to ``TASK_MAX_RETRIES`` times, ``TASK_RETRY_DELAY`` seconds
+doubling between attempts, then logged and given up. Tasks registered with
+a ``key`` are coalesced: while one with the same key is still queued, further
+ones are skipped, which suits refreshes that read the current state when
+they run.
+
+Tasks are per process and not durable. A full queue drops new tasks (counted,
+never blocking the committing request) and a crash loses what is queued, so
+only register work that something else can recover (the periodic refreshes,
+``rebuild_sales_velocity``). With ``TASKS_SYNCHRONOUS`` (tests, scripts) tasks
+run inline right after the commit instead.
+"""
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import session as db_session
+
+_PENDING_KEY = "pending_tasks"
+
+
+class Task:
+    __slots__ = ("name", "fn", "args", "bind", "key", "submitted_at")
+
+    def __init__(self, name: str, fn: Callable[..., Any], args: Tuple[Any, ...], bind: Any, key: Optional[Hashable]):
+        self.name = name
+        self.fn = fn
+        self.args = args
+        self.bind = bind
+        self.key = key
+        self.submitted_at = 0.0
+
+
+class TaskExecutor:
+    """Bounded FIFO of tasks run by a fixed pool of daemon threads, started on first use."""
+
+    def __init__(self, workers: int, queue_size: int, max_retries: int, retry_delay: float, synchronous: bool = False):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.synchronous = synchronous
+        self._queue: Deque[Task] = deque()
+        self._queued_keys: Set[Hashable] = set()
+        self._threads: List[threading.Thread] = []
+        self._condition = threading.Condition()
+        self._stopping = False
+        self.running = 0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.lag_seconds_total = 0.0
+        self.lag_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    def start(self) -> None:
+        with self._condition:
+            self._stopping = False
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name=f"task-worker-{len(self._threads)}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, task: Task) -> bool:
+        """Queues a task (or runs it, when synchronous). Returns False if it was dropped or coalesced."""
+        task.submitted_at = time.monotonic()
+        if self.synchronous:
+            with self._condition:
+                self.submitted += 1
+            self._run(task)
+            return True
+        if not self._threads:
+            self.start()
+        with self._condition:
+            if task.key is not None and task.key in self._queued_keys:
+                self.coalesced += 1
+                return False
+            if len(self._queue) >= self.queue_size:
+                self.dropped += 1
+                print(f"Task queue full, dropping task {task.name}")
+                return False
+            self.submitted += 1
+            self._queue.append(task)
+            if task.key is not None:
+                self._queued_keys.add(task.key)
+            self._condition.notify()
+        return True
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopping:
+                    self._condition.wait()
+                if not self._queue:
+                    return
+                task = self._queue.popleft()
+                self._queued_keys.discard(task.key)
+                self.running += 1
+            try:
+                self._run(task)
+            finally:
+                with self._condition:
+                    self.running -= 1
+                    self._condition.notify_all()
+
+    def _run(self, task: Task) -> None:
+        started = time.monotonic()
+        lag = started - task.submitted_at
+        attempt = 0
+        while True:
+            try:
+                with db_session.SessionLocal(bind=task.bind) as db:
+                    task.fn(db, *task.args)
+                succeeded = True
+                break
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    print(f"Error in task {task.name}, giving up after {attempt + 1} attempts: {e}")
+                    succeeded = False
+                    break
+                print(f"Error in task {task.name} (attempt {attempt + 1}), retrying: {e}")
+                time.sleep(self.retry_delay * 2 ** attempt)
+                attempt += 1
+        with self._condition:
+            self.retried += attempt
+            if succeeded:
+                self.completed += 1
+            else:
+                self.failed += 1
+            self.lag_seconds_total += lag
+            self.lag_seconds_max = max(self.lag_seconds_max, lag)
+            self.run_seconds_total += time.monotonic() - started
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the queue is empty and no task is running. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._queue or self.running:
+                if not self._threads or not any(thread.is_alive() for thread in self._threads):
+                    return False
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Runs what is queued (for up to ``timeout`` seconds), then stops the workers."""
+        if not self.drain(timeout):
+            with self._condition:
+                if self._queue:
+                    print(f"Task executor stopped with {len(self._queue)} task(s) still queued")
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._condition:
+            finished = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "synchronous": self.synchronous,
+                "queue_size": self.queue_size,
+                "queued": len(self._queue),
+                "running": self.running,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "oldest_queued_seconds": time.monotonic() - self._queue[0].submitted_at if self._queue else 0.0,
+                "lag_seconds_avg": self.lag_seconds_total / finished if finished else 0.0,
+                "lag_seconds_max": self.lag_seconds_max,
+                "run_seconds_avg": self.run_seconds_total / finished if finished else 0.0,
+            }
+
+
+task_executor = TaskExecutor(
+    workers=settings.TASK_WORKERS,
+    queue_size=settings.TASK_QUEUE_SIZE,
+    max_retries=settings.TASK_MAX_RETRIES,
+    retry_delay=settings.TASK_RETRY_DELAY,
+    synchronous=settings.TASKS_SYNCHRONOUS,
+)
+# Scripts exit without a lifespan: let them finish what they queued.
+atexit.register(task_executor.shutdown, 30.0)
+
+
+def after_commit(db: Session, name: str, fn: Callable[..., Any], *args: Any, key: Optional[Hashable] = None) -> None:
+    """
+    Runs ``fn(session, *args)`` in the background once ``db`` commits, in a
+    session of its own; discarded if ``db`` rolls back instead.
+    """
+    db.info.setdefault(_PENDING_KEY, []).append(Task(name, fn, args, db.get_bind(), key))
+
+
+@event.listens_for(Session, "after_commit")
+def _submit_after_commit(session: Session) -> None:
+    for task in session.info.pop(_PENDING_KEY, ()):
+        task_executor.submit(task)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,23 @@
+"""
+Background refresh of the products.quantity copy of products stocked per warehouse.
+
+Orders take warehouse stock from the warehouse rows only, so the product's
+own ``quantity`` column drifts from the sum of its warehouses. Reads use the
+sum (``Product.on_hand_quantity``); for anything reading the column directly,
+every ``WAREHOUSE_TOTALS_REFRESH_INTERVAL`` seconds each worker writes the
+current sums back with one set-based UPDATE, which bounds how stale it can
+be. Concurrent refreshes are harmless.
+"""
+from app import crud
+from app.core.config import settings
+from app.core.periodic import PeriodicTask
+from app.db.session import SessionLocal
+
+
+def refresh_once() -> int:
+    with SessionLocal() as db:
+        return crud.crud_warehouse_stock.refresh_warehouse_totals(db)
+
+
+warehouse_totals_refresher = PeriodicTask(
+    "warehouse totals refresh", settings.WAREHOUSE_TOTALS_REFRESH_INTERVAL, refresh_once)
@@ -1,4 +1,14 @@
 from . import crud_category
 from . import crud_product
 from . import crud_order
-from . import crud_inventory 
+from . import crud_inventory
+from . import crud_counters
+from . import crud_stock_shards
+from . import crud_reservation
+from . import crud_sales_velocity
+from . import crud_dashboard
+from . import crud_sales_series
+from . import crud_warehouse
+from . import crud_warehouse_stock
+from . import crud_revenue
+from . import crud_archive
@@ -0,0 +1,268 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+import contextlib
+import datetime
+import functools
+import gzip
+import json
+import os
+import uuid
+
+from app import crud
+from app.core.config import settings
+from app.db.invalidation import bus, InvalidatingCache
+from app.models.archived_order import ArchivedOrder as ArchivedOrderModel
+from app.models.archived_order import ArchivedProductSales as ArchivedProductSalesModel
+from app.models.enums import OrderStatusEnum
+from app.models.order import Order as OrderModel
+from app.models.order_item import OrderItem as OrderItemModel
+from .crud_sales_series import _as_utc
+
+# COMPLETED and CANCELLED orders older than ORDER_ARCHIVE_AFTER_DAYS are never
+# modified again, so archive_orders moves them with their items out of orders /
+# order_items into gzip-compressed JSON-lines files, one per order day (UTC)
+# and batch: <ORDER_ARCHIVE_DIR>/YYYY/MM/YYYY-MM-DD.<run>-<batch>.jsonl.gz.
+# A file is written and synced before the transaction that indexes its orders
+# in archived_orders and deletes their rows, and is never rewritten; files of
+# a failed transaction are removed again. The index is what reads go by.
+#
+# Archival changes no figure the API reports: the revenue summary also sums
+# archived_orders, the sales series also reads the hourly
+# archived_product_sales rollup, and the order counters keep counting
+# archived orders. Inventory logs keep their order_id.
+ARCHIVABLE_STATUSES = (OrderStatusEnum.COMPLETED, OrderStatusEnum.CANCELLED)
+
+# Date of the newest archived order (None: nothing archived). Order lists
+# that do not reach back that far never look at the archive.
+_newest_archived_cache = InvalidatingCache("order_archive")
+
+def _archive_path(archive_file: str) -> str:
+    return os.path.join(settings.ORDER_ARCHIVE_DIR, archive_file)
+
+def _upsert_product_sales_statement(db: Session):
+    """INSERT ... ON CONFLICT that adds the given units and revenue to an existing hour."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(ArchivedProductSalesModel)
+        return stmt.on_duplicate_key_update(
+            units=ArchivedProductSalesModel.units + stmt.inserted["units"],
+            revenue=ArchivedProductSalesModel.revenue + stmt.inserted["revenue"],
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(ArchivedProductSalesModel)
+    return stmt.on_conflict_do_update(
+        index_elements=[ArchivedProductSalesModel.product_id, ArchivedProductSalesModel.hour],
+        set_={
+            "units": ArchivedProductSalesModel.units + stmt.excluded["units"],
+            "revenue": ArchivedProductSalesModel.revenue + stmt.excluded["revenue"],
+        },
+    )
+
+def _isoformat(value: Optional[datetime.datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def _parse(value: Optional[str]) -> Optional[datetime.datetime]:
+    return datetime.datetime.fromisoformat(value) if value is not None else None
+
+def _write_archive_file(archive_file: str, records: List[Dict[str, Any]]) -> None:
+    """Writes the file under a temporary name, syncs it, then renames it into place."""
+    path = _archive_path(archive_file)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = path + ".partial"
+    with open(partial, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as compressed:
+            for record in records:
+                compressed.write(json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(partial, path)
+
+@functools.lru_cache(maxsize=16)
+def _read_archive_file(archive_file: str) -> Dict[int, Dict[str, Any]]:
+    """Records of one archive file by order ID. Files never change, so the most recently read are kept."""
+    with gzip.open(_archive_path(archive_file), "rt", encoding="utf-8") as lines:
+        return {record["id"]: record for record in map(json.loads, lines)}
+
+def _decode(record: Dict[str, Any]) -> Dict[str, Any]:
+    """An archived order as a new dict, with the columns of orders and items as read from the tables."""
+    return {
+        "id": record["id"],
+        "order_date": _parse(record["order_date"]),
+        "total_amount": record["total_amount"],
+        "status": OrderStatusEnum(record["status"]),
+        "created_at": _parse(record["created_at"]),
+        "updated_at": _parse(record["updated_at"]),
+        "order_items": [dict(item, order_id=record["id"]) for item in record["order_items"]],
+    }
+
+def archive_orders(db: Session, before: datetime.datetime, batch_size: Optional[int] = None) -> int:
+    """
+    Moves COMPLETED and CANCELLED orders dated before ``before``, with their
+    items, into archive files, ``batch_size`` orders (oldest first) per
+    transaction: writes the batch's files, then indexes the orders, adds
+    their sales to the hourly rollup, deletes their rows and commits. The
+    order with the highest ID always stays, so SQLite, which hands out IDs
+    above the highest one left, never reuses an archived order's ID.
+    Returns the number of orders archived.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    run = f"{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+    archived = 0
+    batch = 0
+    while True:
+        orders = db.execute(
+            select(
+                OrderModel.id, OrderModel.order_date, OrderModel.total_amount, OrderModel.status,
+                OrderModel.created_at, OrderModel.updated_at,
+            )
+            .where(
+                OrderModel.status.in_(ARCHIVABLE_STATUSES),
+                OrderModel.order_date < before,
+                OrderModel.id < select(func.max(OrderModel.id)).scalar_subquery(),
+            )
+            .order_by(OrderModel.order_date, OrderModel.id)
+            .limit(batch_size)
+            .with_for_update()
+        ).all()
+        if not orders:
+            db.rollback()
+            return archived
+        batch += 1
+
+        order_ids = [order.id for order in orders]
+        items: Dict[int, List[Dict[str, Any]]] = {order_id: [] for order_id in order_ids}
+        for item in db.execute(
+            select(
+                OrderItemModel.id, OrderItemModel.order_id, OrderItemModel.product_id,
+                OrderItemModel.quantity, OrderItemModel.price_per_unit,
+            )
+            .where(OrderItemModel.order_id.in_(order_ids))
+            .order_by(OrderItemModel.id)
+        ):
+            items[item.order_id].append({
+                "id": item.id, "product_id": item.product_id,
+                "quantity": item.quantity, "price_per_unit": item.price_per_unit,
+            })
+
+        files: Dict[str, List[Dict[str, Any]]] = {}
+        index_rows = []
+        sales: Dict[tuple, List[float]] = {}
+        for order in orders:
+            order_date = _as_utc(order.order_date)
+            archive_file = os.path.join(
+                f"{order_date:%Y}", f"{order_date:%m}", f"{order_date:%Y-%m-%d}.{run}-{batch}.jsonl.gz")
+            files.setdefault(archive_file, []).append({
+                "id": order.id,
+                "order_date": _isoformat(order.order_date),
+                "total_amount": order.total_amount,
+                "status": OrderStatusEnum(order.status).value,
+                "created_at": _isoformat(order.created_at),
+                "updated_at": _isoformat(order.updated_at),
+                "order_items": items[order.id],
+            })
+            index_rows.append({
+                "id": order.id, "order_date": order.order_date, "total_amount": order.total_amount,
+                "status": order.status, "archive_file": archive_file,
+            })
+            if order.status == OrderStatusEnum.COMPLETED:
+                hour = order_date.replace(minute=0, second=0, microsecond=0)
+                for item in items[order.id]:
+                    totals = sales.setdefault((item["product_id"], hour), [0, 0.0])
+                    totals[0] += item["quantity"]
+                    totals[1] += item["quantity"] * item["price_per_unit"]
+
+        written = []
+        try:
+            for archive_file, records in files.items():
+                _write_archive_file(archive_file, records)
+                written.append(archive_file)
+            db.execute(insert(ArchivedOrderModel), index_rows)
+            if sales:
+                db.execute(_upsert_product_sales_statement(db), [
+                    {"product_id": product_id, "hour": hour, "units": units, "revenue": revenue}
+                    for (product_id, hour), (units, revenue) in sorted(sales.items())
+                ])
+            crud.crud_reservation.release_reservations(db, order_ids)
+            db.execute(
+                delete(OrderItemModel)
+                .where(OrderItemModel.order_id.in_(order_ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.execute(
+                delete(OrderModel)
+                .where(OrderModel.id.in_(order_ids))
+                .execution_options(synchronize_session=False)
+            )
+            bus.publish(db, "orders", "order_archive")
+            db.commit()
+        except Exception:
+            db.rollback()
+            for archive_file in written:
+                with contextlib.suppress(OSError):
+                    os.remove(_archive_path(archive_file))
+            raise
+        archived += len(orders)
+        print(f"Archived {archived} orders (up to {orders[-1].order_date})")
+
+def get_newest_archived_date(db: Session) -> Optional[datetime.datetime]:
+    return _newest_archived_cache.get_or_set(
+        "newest", lambda: db.execute(select(func.max(ArchivedOrderModel.order_date))).scalar())
+
+def _archived_filters(
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    status: Optional[OrderStatusEnum] = None
+) -> list:
+    # Same date bounds as crud_order._order_filters.
+    filters = []
+    if start_date:
+        filters.append(ArchivedOrderModel.order_date >= start_date)
+    if end_date:
+        filters.append(ArchivedOrderModel.order_date < (end_date + datetime.timedelta(days=1)))
+    if status:
+        filters.append(ArchivedOrderModel.status == status)
+    return filters
+
+def get_archived_order(db: Session, order_id: int) -> Optional[Dict[str, Any]]:
+    """An archived order with its items (see ``_decode``), from one index lookup and one file."""
+    archive_file = db.execute(
+        select(ArchivedOrderModel.archive_file).where(ArchivedOrderModel.id == order_id)
+    ).scalar()
+    if archive_file is None:
+        return None
+    return _decode(_read_archive_file(archive_file)[order_id])
+
+def get_archived_orders(
+    db: Session,
+    limit: int,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    status: Optional[OrderStatusEnum] = None
+) -> List[Dict[str, Any]]:
+    """
+    The newest ``limit`` archived orders matching the filters, newest first,
+    with their items: one query on the index, then each file they are in is
+    read once.
+    """
+    index = db.execute(
+        select(ArchivedOrderModel.id, ArchivedOrderModel.archive_file)
+        .where(*_archived_filters(start_date, end_date, status))
+        .order_by(ArchivedOrderModel.order_date.desc())
+        .limit(limit)
+    ).all()
+    return [_decode(_read_archive_file(archive_file)[order_id]) for order_id, archive_file in index]
+
+def count_archived_orders(
+    db: Session,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    status: Optional[OrderStatusEnum] = None
+) -> int:
+    return db.execute(
+        select(func.count()).select_from(ArchivedOrderModel).where(*_archived_filters(start_date, end_date, status))
+    ).scalar() or 0
@@ -1,20 +1,122 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy import bindparam, case, func, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import Any, Dict, Iterable, List, Optional
 
+from app.core.config import settings
+from app.db.invalidation import bus, InvalidatingCache
 from app.models.category import Category as CategoryModel
+from app.models.product import Product as ProductModel
 from app.schemas.category import CategoryCreate, CategoryUpdate
 
+# The categories table is tiny and rarely written: every worker keeps all of it
+# in memory and drops the copy whenever any worker writes a category.
+_category_map_cache = InvalidatingCache("categories")
+
+# Per-category product aggregates, recomputed for all categories at once after
+# any product or stock write (every such write publishes "products").
+_category_stats_cache = InvalidatingCache("products", "categories")
+
+EMPTY_CATEGORY_STATS = {"product_count": 0, "units_on_hand": 0, "stock_value": 0.0, "low_stock_count": 0}
+
+def _load_category_map(db: Session) -> Dict[int, CategoryModel]:
+    rows = db.execute(select(CategoryModel.id, CategoryModel.name, CategoryModel.description)).all()
+    category_map = {}
+    for category_id, name, description in rows:
+        category = CategoryModel(id=category_id, name=name, description=description)
+        make_transient_to_detached(category)
+        category_map[category_id] = category
+    return category_map
+
+def get_category_map(db: Session) -> Dict[int, CategoryModel]:
+    """
+    Returns every category by ID as detached instances shared by the whole process.
+    Attach them to a session with ``db.merge(category, load=False)``, never modify them.
+    """
+    return _category_map_cache.get_or_set("all", lambda: _load_category_map(db))
+
+def attach_categories(db: Session, products: Iterable) -> None:
+    """
+    Sets ``product.category`` from the category map instead of querying or
+    joining the categories table. Reloads the map once if a category is missing
+    (e.g. created by another worker since the last poll).
+    """
+    products = [product for product in products if product is not None]
+    category_map = get_category_map(db)
+    if any(product.category_id not in category_map for product in products):
+        _category_map_cache.clear()
+        category_map = get_category_map(db)
+
+    merged: Dict[int, CategoryModel] = {}
+    for product in products:
+        category_id = product.category_id
+        if category_id not in merged and category_id in category_map:
+            merged[category_id] = db.merge(category_map[category_id], load=False)
+        set_committed_value(product, "category", merged.get(category_id))
+
+def get_category_rows(db: Session, category_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Categories by ID as plain dicts for the row read paths (see
+    ``crud_product.get_product_rows``), built from the category map. Reloads
+    the map once if a category is missing.
+    """
+    category_ids = set(category_ids)
+    category_map = get_category_map(db)
+    if not category_ids <= category_map.keys():
+        _category_map_cache.clear()
+        category_map = get_category_map(db)
+    rows = {}
+    for category_id in category_ids:
+        category = category_map.get(category_id)
+        if category is not None:
+            rows[category_id] = {"id": category.id, "name": category.name, "description": category.description}
+    return rows
+
+def _load_category_stats(db: Session) -> Dict[int, Dict[str, Any]]:
+    rows = db.execute(
+        select(
+            ProductModel.category_id,
+            func.count(),
+            func.sum(ProductModel.on_hand_quantity),
+            func.sum(ProductModel.price * ProductModel.on_hand_quantity),
+            func.sum(case((ProductModel.on_hand_quantity < settings.LOW_STOCK_THRESHOLD, 1), else_=0)),
+        )
+        .group_by(ProductModel.category_id)
+    ).all()
+    return {
+        category_id: {
+            "product_count": product_count,
+            "units_on_hand": units or 0,
+            "stock_value": value or 0.0,
+            "low_stock_count": low_stock or 0,
+        }
+        for category_id, product_count, units, value, low_stock in rows
+    }
+
+def get_category_stats(db: Session) -> Dict[int, Dict[str, Any]]:
+    """
+    Product count, units on hand, stock value (price * quantity) and low-stock
+    count of every category with products, from one grouped query over
+    products that is cached until the next product or stock write. Sharded
+    and warehouse-stocked products count with their on-hand stock. Categories
+    without products are omitted (see ``EMPTY_CATEGORY_STATS``).
+    """
+    return _category_stats_cache.get_or_set("all", lambda: _load_category_stats(db))
+
+_category_by_id = select(CategoryModel).where(CategoryModel.id == bindparam("category_id"))
+_category_by_name = select(CategoryModel).where(CategoryModel.name == bindparam("name"))
+
 def get_category(db: Session, category_id: int) -> Optional[CategoryModel]:
     """
     Retrieves a single category by its ID.
     """
-    return db.query(CategoryModel).filter(CategoryModel.id == category_id).first()
+    return db.execute(_category_by_id, {"category_id": category_id}).scalars().first()
 
 def get_category_by_name(db: Session, name: str) -> Optional[CategoryModel]:
     """
     Retrieves a single category by its name. Useful for checking uniqueness.
     """
-    return db.query(CategoryModel).filter(CategoryModel.name == name).first()
+    return db.execute(_category_by_name, {"name": name}).scalars().first()
 
 def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[CategoryModel]:
     """
@@ -31,6 +133,7 @@ def create_category(db: Session, category: CategoryCreate) -> CategoryModel:
         description=category.description
     )
     db.add(db_category)
+    bus.publish(db, "categories")
     db.commit()
     db.refresh(db_category) 
     return db_category
@@ -49,6 +152,7 @@ def update_category(db: Session, db_category: CategoryModel, category_in: Catego
         setattr(db_category, field, value)
 
     db.add(db_category) 
+    bus.publish(db, "categories")
     db.commit()
     db.refresh(db_category)
     return db_category
@@ -60,6 +164,7 @@ def delete_category(db: Session, category_id: int) -> Optional[CategoryModel]:
     db_category = get_category(db=db, category_id=category_id)
     if db_category:
         db.delete(db_category)
+        bus.publish(db, "categories")
         db.commit()
         return db_category
     return None
\ No newline at end of file
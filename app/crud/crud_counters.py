@@ -0,0 +1,184 @@
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Dict, Optional, Tuple
+import datetime
+import random
+import time
+
+from app.core.config import settings
+from app.db.invalidation import InvalidatingCache
+from app.models.row_counter import RowCounter
+from app.models.archived_order import ArchivedOrder as ArchivedOrderModel
+from app.models.order import Order as OrderModel
+from app.models.order_item import OrderItem as OrderItemModel
+from app.models.product import Product as ProductModel
+from app.models.inventory_log import InventoryLog as InventoryLogModel
+from app.models.enums import OrderStatusEnum
+from .crud_archive import count_archived_orders
+
+# Counter scopes. Keys are the grouping value as a string.
+ORDERS_BY_STATUS = "orders.status"
+PRODUCTS_BY_CATEGORY = "products.category"
+LOGS_BY_PRODUCT = "inventory_logs.product"
+
+CounterDeltas = Dict[Tuple[str, str], int]
+
+# Exact counts for filter combinations that have no counter, kept briefly.
+_filtered_counts = InvalidatingCache("products", "orders", ttl=settings.COUNT_CACHE_TTL)
+
+def _upsert_counters_statement(db: Session):
+    """INSERT ... ON CONFLICT that adds the given delta to an existing counter."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(RowCounter)
+        return stmt.on_duplicate_key_update(count=RowCounter.count + stmt.inserted["count"])
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(RowCounter)
+    return stmt.on_conflict_do_update(
+        index_elements=[RowCounter.scope, RowCounter.key, RowCounter.slot],
+        set_={"count": RowCounter.count + stmt.excluded["count"]},
+    )
+
+def adjust_counters(db: Session, deltas: CounterDeltas) -> None:
+    """
+    Applies counter deltas in the caller's transaction with one executemany
+    upsert, so counts commit or roll back together with the rows they count.
+    The deltas go to one of the ``ROW_COUNTER_SLOTS`` rows of each counter,
+    picked at random per call: concurrent transactions (every order bumps its
+    status counter) then rarely wait on each other's row lock. Reads sum the
+    slots.
+    """
+    slot = random.randrange(settings.ROW_COUNTER_SLOTS)
+    rows = [
+        {"scope": scope, "key": key, "slot": slot, "count": delta}
+        for (scope, key), delta in sorted(deltas.items())
+        if delta
+    ]
+    if rows:
+        db.execute(_upsert_counters_statement(db), rows)
+
+def add_delta(deltas: CounterDeltas, scope: str, key, delta: int = 1) -> None:
+    counter = (scope, str(key))
+    deltas[counter] = deltas.get(counter, 0) + delta
+
+def status_key(status: OrderStatusEnum) -> str:
+    return OrderStatusEnum(status).value
+
+def get_counter(db: Session, scope: str, key) -> int:
+    return db.execute(
+        select(func.sum(RowCounter.count)).where(RowCounter.scope == scope, RowCounter.key == str(key))
+    ).scalar() or 0
+
+def get_scope_total(db: Session, scope: str) -> int:
+    return db.execute(
+        select(func.sum(RowCounter.count)).where(RowCounter.scope == scope)
+    ).scalar() or 0
+
+def rebuild_counters(db: Session) -> None:
+    """
+    Recomputes every counter from the base tables (after bulk maintenance
+    such as populate_db.py). Commits.
+    """
+    db.execute(delete(RowCounter))
+    rows = []
+    # Archived orders still count (see crud_archive).
+    order_counts: Dict[str, int] = {}
+    for model in (OrderModel, ArchivedOrderModel):
+        for status, count in db.execute(select(model.status, func.count()).group_by(model.status)):
+            order_counts[status_key(status)] = order_counts.get(status_key(status), 0) + count
+    for key, count in order_counts.items():
+        rows.append({"scope": ORDERS_BY_STATUS, "key": key, "count": count})
+    for category_id, count in db.execute(
+        select(ProductModel.category_id, func.count()).group_by(ProductModel.category_id)
+    ):
+        rows.append({"scope": PRODUCTS_BY_CATEGORY, "key": str(category_id), "count": count})
+    for product_id, count in db.execute(
+        select(InventoryLogModel.product_id, func.count()).group_by(InventoryLogModel.product_id)
+    ):
+        rows.append({"scope": LOGS_BY_PRODUCT, "key": str(product_id), "count": count})
+    if rows:
+        db.execute(insert(RowCounter), rows)
+    db.commit()
+
+def _cached_count(key: tuple, compute) -> Tuple[int, float]:
+    count, counted_at = _filtered_counts.get_or_set(key, lambda: (compute(), time.monotonic()))
+    return count, time.monotonic() - counted_at
+
+def count_orders(
+    db: Session,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    status: Optional[OrderStatusEnum] = None
+) -> Tuple[int, Optional[float]]:
+    """
+    Total for ``get_orders`` with the same filters, as (count, age in seconds of a cached count),
+    archived orders included where ``get_orders`` merges them in.
+    No filter or a status filter is served from the counters (age None); other
+    combinations run one COUNT (two with archived orders) that is cached for
+    ``COUNT_CACHE_TTL`` seconds or until a matching write.
+    """
+    if start_date is None and end_date is None and product_id is None and category_id is None:
+        if status is None:
+            return get_scope_total(db, ORDERS_BY_STATUS), None
+        return get_counter(db, ORDERS_BY_STATUS, status_key(status)), None
+
+    def compute():
+        # Same semi-joins as crud_order._orders_query.
+        query = select(func.count()).select_from(OrderModel)
+        if product_id is not None:
+            query = query.where(OrderModel.id.in_(
+                select(OrderItemModel.order_id).where(OrderItemModel.product_id == product_id)))
+        if category_id is not None:
+            query = query.where(OrderModel.id.in_(
+                select(OrderItemModel.order_id)
+                .join(ProductModel, ProductModel.id == OrderItemModel.product_id)
+                .where(ProductModel.category_id == category_id)))
+        if start_date:
+            query = query.where(OrderModel.order_date >= start_date)
+        if end_date:
+            query = query.where(OrderModel.order_date < (end_date + datetime.timedelta(days=1)))
+        if status:
+            query = query.where(OrderModel.status == status)
+        count = db.execute(query).scalar() or 0
+        if product_id is None and category_id is None:
+            count += count_archived_orders(db, start_date, end_date, status)
+        return count
+
+    return _cached_count(("orders", start_date, end_date, product_id, category_id, status), compute)
+
+def count_products(
+    db: Session,
+    category_id: Optional[int] = None,
+    low_stock: Optional[bool] = None
+) -> Tuple[int, Optional[float]]:
+    """
+    Total for ``get_products`` with the same filters, as (count, age in seconds of a cached count).
+    """
+    if low_stock is None:
+        if category_id is None:
+            return get_scope_total(db, PRODUCTS_BY_CATEGORY), None
+        return get_counter(db, PRODUCTS_BY_CATEGORY, category_id), None
+
+    def compute():
+        query = select(func.count()).select_from(ProductModel)
+        if category_id is not None:
+            query = query.where(ProductModel.category_id == category_id)
+        if low_stock:
+            query = query.where(ProductModel.on_hand_quantity < settings.LOW_STOCK_THRESHOLD)
+        else:
+            query = query.where(ProductModel.on_hand_quantity >= settings.LOW_STOCK_THRESHOLD)
+        return db.execute(query).scalar() or 0
+
+    return _cached_count(("products", category_id, low_stock), compute)
+
+def count_inventory_logs(db: Session, product_id: int) -> Tuple[int, Optional[float]]:
+    """
+    Total for ``get_inventory_logs_for_product``, as (count, age in seconds of a cached count).
+    """
+    return get_counter(db, LOGS_BY_PRODUCT, product_id), None
@@ -0,0 +1,50 @@
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from typing import Any, Dict
+import datetime
+
+from app.core.config import settings
+from app.models.enums import OrderStatusEnum
+from app.models.order import Order as OrderModel
+from app.models.product import Product as ProductModel
+from . import crud_category, crud_counters, crud_revenue
+
+def get_dashboard_summary(db: Session, list_size: int = 10, revenue_months: int = 12) -> Dict[str, Any]:
+    """
+    Everything the admin landing page shows, in one pass: order counts per
+    status and the product total from the row counters, the low-stock count
+    and the ``list_size`` lowest-stock products, the ``list_size`` most recent
+    pending orders, and monthly revenue for the last ``revenue_months`` months.
+    """
+    now = datetime.datetime.now(datetime.timezone.utc)
+    low_stock_count, _ = crud_counters.count_products(db, low_stock=True)
+    low_stock_products = db.execute(
+        select(
+            ProductModel.id, ProductModel.name, ProductModel.category_id,
+            ProductModel.on_hand_quantity.label("quantity"),
+        )
+        .where(ProductModel.on_hand_quantity < settings.LOW_STOCK_THRESHOLD)
+        .order_by(ProductModel.on_hand_quantity, ProductModel.id)
+        .limit(list_size)
+    ).mappings().all()
+    pending_orders = db.execute(
+        select(OrderModel.id, OrderModel.order_date, OrderModel.total_amount)
+        .where(OrderModel.status == OrderStatusEnum.PENDING)
+        .order_by(OrderModel.order_date.desc())
+        .limit(list_size)
+    ).mappings().all()
+    revenue_start = (now - datetime.timedelta(days=31 * (revenue_months - 1))).date().replace(day=1)
+
+    return {
+        "generated_at": now,
+        "order_counts": {
+            status.value: crud_counters.get_counter(db, crud_counters.ORDERS_BY_STATUS, status.value)
+            for status in OrderStatusEnum
+        },
+        "product_count": crud_counters.get_scope_total(db, crud_counters.PRODUCTS_BY_CATEGORY),
+        "category_count": len(crud_category.get_category_map(db)),
+        "low_stock_count": low_stock_count,
+        "low_stock_products": [dict(row) for row in low_stock_products],
+        "pending_orders": [dict(row) for row in pending_orders],
+        "revenue_by_month": crud_revenue.get_revenue_summary(db, period="monthly", start_date=revenue_start),
+    }
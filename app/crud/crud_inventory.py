@@ -1,33 +1,46 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional, Tuple 
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session, joinedload, undefer
+from typing import Dict, Iterator, List, Optional, Tuple 
 
+from app.core.tasks import after_commit
+from app.db.invalidation import bus
 from app.models.inventory_log import InventoryLog as InventoryLogModel
 from app.models.enums import InventoryLogReasonEnum
 from app.models.product import Product as ProductModel
 from app.schemas.inventory_log import RestockCreate
+from .crud_product import _add_low_stock_flag, product_by_id_for_update
+from .crud_counters import LOGS_BY_PRODUCT, add_delta, adjust_counters
+from . import crud_stock_shards, crud_warehouse, crud_warehouse_stock
 def create_inventory_log(
     db: Session,
     product_id: int,
     change_amount: int,
     reason: InventoryLogReasonEnum,
     order_id: Optional[int] = None,
-    notes: Optional[str] = None
+    notes: Optional[str] = None,
+    new_quantity: Optional[int] = None,
+    warehouse_id: Optional[int] = None
 ) -> InventoryLogModel:
-    product = db.query(ProductModel).filter(ProductModel.id == product_id).first()
+    """
+    Logs a stock change. Callers apply ``change_amount`` to the product first,
+    so ``new_quantity`` defaults to the product's current (already changed)
+    quantity; products with sharded or warehouse stock pass their total instead.
+    """
+    product = db.get(ProductModel, product_id)
     if not product:
         raise ValueError(f"Product with ID {product_id} not found for logging.")
-    current_quantity = product.quantity
-    new_quantity_after_change = current_quantity + change_amount
     db_log = InventoryLogModel(
         product_id=product_id,
         change_amount=change_amount,
-        new_quantity=new_quantity_after_change,
+        new_quantity=product.quantity if new_quantity is None else new_quantity,
         reason=reason,
         order_id=order_id,
+        warehouse_id=warehouse_id,
         notes=notes
     )
     db.add(db_log)
     db.flush()
+    adjust_counters(db, {(LOGS_BY_PRODUCT, str(product_id)): 1})
     return db_log
 def get_inventory_logs_for_product(
     db: Session,
@@ -35,38 +48,138 @@ def get_inventory_logs_for_product(
     skip: int = 0,
     limit: int = 100
 ) -> List[InventoryLogModel]:
+    return _inventory_logs_query(db, product_id).offset(skip).limit(limit).all()
+
+def _inventory_logs_query(db: Session, product_id: int):
     return (
         db.query(InventoryLogModel)
         .filter(InventoryLogModel.product_id == product_id)
         .order_by(InventoryLogModel.timestamp.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
     )
+
+def iter_inventory_logs_for_product(
+    db: Session,
+    product_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    batch_size: int = 500
+) -> Iterator[List[InventoryLogModel]]:
+    """
+    Same rows as ``get_inventory_logs_for_product``, yielded in batches of
+    ``batch_size`` from one cursor, so memory is bounded by the batch size.
+    """
+    statement = (
+        _inventory_logs_query(db, product_id)
+        .offset(skip).limit(limit)
+        .statement.execution_options(yield_per=batch_size)
+    )
+    yield from db.execute(statement).scalars().partitions()
+
+def get_latest_inventory_log_id(db: Session) -> int:
+    """
+    Returns the highest inventory log id, or 0 when there are no logs.
+    """
+    return db.query(func.max(InventoryLogModel.id)).scalar() or 0
+
+def get_inventory_logs_after(
+    db: Session,
+    after_id: int,
+    product_ids: Optional[List[int]] = None,
+    category_ids: Optional[List[int]] = None,
+    limit: int = 500
+) -> List[Tuple[InventoryLogModel, Optional[int]]]:
+    """
+    Retrieves logs with an id greater than ``after_id`` in id order, paired
+    with the product's category id. Walks the primary key, so it stays cheap
+    however large the table grows.
+    """
+    query = (
+        db.query(InventoryLogModel, ProductModel.category_id)
+        .outerjoin(ProductModel, ProductModel.id == InventoryLogModel.product_id)
+        .filter(InventoryLogModel.id > after_id)
+    )
+    if product_ids:
+        query = query.filter(InventoryLogModel.product_id.in_(product_ids))
+    if category_ids:
+        query = query.filter(ProductModel.category_id.in_(category_ids))
+
+    return [tuple(row) for row in query.order_by(InventoryLogModel.id).limit(limit).all()]
+def _check_restock_warehouses(db: Session, restock_items: List[RestockCreate], warehoused: Dict[int, int]) -> str:
+    """
+    Products stocked per warehouse must be restocked into a warehouse, other
+    products must not be. Returns an error message, or "" when valid.
+    """
+    for item in restock_items:
+        if item.product_id in warehoused and item.warehouse_id is None:
+            return f"Product ID {item.product_id} is stocked per warehouse; a warehouse_id is required to restock it."
+        if item.product_id not in warehoused and item.warehouse_id is not None:
+            return f"Product ID {item.product_id} is not stocked per warehouse; restock it without a warehouse_id."
+    missing_ids = crud_warehouse.get_missing_warehouse_ids(
+        db, {item.warehouse_id for item in restock_items if item.warehouse_id is not None})
+    if missing_ids:
+        return f"Warehouse(s) with ID {', '.join(map(str, missing_ids))} not found."
+    return ""
+
+def _refresh_cached_quantities_after_commit(db: Session, product_ids: List[int]) -> None:
+    """
+    Restocking sharded or warehouse stock leaves the products.quantity copy
+    behind until the periodic refreshes; bring it up to date right after the
+    commit instead, off the request.
+    """
+    if product_ids:
+        after_commit(
+            db, "refresh cached quantities", crud_stock_shards.refresh_cached_quantities, product_ids,
+            key=("cached quantities", tuple(product_ids)))
+
 def restock_product(db: Session, restock_info: RestockCreate) -> Tuple[Optional[ProductModel], Optional[InventoryLogModel], str]:
     """
     Increases the quantity of a product and logs the restock event.
+    Sharded stock is added to one shard, warehouse stock to the given
+    warehouse; in both cases the product row is not locked and its cached
+    quantity is refreshed after the commit.
     """
     if restock_info.quantity_added <= 0:
         return None, None, "Quantity added must be positive."
 
     try:
-        product = db.query(ProductModel).filter(ProductModel.id == restock_info.product_id).with_for_update().first()
+        shard_count = crud_stock_shards.get_sharded_products(db).get(restock_info.product_id)
+        warehoused = crud_warehouse_stock.get_warehouse_products(db)
+        if shard_count or restock_info.product_id in warehoused:
+            product = db.get(ProductModel, restock_info.product_id)
+        else:
+            product = db.execute(product_by_id_for_update, {"product_id": restock_info.product_id}).scalars().first()
 
         if not product:
             db.rollback()
             return None, None, f"Product with ID {restock_info.product_id} not found."
+        error_message = _check_restock_warehouses(db, [restock_info], warehoused)
+        if error_message:
+            db.rollback()
+            return None, None, error_message
 
-        product.quantity += restock_info.quantity_added
+        new_quantity = None
+        if shard_count:
+            crud_stock_shards.add_stock(db, product.id, restock_info.quantity_added, shard_count)
+            new_quantity = crud_stock_shards.get_shard_totals(db, [product.id]).get(product.id)
+        elif product.id in warehoused:
+            crud_warehouse_stock.add_stock(db, product.id, restock_info.quantity_added, restock_info.warehouse_id)
+            new_quantity = crud_warehouse_stock.get_warehouse_totals(db, [product.id]).get(product.id)
+        else:
+            product.quantity += restock_info.quantity_added
+        if new_quantity is not None:
+            _refresh_cached_quantities_after_commit(db, [product.id])
 
         log_entry = create_inventory_log(
             db=db,
             product_id=product.id,
             change_amount=restock_info.quantity_added, #
             reason=InventoryLogReasonEnum.RESTOCK,
-            notes=restock_info.notes
+            notes=restock_info.notes,
+            new_quantity=new_quantity,
+            warehouse_id=restock_info.warehouse_id
         )
 
+        bus.publish(db, "products")
         db.commit()
 
         db.refresh(product)
@@ -77,4 +190,93 @@ def restock_product(db: Session, restock_info: RestockCreate) -> Tuple[Optional[
     except Exception as e:
         db.rollback()
         print(f"Error restocking product {restock_info.product_id}: {e}") 
-        return None, None, f"An unexpected error occurred during restock: {e}"
\ No newline at end of file
+        return None, None, f"An unexpected error occurred during restock: {e}"
+def restock_products(db: Session, restock_items: List[RestockCreate]) -> Tuple[List[ProductModel], str]:
+    """
+    Applies a whole shipment of restocks in one transaction.
+    Products are locked in a single statement in product-id order, so concurrent
+    batches always acquire locks in the same order. Quantities are written with
+    one executemany UPDATE, the RESTOCK logs with one bulk INSERT, and the
+    updated products are returned from one batched read. Products with
+    sharded or warehouse stock are not locked; their restocks go to a shard
+    each, or to the entry's warehouse, and their cached quantities are
+    refreshed after the commit.
+    """
+    if not restock_items:
+        return [], "At least one restock entry is required."
+    for index, item in enumerate(restock_items):
+        if item.quantity_added <= 0:
+            return [], f"Quantity added must be positive (entry {index}, product ID {item.product_id})."
+
+    product_ids = sorted({item.product_id for item in restock_items})
+
+    try:
+        sharded = crud_stock_shards.get_sharded_products(db)
+        warehoused = crud_warehouse_stock.get_warehouse_products(db)
+        locked_products = (
+            db.query(ProductModel)
+            .filter(ProductModel.id.in_([
+                product_id for product_id in product_ids
+                if product_id not in sharded and product_id not in warehoused
+            ]))
+            .order_by(ProductModel.id)
+            .with_for_update()
+            .all()
+        )
+        quantities = {product.id: product.quantity for product in locked_products}
+        quantities.update(crud_stock_shards.get_shard_totals(
+            db, [product_id for product_id in product_ids if product_id in sharded]))
+        quantities.update(crud_warehouse_stock.get_warehouse_totals(
+            db, [product_id for product_id in product_ids if product_id in warehoused]))
+        missing_ids = [product_id for product_id in product_ids if product_id not in quantities]
+        if missing_ids:
+            db.rollback()
+            return [], f"Product(s) with ID {', '.join(map(str, missing_ids))} not found."
+        error_message = _check_restock_warehouses(db, restock_items, warehoused)
+        if error_message:
+            db.rollback()
+            return [], error_message
+
+        products_by_id = {product.id: product for product in locked_products}
+        log_rows = []
+        for item in restock_items:
+            if item.product_id in sharded:
+                crud_stock_shards.add_stock(db, item.product_id, item.quantity_added, sharded[item.product_id])
+            elif item.product_id in warehoused:
+                crud_warehouse_stock.add_stock(db, item.product_id, item.quantity_added, item.warehouse_id)
+            else:
+                products_by_id[item.product_id].quantity += item.quantity_added
+            quantities[item.product_id] += item.quantity_added
+            log_rows.append({
+                "product_id": item.product_id,
+                "change_amount": item.quantity_added,
+                "new_quantity": quantities[item.product_id],
+                "reason": InventoryLogReasonEnum.RESTOCK,
+                "warehouse_id": item.warehouse_id,
+                "notes": item.notes,
+            })
+
+        db.flush()
+        db.execute(insert(InventoryLogModel), log_rows)
+        log_counts = {}
+        for row in log_rows:
+            add_delta(log_counts, LOGS_BY_PRODUCT, row["product_id"])
+        adjust_counters(db, log_counts)
+        _refresh_cached_quantities_after_commit(
+            db, [product_id for product_id in product_ids if product_id in sharded or product_id in warehoused])
+        bus.publish(db, "products")
+        db.commit()
+
+    except Exception as e:
+        db.rollback()
+        print(f"Error restocking {len(product_ids)} products: {e}")
+        return [], f"An unexpected error occurred during batch restock: {e}"
+
+    products = (
+        db.query(ProductModel)
+        .options(joinedload(ProductModel.category), undefer(ProductModel.on_hand_quantity))
+        .filter(ProductModel.id.in_(product_ids))
+        .order_by(ProductModel.id)
+        .all()
+    )
+    return [_add_low_stock_flag(product) for product in products], ""
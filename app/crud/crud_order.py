@@ -1,46 +1,79 @@
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, select
-from typing import List, Optional, Dict, Any, Tuple 
+from sqlalchemy.orm import Session, selectinload, undefer
+from sqlalchemy import bindparam, func, insert, select, update
+from typing import Iterator, List, Optional, Dict, Any, Tuple 
 import datetime
 from decimal import Decimal
 import traceback 
 from app import crud 
+from app.db.invalidation import bus
 
+from app.models.inventory_log import InventoryLog as InventoryLogModel
 from app.models.order import Order as OrderModel
 from app.models.enums import OrderStatusEnum, InventoryLogReasonEnum
 from app.models.order_item import OrderItem as OrderItemModel
 from app.models.product import Product as ProductModel
 from app.schemas.order import OrderCreate
-from .crud_product import _add_low_stock_flag
+from .crud_product import PRODUCT_ROW_COLUMNS, _add_low_stock_flag, _product_dicts
+from .crud_counters import LOGS_BY_PRODUCT, ORDERS_BY_STATUS, add_delta, adjust_counters, status_key
+from .crud_sales_series import _as_utc
 
 def create_order(db: Session, order_in: OrderCreate) -> Tuple[Optional[OrderModel], str]:
     """
-    Creates a new order, associated order items, updates product quantities,
-    and logs inventory changes within a single database transaction.
+    Creates a new order and its items within a single database transaction.
+    A PENDING order only reserves its stock with one conditional insert per
+    item, under the product's row lock (see crud_reservation); the
+    reservations expire after ``RESERVATION_TTL`` seconds. Any other order takes the stock right away:
+    product quantities are decremented and SALE inventory logs are written; the
+    products' sales velocity is updated after the commit, in the background.
+    Products with sharded stock are only share-locked while they have no
+    active reservations (see crud_reservation); their stock is taken from one of their shards (see
+    crud_stock_shards). So are products stocked per warehouse: their stock is
+    allocated across warehouses and only the warehouse rows it comes from are
+    locked, logged per warehouse (see crud_warehouse_stock).
     """
     if not order_in.items:
         return None, "Order must contain at least one item."
 
+    reserve = order_in.status == OrderStatusEnum.PENDING
+
     print("\n--- Starting create_order ---") 
     try:
         total_amount = Decimal("0.0")
         order_items_instances: List[OrderItemModel] = []
         products_to_update: Dict[int, ProductModel] = {} 
         log_creation_data = [] 
-
+        reserved: Dict[int, int] = {}
+        sharded: Dict[int, int] = {}
+        warehoused: Dict[int, int] = {}
+        stock_totals: Dict[int, int] = {}
+        # Index of the item in order_items_instances -> [(warehouse_id, amount), ...]
+        allocations: Dict[int, List[Tuple[int, int]]] = {}
         print("1. Validating items and locking products...")
+        product_ids = {item.product_id for item in order_in.items}
+        if not reserve:
+            sharded = crud.crud_stock_shards.get_sharded_products(db)
+            warehoused = crud.crud_warehouse_stock.get_warehouse_products(db)
+        # Row locks against concurrent reservations (see crud_reservation),
+        # taken before anything is read or inserted.
+        crud.crud_reservation.lock_products(
+            db, product_ids, [product_id for product_id in product_ids if product_id in sharded or product_id in warehoused])
+        if not reserve:
+            reserved = crud.crud_reservation.get_reserved_quantities(db, product_ids)
+            stock_totals = _unlocked_stock_totals(db, product_ids, sharded, warehoused)
+
         for item_in in order_in.items:
             print(f"  Processing item for product ID: {item_in.product_id}")
-            product = db.query(ProductModel).filter(ProductModel.id == item_in.product_id).with_for_update().first()
+            product = db.get(ProductModel, item_in.product_id)
             if not product:
                 print(f"  ERROR: Product ID {item_in.product_id} not found.")
                 db.rollback()
                 return None, f"Product with ID {item_in.product_id} not found."
 
-            if product.quantity < item_in.quantity:
-                print(f"  ERROR: Insufficient stock for product ID {item_in.product_id}. Available: {product.quantity}, Required: {item_in.quantity}.")
+            available = stock_totals.get(product.id, product.quantity) - reserved.get(product.id, 0)
+            if not reserve and available < item_in.quantity:
+                print(f"  ERROR: Insufficient stock for product ID {item_in.product_id}. Available: {available}, Required: {item_in.quantity}.")
                 db.rollback()
-                return None, f"Insufficient stock for product ID {item_in.product_id}. Available: {product.quantity}, Required: {item_in.quantity}."
+                return None, f"Insufficient stock for product ID {item_in.product_id}. Available: {available}, Required: {item_in.quantity}."
 
             if product.id not in products_to_update:
                  products_to_update[product.id] = product
@@ -73,19 +106,45 @@ def create_order(db: Session, order_in: OrderCreate) -> Tuple[Optional[OrderMode
         print("Order object added to session.")
 
         print("3. Linking items, updating quantities...")
-        for item_model in order_items_instances:
+        for index, item_model in enumerate(order_items_instances):
             product_to_update = products_to_update[item_model.product_id]
 
             item_model.order = db_order 
+            db.add(item_model)
+            if reserve:
+                continue
+
+            shard_count = sharded.get(product_to_update.id)
+            if shard_count:
+                if not crud.crud_stock_shards.take_stock(db, product_to_update.id, item_model.quantity, shard_count):
+                    print(f"  ERROR: Shards of product {product_to_update.id} ran out of stock during update.")
+                    db.rollback()
+                    return None, f"Insufficient stock for product ID {product_to_update.id}: the order needs more than is available."
+                continue
+            if product_to_update.id in warehoused:
+                allocation = crud.crud_warehouse_stock.take_stock(db, product_to_update.id, item_model.quantity)
+                if allocation is None:
+                    print(f"  ERROR: Warehouses of product {product_to_update.id} ran out of stock during update.")
+                    db.rollback()
+                    return None, f"Insufficient stock for product ID {product_to_update.id}: the order needs more than is available."
+                allocations[index] = allocation
+                continue
 
             product_to_update.quantity += (-item_model.quantity) 
-            if product_to_update.quantity < 0:
+            if product_to_update.quantity - reserved.get(product_to_update.id, 0) < 0:
                  print(f"  ERROR: Stock became negative for product {product_to_update.id} during update.")
                  db.rollback()
-                 raise ValueError(f"Stock became negative for product {product_to_update.id}. Aborting.")
+                 return None, f"Insufficient stock for product ID {product_to_update.id}: the order needs more than is available."
 
-            db.add(item_model)
             db.add(product_to_update)
+        taken_unlocked = [
+            product_id for product_id in sorted(products_to_update)
+            if product_id in sharded or product_id in warehoused]
+        oversold = crud.crud_reservation.get_oversold_products(db, taken_unlocked)
+        if oversold:
+            print(f"  ERROR: Stock of product {oversold[0]} no longer covers its reservations.")
+            db.rollback()
+            return None, f"Insufficient stock for product ID {oversold[0]}: the order needs more than is available."
         print("Items linked, quantities updated in session.")
 
 
@@ -98,16 +157,50 @@ def create_order(db: Session, order_in: OrderCreate) -> Tuple[Optional[OrderMode
              db.rollback()
              raise ValueError("Failed to obtain Order ID after flush.")
 
-        print(f"5. Creating {len(log_creation_data)} inventory log entries...")
-        for log_data in log_creation_data:
-            crud.crud_inventory.create_inventory_log(
-                db=db,
-                product_id=log_data["product_id"],
-                change_amount=log_data["change_amount"],
-                reason=log_data["reason"],
-                order_id=db_order.id # Use the flushed Order ID
-            )
-        print("Inventory log entries prepared.")
+        if reserve:
+            print(f"5. Reserving stock for {len(order_items_instances)} items...")
+            expires_at = crud.crud_reservation.reservation_expiry()
+            for item_model in order_items_instances:
+                if not crud.crud_reservation.reserve_stock(
+                        db, db_order.id, item_model.product_id, item_model.quantity, expires_at):
+                    product_id, required = item_model.product_id, item_model.quantity
+                    db.rollback()
+                    _, on_hand, held = crud.crud_reservation.get_stock_availability(db, [product_id])[0]
+                    print(f"  ERROR: Insufficient stock for product ID {product_id}.")
+                    return None, f"Insufficient stock for product ID {product_id}. Available: {on_hand - held}, Required: {required}."
+            print("Stock reserved.")
+        else:
+            print(f"5. Creating {len(log_creation_data)} inventory log entries...")
+            # Each log records the quantity left after its own take, so a product
+            # listed twice gets two running totals: start from the stock before
+            # this order and count down.
+            quantities = _unlocked_stock_totals(db, products_to_update, sharded, warehoused)
+            for product_id, product in products_to_update.items():
+                quantities.setdefault(product_id, product.quantity)
+            for log_data in log_creation_data:
+                quantities[log_data["product_id"]] -= log_data["change_amount"]
+            for index, log_data in enumerate(log_creation_data):
+                # Warehouse stock is logged once per warehouse it came from.
+                for warehouse_id, amount in allocations.get(index, [(None, -log_data["change_amount"])]):
+                    quantities[log_data["product_id"]] -= amount
+                    crud.crud_inventory.create_inventory_log(
+                        db=db,
+                        product_id=log_data["product_id"],
+                        change_amount=-amount,
+                        reason=log_data["reason"],
+                        order_id=db_order.id, # Use the flushed Order ID
+                        new_quantity=quantities[log_data["product_id"]],
+                        warehouse_id=warehouse_id
+                    )
+            sold: Dict[int, int] = {}
+            for item_model in order_items_instances:
+                sold[item_model.product_id] = sold.get(item_model.product_id, 0) + item_model.quantity
+            crud.crud_sales_velocity.record_sales_after_commit(db, sold)
+            print("Inventory log entries prepared.")
+
+        adjust_counters(db, {(ORDERS_BY_STATUS, status_key(db_order.status)): 1})
+        # Taken stock, sharded and per warehouse included, changes on-hand quantities.
+        bus.publish(db, *(("orders",) if reserve else ("orders", "products")))
 
         print("6. Committing transaction...")
         db.commit()
@@ -123,28 +216,160 @@ def create_order(db: Session, order_in: OrderCreate) -> Tuple[Optional[OrderMode
         traceback.print_exc() 
         print("-------------------------------------------------------------")
         return None, f"An unexpected error occurred during order creation: {e}"
-def get_order(db: Session, order_id: int) -> Optional[OrderModel]:
+
+def _unlocked_stock_totals(db: Session, product_ids, sharded: Dict[int, int], warehoused: Dict[int, int]) -> Dict[int, int]:
+    """Current shard totals of the sharded products and warehouse totals of the warehoused ones."""
+    totals = crud.crud_stock_shards.get_shard_totals(
+        db, [product_id for product_id in product_ids if product_id in sharded])
+    totals.update(crud.crud_warehouse_stock.get_warehouse_totals(
+        db, [product_id for product_id in product_ids if product_id in warehoused]))
+    return totals
+def _order_items_options():
     """
-    Retrieves a single order by ID, eagerly loading items and their products.
+    Loads items with one IN query per page and each distinct product once;
+    categories come from the in-memory category map (``_attach_products``).
     """
-    order = (
-        db.query(OrderModel)
-        .options(
-            joinedload(OrderModel.order_items).joinedload(OrderItemModel.product).joinedload(ProductModel.category)
-        )
-        .filter(OrderModel.id == order_id)
-        .first()
+    return (
+        selectinload(OrderModel.order_items)
+        .selectinload(OrderItemModel.product)
+        .undefer(ProductModel.on_hand_quantity)
     )
 
-    # --- ADD THIS BLOCK ---
-    if order and order.order_items:
-        for item in order.order_items:
-            if item.product: # Check if product loaded
-                _add_low_stock_flag(item.product)
-    # --- END BLOCK ---
+def _attach_products(db: Session, orders: List[OrderModel]) -> None:
+    products = {
+        item.product.id: item.product
+        for order in orders
+        for item in order.order_items
+        if item.product is not None
+    }
+    crud.crud_category.attach_categories(db, products.values())
+    for product in products.values():
+        _add_low_stock_flag(product)
+
+_order_by_id = (
+    select(OrderModel)
+    .options(_order_items_options())
+    .where(OrderModel.id == bindparam("order_id"))
+)
+
+def _get_live_order(db: Session, order_id: int) -> Optional[OrderModel]:
+    order = db.execute(_order_by_id, {"order_id": order_id}).scalars().first()
+
+    if order:
+        _attach_products(db, [order])
 
     return order
 
+def _archived_order_models(db: Session, records: List[Dict[str, Any]]) -> List[OrderModel]:
+    """
+    Transient (never added to the session) Order / OrderItem objects for
+    archived orders, their products loaded with one IN query.
+    """
+    product_ids = {item["product_id"] for record in records for item in record["order_items"]}
+    products = {}
+    if product_ids:
+        products = {
+            product.id: product
+            for product in db.execute(
+                select(ProductModel)
+                .options(undefer(ProductModel.on_hand_quantity))
+                .where(ProductModel.id.in_(product_ids))
+            ).scalars()
+        }
+    orders = []
+    for record in records:
+        order = OrderModel(**{key: value for key, value in record.items() if key != "order_items"})
+        order.order_items = [
+            OrderItemModel(**item, product=products.get(item["product_id"])) for item in record["order_items"]
+        ]
+        orders.append(order)
+    _attach_products(db, orders)
+    return orders
+
+def get_order(db: Session, order_id: int) -> Optional[OrderModel]:
+    """
+    Retrieves a single order by ID, eagerly loading items and their products.
+    Falls back to the order archive (see crud_archive); an archived order is
+    returned as a read-only object outside the session.
+    """
+    order = _get_live_order(db, order_id)
+    if order is None:
+        record = crud.crud_archive.get_archived_order(db, order_id)
+        if record is not None:
+            order = _archived_order_models(db, [record])[0]
+    return order
+
+def _archive_reached(
+    db: Session,
+    page_dates: List[datetime.datetime],
+    limit: int,
+    start_date: Optional[datetime.date] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    status: Optional[OrderStatusEnum] = None
+) -> bool:
+    """
+    Whether archived orders can belong on a page of live orders whose dates
+    are ``page_dates``, newest first. The archive is searched by date and
+    status only, and only when the live page is short or reaches back to the
+    newest archived order.
+    """
+    if product_id is not None or category_id is not None:
+        return False
+    if status is not None and status not in crud.crud_archive.ARCHIVABLE_STATUSES:
+        return False
+    newest = crud.crud_archive.get_newest_archived_date(db)
+    if newest is None:
+        return False
+    newest = _as_utc(newest)
+    if start_date and datetime.datetime.combine(start_date, datetime.time(), tzinfo=datetime.timezone.utc) > newest:
+        return False
+    return len(page_dates) < limit or _as_utc(page_dates[-1]) <= newest
+
+def _merge_pages(live: list, archived: list, skip: int, limit: int, order_date) -> list:
+    """Page ``skip``/``limit`` of the first ``skip + limit`` live and archived orders, newest first."""
+    merged = sorted(live + archived, key=lambda order: _as_utc(order_date(order)), reverse=True)
+    return merged[skip:skip + limit]
+
+
+def _orders_query(
+    db: Session,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    status: Optional[OrderStatusEnum] = None
+):
+    query = db.query(OrderModel).options(_order_items_options())
+    query = query.filter(*_order_filters(start_date, end_date, product_id, category_id, status))
+    return query.order_by(OrderModel.order_date.desc())
+
+def _order_filters(
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    status: Optional[OrderStatusEnum] = None
+) -> list:
+    filters = []
+    if start_date:
+        filters.append(OrderModel.order_date >= start_date)
+    if end_date:
+        filters.append(OrderModel.order_date < (end_date + datetime.timedelta(days=1)))
+    if status:
+        filters.append(OrderModel.status == status)
+
+    # Semi-joins through ix_order_items_product_id_order_id: no duplicate
+    # orders, so no DISTINCT over the eagerly loaded rows.
+    if product_id is not None:
+        filters.append(OrderModel.id.in_(
+            select(OrderItemModel.order_id).where(OrderItemModel.product_id == product_id)))
+    if category_id is not None:
+        filters.append(OrderModel.id.in_(
+            select(OrderItemModel.order_id)
+            .join(ProductModel, ProductModel.id == OrderItemModel.product_id)
+            .where(ProductModel.category_id == category_id)))
+    return filters
 
 def get_orders(
     db: Session,
@@ -158,87 +383,395 @@ def get_orders(
 ) -> List[OrderModel]:
     """
     Retrieves a list of orders with filtering and pagination.
-    Eagerly loads items and their products.
+    Eagerly loads items and their products. Archived orders matching the
+    date and status filters are merged in where they belong by date, as
+    read-only objects outside the session.
     """
-    query = db.query(OrderModel).options(
-         joinedload(OrderModel.order_items).joinedload(OrderItemModel.product).joinedload(ProductModel.category)
-    )
-
-    if start_date:
-        query = query.filter(OrderModel.order_date >= start_date)
-    if end_date:
-        query = query.filter(OrderModel.order_date < (end_date + datetime.timedelta(days=1)))
-    if status:
-        query = query.filter(OrderModel.status == status)
-
-    needs_join = product_id is not None or category_id is not None
-    if needs_join:
-        query = query.distinct() 
-
-    orders = query.order_by(OrderModel.order_date.desc()).offset(skip).limit(limit).all()
-
-    for order in orders:
-        if order.order_items:
-            for item in order.order_items:
-                if item.product:
-                    _add_low_stock_flag(item.product)
+    query = _orders_query(db, start_date, end_date, product_id, category_id, status)
+    orders = query.offset(skip).limit(limit).all()
+    if _archive_reached(db, [order.order_date for order in orders], limit, start_date, product_id, category_id, status):
+        archived = _archived_order_models(
+            db, crud.crud_archive.get_archived_orders(db, skip + limit, start_date, end_date, status))
+        live = query.limit(skip + limit).all() if skip else orders
+        orders = _merge_pages(live, archived, skip, limit, lambda order: order.order_date)
+    _attach_products(db, orders)
 
     return orders
 
-def update_order_status(db: Session, order_id: int, new_status: OrderStatusEnum) -> Optional[OrderModel]:
-    """ Updates the status of an order. """
-    db_order = db.query(OrderModel).filter(OrderModel.id == order_id).first()
-    if db_order:
-        db_order.status = new_status
-        db.commit()
-        db.refresh(db_order)
-        return db_order
-    return None
-def delete_order(db: Session, order_id: int) -> Optional[OrderModel]:
-    """ Deletes an order. Associated items are deleted via cascade. """
-    db_order = get_order(db, order_id) 
-    if db_order:
-        db.delete(db_order)
-        db.commit()
-        return db_order
-    return None
-
-
-def get_revenue_summary(
+def get_order_rows(
     db: Session,
-    period: str, 
+    skip: int = 0,
+    limit: int = 100,
     start_date: Optional[datetime.date] = None,
     end_date: Optional[datetime.date] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    status: Optional[OrderStatusEnum] = None
 ) -> List[Dict[str, Any]]:
-    """ Calculates total revenue grouped by the specified period (SQLite compatible). """
-    period_format_map = {
-        "daily": "%Y-%m-%d",
-        "weekly": "%Y-%W",  
-        "monthly": "%Y-%m",
-        "annual": "%Y",
-    }
-    strftime_format = period_format_map.get(period.lower())
-    if not strftime_format:
-        raise ValueError("Invalid period specified. Use 'daily', 'weekly', 'monthly', or 'annual'.")
+    """
+    Same orders as ``get_orders`` for read-only responses, as plain dicts
+    shaped like schemas.Order instead of ORM objects: the page of orders, its
+    items (one IN query) and their distinct products (one IN query, with
+    is_low_stock computed in SQL) are Core selects, joined up in Python.
+    Categories come from the category map. Archived orders are merged in as
+    in ``get_orders``, their items read from the archive.
+    """
+    statement = (
+        select(OrderModel.id, OrderModel.order_date, OrderModel.total_amount, OrderModel.status)
+        .where(*_order_filters(start_date, end_date, product_id, category_id, status))
+        .order_by(OrderModel.order_date.desc())
+    )
+    orders = [row._asdict() for row in db.execute(statement.offset(skip).limit(limit))]
+    if _archive_reached(db, [order["order_date"] for order in orders], limit, start_date, product_id, category_id, status):
+        archived = [
+            {key: record[key] for key in ("id", "order_date", "total_amount", "status", "order_items")}
+            for record in crud.crud_archive.get_archived_orders(db, skip + limit, start_date, end_date, status)
+        ]
+        live = [row._asdict() for row in db.execute(statement.limit(skip + limit))] if skip else orders
+        orders = _merge_pages(live, archived, skip, limit, lambda order: order["order_date"])
+    if not orders:
+        return orders
+
+    orders_by_id = {}
+    for order in orders:
+        if "order_items" not in order:  # archived orders come with theirs
+            order["order_items"] = []
+            orders_by_id[order["id"]] = order
+    if orders_by_id:
+        for row in db.execute(
+            select(
+                OrderItemModel.id, OrderItemModel.order_id, OrderItemModel.product_id,
+                OrderItemModel.quantity, OrderItemModel.price_per_unit,
+            )
+            .where(OrderItemModel.order_id.in_(list(orders_by_id)))
+            .order_by(OrderItemModel.id)
+        ):
+            item = row._asdict()
+            orders_by_id[item["order_id"]]["order_items"].append(item)
+    items = [item for order in orders for item in order["order_items"]]
+    product_ids = {item["product_id"] for item in items}
+    products = {}
+    if product_ids:
+        rows = db.execute(select(*PRODUCT_ROW_COLUMNS).where(ProductModel.id.in_(product_ids))).all()
+        products = {product["id"]: product for product in _product_dicts(db, rows)}
+    for item in items:
+        item["product"] = products.get(item["product_id"])
+    return orders
 
-    query = select(
-        func.strftime(strftime_format, OrderModel.order_date).label("period_label"),
-        func.sum(OrderModel.total_amount).label("total_revenue")
-    ).group_by("period_label").order_by("period_label")
+def iter_orders(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    batch_size: int = 500,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+    product_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    status: Optional[OrderStatusEnum] = None
+) -> Iterator[List[OrderModel]]:
+    """
+    Same rows as ``get_orders``, yielded in batches of ``batch_size`` from one
+    cursor (items are selectin-loaded per batch). The session only holds
+    unmodified rows weakly, so once the caller drops a batch memory stays
+    bounded by the batch size rather than by ``limit``. Archived orders are
+    not streamed.
+    """
+    query = _orders_query(db, start_date, end_date, product_id, category_id, status)
+    statement = query.offset(skip).limit(limit).statement.execution_options(yield_per=batch_size)
+    for batch in db.execute(statement).scalars().partitions():
+        _attach_products(db, batch)
+        yield batch
+
+# Allowed status changes. Completing takes the reserved stock, cancelling
+# releases the reservation or returns the stock taken; a cancelled order is
+# final because its stock may already have been sold again.
+ORDER_STATUS_TRANSITIONS: Dict[OrderStatusEnum, set] = {
+    OrderStatusEnum.PENDING: {OrderStatusEnum.COMPLETED, OrderStatusEnum.CANCELLED},
+    OrderStatusEnum.COMPLETED: {OrderStatusEnum.CANCELLED},
+    OrderStatusEnum.CANCELLED: set(),
+}
+
+def update_orders_status(
+    db: Session,
+    order_ids: List[int],
+    new_status: OrderStatusEnum
+) -> Tuple[Optional[Dict[str, List[int]]], str]:
+    """
+    Moves many orders to ``new_status`` in one transaction, all or nothing.
+    Orders already in ``new_status`` are left untouched. The status change is
+    one set-based UPDATE. Completing pending orders converts their stock
+    reservations into SALEs; cancelling releases reservations and returns the
+    stock that was sold. Either way quantities are aggregated per product,
+    written with one executemany UPDATE, and the logs are inserted in bulk.
+    Returns ({"updated": [...], "unchanged": [...]}, "") or (None, error message).
+    """
+    order_ids = sorted(set(order_ids))
+    if not order_ids:
+        return None, "At least one order ID is required."
 
-    query = query.where(OrderModel.status == OrderStatusEnum.COMPLETED)
-    if start_date:
-        query = query.where(OrderModel.order_date >= start_date)
-    if end_date:
-        query = query.where(OrderModel.order_date < (end_date + datetime.timedelta(days=1)))
+    try:
+        current = dict(db.execute(
+            select(OrderModel.id, OrderModel.status)
+            .where(OrderModel.id.in_(order_ids))
+            .order_by(OrderModel.id)
+            .with_for_update()
+        ).all())
+
+        missing_ids = [order_id for order_id in order_ids if order_id not in current]
+        if missing_ids:
+            db.rollback()
+            return None, f"Order(s) with ID {', '.join(map(str, missing_ids))} not found."
+
+        unchanged = [order_id for order_id in order_ids if current[order_id] == new_status]
+        to_update = [order_id for order_id in order_ids if current[order_id] != new_status]
+        invalid = [
+            f"{order_id} ({current[order_id].value} -> {new_status.value})"
+            for order_id in to_update
+            if new_status not in ORDER_STATUS_TRANSITIONS[current[order_id]]
+        ]
+        if invalid:
+            db.rollback()
+            return None, f"Invalid status transition for order(s): {', '.join(invalid)}."
+
+        if to_update:
+            db.execute(
+                update(OrderModel)
+                .where(OrderModel.id.in_(to_update))
+                .values(status=new_status, updated_at=datetime.datetime.now(datetime.timezone.utc))
+                .execution_options(synchronize_session="fetch")
+            )
+            status_counts = {}
+            for order_id in to_update:
+                add_delta(status_counts, ORDERS_BY_STATUS, status_key(current[order_id]), -1)
+            add_delta(status_counts, ORDERS_BY_STATUS, status_key(new_status), len(to_update))
+            adjust_counters(db, status_counts)
+            if new_status == OrderStatusEnum.COMPLETED:
+                error_message = _take_stock_for_orders(db, to_update)
+                if error_message:
+                    db.rollback()
+                    return None, error_message
+            elif new_status == OrderStatusEnum.CANCELLED:
+                crud.crud_reservation.release_reservations(db, to_update)
+                _return_stock_for_orders(db, to_update)
+            revenue_changed = [
+                order_id for order_id in to_update
+                if OrderStatusEnum.COMPLETED in (current[order_id], new_status)
+            ]
+            crud.crud_sales_series.invalidate_closed_sales(db, revenue_changed)
+            crud.crud_revenue.invalidate_closed_revenue(db, revenue_changed)
+            bus.publish(db, "orders", "products")
+        db.commit()
+        return {"updated": to_update, "unchanged": unchanged}, ""
 
-    results = db.execute(query).mappings().all() 
+    except Exception as e:
+        db.rollback()
+        print(f"Error updating status of {len(order_ids)} orders: {e}")
+        return None, f"An unexpected error occurred during status update: {e}"
+
+def _sold_order_ids(db: Session, order_ids: List[int]) -> set:
+    """Orders whose stock has already been taken, i.e. that have SALE logs."""
+    return set(db.execute(
+        select(InventoryLogModel.order_id)
+        .where(
+            InventoryLogModel.order_id.in_(order_ids),
+            InventoryLogModel.reason == InventoryLogReasonEnum.SALE,
+        )
+        .distinct()
+    ).scalars())
 
-    formatted_results = []
-    for row in results:
-        formatted_results.append({
-            "period": row["period_label"], 
-            "total_revenue": row["total_revenue"]
+def _take_stock_for_orders(db: Session, order_ids: List[int]) -> str:
+    """
+    Completes pending orders: drops their reservations and takes the items
+    from stock, logged as SALE per (order, product). Stock must still be
+    available net of other orders' active reservations, which also covers
+    orders whose reservation has expired. Orders that already took their
+    stock (placed before reservations existed) are skipped. Sharded stock is
+    checked against its unlocked shard total and taken per (order, product)
+    from the shards; warehouse stock likewise, allocated across warehouses
+    and logged per warehouse. Both are checked again against the reservations
+    once taken (see crud_reservation). Sold quantities also feed the products' sales
+    velocity once the caller commits.
+    Must run inside the caller's transaction; returns an error message, or ""
+    on success.
+    """
+    crud.crud_reservation.release_reservations(db, order_ids)
+    sold = _sold_order_ids(db, order_ids)
+    needed = db.execute(
+        select(OrderItemModel.order_id, OrderItemModel.product_id, func.sum(OrderItemModel.quantity))
+        .where(OrderItemModel.order_id.in_([order_id for order_id in order_ids if order_id not in sold]))
+        .group_by(OrderItemModel.order_id, OrderItemModel.product_id)
+        .order_by(OrderItemModel.order_id, OrderItemModel.product_id)
+    ).all()
+    if not needed:
+        return ""
+
+    product_ids = sorted({product_id for _, product_id, _ in needed})
+    sharded = crud.crud_stock_shards.get_sharded_products(db)
+    warehoused = crud.crud_warehouse_stock.get_warehouse_products(db)
+    quantities = _stock_quantities_for_update(db, product_ids, sharded, warehoused)
+    missing_ids = [product_id for product_id in product_ids if product_id not in quantities]
+    if missing_ids:
+        return f"Product(s) with ID {', '.join(map(str, missing_ids))} not found."
+
+    reserved = crud.crud_reservation.get_reserved_quantities(db, product_ids)
+    totals: Dict[int, int] = {}
+    for _, product_id, quantity in needed:
+        totals[product_id] = totals.get(product_id, 0) + quantity
+    short = [
+        f"product ID {product_id} (available {quantities[product_id] - reserved.get(product_id, 0)}, required {total})"
+        for product_id, total in sorted(totals.items())
+        if quantities[product_id] - reserved.get(product_id, 0) < total
+    ]
+    if short:
+        return f"Insufficient stock to complete order(s): {', '.join(short)}."
+
+    logs = []
+    for order_id, product_id, quantity in needed:
+        allocation = [(None, quantity)]
+        if product_id in sharded and not crud.crud_stock_shards.take_stock(db, product_id, quantity, sharded[product_id]):
+            return f"Insufficient stock to complete order(s): product ID {product_id} ran out while completing."
+        if product_id in warehoused:
+            allocation = crud.crud_warehouse_stock.take_stock(db, product_id, quantity)
+            if allocation is None:
+                return f"Insufficient stock to complete order(s): product ID {product_id} ran out while completing."
+        for warehouse_id, amount in allocation:
+            quantities[product_id] -= amount
+            logs.append({
+                "product_id": product_id,
+                "change_amount": -amount,
+                "new_quantity": quantities[product_id],
+                "reason": InventoryLogReasonEnum.SALE,
+                "order_id": order_id,
+                "warehouse_id": warehouse_id,
+                "notes": None,
+            })
+    oversold = crud.crud_reservation.get_oversold_products(
+        db, [product_id for product_id in product_ids if product_id in sharded or product_id in warehoused])
+    if oversold:
+        return f"Insufficient stock to complete order(s): product ID {oversold[0]} is reserved by other orders."
+    _write_stock_changes(db, quantities, logs, {**sharded, **warehoused})
+    crud.crud_sales_velocity.record_sales_after_commit(db, totals)
+    return ""
+
+def _return_stock_for_orders(db: Session, order_ids: List[int]) -> None:
+    """
+    Puts back what cancelled orders took from stock (their SALE logs; a pending
+    order that only held a reservation has none) and logs each (order, product,
+    warehouse) as a RETURN. Warehouse stock goes back to the warehouse it was
+    taken from. Must run inside the caller's transaction.
+    """
+    returned = db.execute(
+        select(
+            InventoryLogModel.order_id,
+            InventoryLogModel.product_id,
+            InventoryLogModel.warehouse_id,
+            (-func.sum(InventoryLogModel.change_amount)).label("quantity"),
+        )
+        .where(
+            InventoryLogModel.order_id.in_(order_ids),
+            InventoryLogModel.reason == InventoryLogReasonEnum.SALE,
+        )
+        .group_by(InventoryLogModel.order_id, InventoryLogModel.product_id, InventoryLogModel.warehouse_id)
+        .order_by(InventoryLogModel.order_id, InventoryLogModel.product_id, InventoryLogModel.warehouse_id)
+    ).all()
+    if not returned:
+        return
+
+    product_ids = sorted({product_id for _, product_id, _, _ in returned})
+    sharded = crud.crud_stock_shards.get_sharded_products(db)
+    warehoused = crud.crud_warehouse_stock.get_warehouse_products(db)
+    quantities = _stock_quantities_for_update(db, product_ids, sharded, warehoused)
+
+    logs = []
+    for order_id, product_id, warehouse_id, quantity in returned:
+        if product_id not in quantities:
+            continue  # product deleted since the order was placed
+        if product_id in warehoused:
+            # Stock sold before the product moved to warehouses goes to the first one.
+            warehouse_id = crud.crud_warehouse_stock.add_stock(db, product_id, quantity, warehouse_id)
+        else:
+            warehouse_id = None
+            if product_id in sharded:
+                crud.crud_stock_shards.add_stock(db, product_id, quantity, sharded[product_id])
+        quantities[product_id] += quantity
+        logs.append({
+            "product_id": product_id,
+            "change_amount": quantity,
+            "new_quantity": quantities[product_id],
+            "reason": InventoryLogReasonEnum.RETURN,
+            "order_id": order_id,
+            "warehouse_id": warehouse_id,
+            "notes": "Order cancelled",
         })
+    _write_stock_changes(db, quantities, logs, {**sharded, **warehoused})
 
-    return formatted_results
+def _stock_quantities_for_update(
+    db: Session,
+    product_ids: List[int],
+    sharded: Dict[int, int],
+    warehoused: Dict[int, int]
+) -> Dict[int, int]:
+    """
+    Current quantity per existing product: locked product rows for products
+    with plain stock, unlocked shard or warehouse totals for the others (their
+    shard and warehouse rows are updated row by row instead; their product
+    rows are only share-locked while unreserved, see crud_reservation).
+    """
+    stocked_elsewhere = [product_id for product_id in product_ids if product_id in sharded or product_id in warehoused]
+    crud.crud_reservation.lock_products(db, product_ids, stocked_elsewhere)
+    quantities = dict(db.execute(
+        select(ProductModel.id, ProductModel.quantity)
+        .where(ProductModel.id.in_([product_id for product_id in product_ids if product_id not in stocked_elsewhere]))
+    ).all())
+    quantities.update(_unlocked_stock_totals(db, product_ids, sharded, warehoused))
+    return quantities
+
+def _write_stock_changes(
+    db: Session,
+    quantities: Dict[int, int],
+    logs: List[Dict[str, Any]],
+    stocked_elsewhere: Dict[int, int]
+) -> None:
+    """
+    New quantities of products with plain stock in one executemany UPDATE,
+    the logs in one bulk INSERT. Products in ``stocked_elsewhere`` (sharded or
+    stocked per warehouse) already had their shard or warehouse rows written.
+    """
+    if not logs:
+        return
+    rows = [
+        {"id": product_id, "quantity": quantity}
+        for product_id, quantity in sorted(quantities.items())
+        if product_id not in stocked_elsewhere
+    ]
+    if rows:
+        db.execute(update(ProductModel), rows)
+    db.execute(insert(InventoryLogModel), logs)
+    log_counts = {}
+    for log in logs:
+        add_delta(log_counts, LOGS_BY_PRODUCT, log["product_id"])
+    adjust_counters(db, log_counts)
+
+def update_order_status(db: Session, order_id: int, new_status: OrderStatusEnum) -> Tuple[Optional[OrderModel], str]:
+    """ Updates the status of an order, returning its stock if it is cancelled. """
+    result, error_message = update_orders_status(db, [order_id], new_status)
+    if result is None:
+        return None, error_message
+    return db.get(OrderModel, order_id), ""
+def delete_order(db: Session, order_id: int) -> Optional[OrderModel]:
+    """
+    Deletes an order. Associated items are deleted via cascade, its stock
+    reservations explicitly. Archived orders cannot be deleted.
+    """
+    db_order = _get_live_order(db, order_id)
+    if db_order:
+        crud.crud_reservation.release_reservations(db, [order_id])
+        if db_order.status == OrderStatusEnum.COMPLETED:
+            crud.crud_sales_series.invalidate_closed_sales(db, [order_id])
+            crud.crud_revenue.invalidate_closed_revenue(db, [order_id])
+        db.delete(db_order)
+        adjust_counters(db, {(ORDERS_BY_STATUS, status_key(db_order.status)): -1})
+        bus.publish(db, "orders")
+        db.commit()
+        return db_order
+    return None
@@ -1,29 +1,58 @@
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session, joinedload, undefer
+from sqlalchemy.orm.attributes import set_committed_value
+from pydantic import ValidationError
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import datetime
 
 from app import crud
+from app.db.invalidation import bus
 from app.models.enums import InventoryLogReasonEnum
 from app.models.product import Product as ProductModel
 from app.models.category import Category as CategoryModel 
-from app.schemas.product import ProductCreate, ProductUpdate
+from app.models.inventory_log import InventoryLog as InventoryLogModel
+from app.schemas.product import ProductCreate, ProductUpdate, ProductImportRow, ProductImportError, ProductImportSummary
 from app.core.config import settings
+from .crud_counters import LOGS_BY_PRODUCT, PRODUCTS_BY_CATEGORY, add_delta, adjust_counters
 
 def _add_low_stock_flag(product: ProductModel):
-    """Adds the is_low_stock attribute to a product model instance."""
+    """
+    Adds the is_low_stock attribute to a product model instance and shows its
+    on-hand stock as quantity (see ``ProductModel.on_hand_quantity``).
+    """
     if product:
+        if product.on_hand_quantity != product.quantity:
+            set_committed_value(product, "quantity", product.on_hand_quantity)
         product.is_low_stock = product.quantity < settings.LOW_STOCK_THRESHOLD
     return product
+# Hot lookups are built once at import; each call only binds parameters, so
+# SQLAlchemy skips statement construction and reuses the compiled form.
+_product_by_id = (
+    select(ProductModel)
+    .options(joinedload(ProductModel.category), undefer(ProductModel.on_hand_quantity))
+    .where(ProductModel.id == bindparam("product_id"))
+)
+product_by_id_for_update = (
+    select(ProductModel)
+    .where(ProductModel.id == bindparam("product_id"))
+    .with_for_update()
+)
+
 def get_product(db: Session, product_id: int) -> Optional[ProductModel]:
     """
     Retrieves a single product by its ID, eagerly loading the category,
     and adds the is_low_stock flag.
     """
-    product = db.query(ProductModel).options(
-        joinedload(ProductModel.category)
-    ).filter(ProductModel.id == product_id).first()
+    product = db.execute(_product_by_id, {"product_id": product_id}).scalars().first()
 
     return _add_low_stock_flag(product) 
 
+def get_product_by_sku(db: Session, sku: str) -> Optional[ProductModel]:
+    """
+    Retrieves a single product by its SKU. Useful for checking uniqueness.
+    """
+    return db.query(ProductModel).filter(ProductModel.sku == sku).first()
+
 def get_products(
     db: Session,
     skip: int = 0,
@@ -36,19 +65,89 @@ def get_products(
     eagerly loading categories, and adds the is_low_stock flag to each.
     Can filter by low_stock status.
     """
-    query = db.query(ProductModel).options(joinedload(ProductModel.category))
+    products = _products_query(db, category_id, low_stock).offset(skip).limit(limit).all() 
+
+    return [_add_low_stock_flag(p) for p in products]
 
+def _product_filters(category_id: Optional[int] = None, low_stock: Optional[bool] = None) -> list:
+    filters = []
     if category_id is not None:
-        query = query.filter(ProductModel.category_id == category_id)
+        filters.append(ProductModel.category_id == category_id)
 
     if low_stock is True:
-        query = query.filter(ProductModel.quantity < settings.LOW_STOCK_THRESHOLD)
+        filters.append(ProductModel.on_hand_quantity < settings.LOW_STOCK_THRESHOLD)
     elif low_stock is False:
-        query = query.filter(ProductModel.quantity >= settings.LOW_STOCK_THRESHOLD)
+        filters.append(ProductModel.on_hand_quantity >= settings.LOW_STOCK_THRESHOLD)
+    return filters
 
-    products = query.order_by(ProductModel.name).offset(skip).limit(limit).all() 
+def _products_query(db: Session, category_id: Optional[int] = None, low_stock: Optional[bool] = None):
+    query = db.query(ProductModel).options(joinedload(ProductModel.category), undefer(ProductModel.on_hand_quantity))
+    return query.filter(*_product_filters(category_id, low_stock)).order_by(ProductModel.name)
 
-    return [_add_low_stock_flag(p) for p in products]
+# Columns of the row read path: everything schemas.Product needs except the
+# category, with quantity (on hand) and is_low_stock computed by the database.
+PRODUCT_ROW_COLUMNS = (
+    ProductModel.id,
+    ProductModel.sku,
+    ProductModel.name,
+    ProductModel.description,
+    ProductModel.price,
+    ProductModel.on_hand_quantity.label("quantity"),
+    ProductModel.category_id,
+    ProductModel.created_at,
+    ProductModel.updated_at,
+    (ProductModel.on_hand_quantity < settings.LOW_STOCK_THRESHOLD).label("is_low_stock"),
+)
+
+def _product_dicts(db: Session, rows) -> List[Dict[str, Any]]:
+    """Turns PRODUCT_ROW_COLUMNS rows into schemas.Product-shaped dicts, categories from the category map."""
+    products = [row._asdict() for row in rows]
+    categories = crud.crud_category.get_category_rows(db, {product["category_id"] for product in products})
+    for product in products:
+        product["is_low_stock"] = bool(product["is_low_stock"])
+        product["category"] = categories.get(product["category_id"])
+    return products
+
+def get_product_rows(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    category_id: Optional[int] = None,
+    low_stock: Optional[bool] = None
+) -> List[Dict[str, Any]]:
+    """
+    Same products as ``get_products`` for read-only responses, without ORM
+    objects: one Core select whose rows become plain dicts shaped like
+    schemas.Product, ready for validation and serialization. No identity map,
+    no attribute instrumentation, no per-object is_low_stock assignment.
+    """
+    rows = db.execute(
+        select(*PRODUCT_ROW_COLUMNS)
+        .where(*_product_filters(category_id, low_stock))
+        .order_by(ProductModel.name)
+        .offset(skip).limit(limit)
+    ).all()
+    return _product_dicts(db, rows)
+
+def iter_products(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    batch_size: int = 500,
+    category_id: Optional[int] = None,
+    low_stock: Optional[bool] = None
+) -> Iterator[List[ProductModel]]:
+    """
+    Same rows as ``get_products``, yielded in batches of ``batch_size`` from one
+    cursor, so memory is bounded by the batch size (see ``iter_orders``).
+    """
+    statement = (
+        _products_query(db, category_id, low_stock)
+        .offset(skip).limit(limit)
+        .statement.execution_options(yield_per=batch_size)
+    )
+    for batch in db.execute(statement).scalars().partitions():
+        yield [_add_low_stock_flag(p) for p in batch]
 
 
 def create_product(db: Session, product: ProductCreate) -> ProductModel:
@@ -61,6 +160,7 @@ def create_product(db: Session, product: ProductCreate) -> ProductModel:
         return None
 
     db_product = ProductModel(
+        sku=product.sku,
         name=product.name,
         description=product.description,
         price=product.price,
@@ -68,12 +168,17 @@ def create_product(db: Session, product: ProductCreate) -> ProductModel:
         category_id=product.category_id
     )
     db.add(db_product)
+    adjust_counters(db, {(PRODUCTS_BY_CATEGORY, str(product.category_id)): 1})
+    bus.publish(db, "products")
     db.commit()
     db.refresh(db_product)
     return db_product
 def update_product(db: Session, db_product: ProductModel, product_in: ProductUpdate) -> Optional[ProductModel]:
     """
     Updates an existing product. Logs inventory change if quantity is updated.
+    A new quantity for sharded stock is split evenly over the shards. The
+    quantity of a product stocked per warehouse cannot be changed here, only
+    per warehouse.
     """
     update_data = product_in.model_dump(exclude_unset=True)
 
@@ -86,7 +191,14 @@ def update_product(db: Session, db_product: ProductModel, product_in: ProductUpd
         if not db_category:
             return None 
 
+    shard_count = crud.crud_stock_shards.get_sharded_products(db).get(db_product.id)
+    warehoused = db_product.id in crud.crud_warehouse_stock.get_warehouse_products(db)
     original_quantity = db_product.quantity
+    if shard_count:
+        original_quantity = crud.crud_stock_shards.get_shard_totals(db, [db_product.id]).get(db_product.id, original_quantity)
+    elif warehoused:
+        original_quantity = crud.crud_warehouse_stock.get_warehouse_totals(db, [db_product.id]).get(db_product.id, original_quantity)
+    original_category_id = db_product.category_id
     quantity_changed = False
     new_quantity_value = None
     if "quantity" in update_data:
@@ -96,6 +208,9 @@ def update_product(db: Session, db_product: ProductModel, product_in: ProductUpd
             if new_quantity_value < 0:
                  print(f"Attempted to set negative quantity for product {db_product.id}")
                  return None 
+            if warehoused:
+                 print(f"Attempted to set the total quantity of product {db_product.id}, which is stocked per warehouse")
+                 return None
 
     for field, value in update_data.items():
         setattr(db_product, field, value)
@@ -105,6 +220,8 @@ def update_product(db: Session, db_product: ProductModel, product_in: ProductUpd
 
         if quantity_changed:
             change = new_quantity_value - original_quantity
+            if shard_count:
+                crud.crud_stock_shards.set_stock(db, db_product.id, new_quantity_value)
             crud.crud_inventory.create_inventory_log(
                 db=db,
                 product_id=db_product.id,
@@ -113,6 +230,13 @@ def update_product(db: Session, db_product: ProductModel, product_in: ProductUpd
                 notes=f"Updated via API PATCH /products/{db_product.id}" 
             )
 
+        if db_product.category_id != original_category_id:
+            category_counts = {}
+            add_delta(category_counts, PRODUCTS_BY_CATEGORY, original_category_id, -1)
+            add_delta(category_counts, PRODUCTS_BY_CATEGORY, db_product.category_id)
+            adjust_counters(db, category_counts)
+
+        bus.publish(db, "products")
         db.commit()
         db.refresh(db_product)
         updated_product_with_flag = get_product(db=db, product_id=db_product.id)
@@ -129,7 +253,237 @@ def delete_product(db: Session, product_id: int) -> Optional[ProductModel]:
     """
     db_product = get_product(db=db, product_id=product_id) 
     if db_product:
+        crud.crud_stock_shards.delete_shards(db, product_id)
+        crud.crud_warehouse_stock.delete_stock(db, product_id)
         db.delete(db_product)
+        adjust_counters(db, {(PRODUCTS_BY_CATEGORY, str(db_product.category_id)): -1})
+        bus.publish(db, "products")
         db.commit()
         return db_product
     return None 
+
+_IMPORT_FIELDS = ("name", "description", "price", "category_id")
+_IMPORT_NOTES = "Bulk catalog import"
+
+def _reject_import_row(summary: ProductImportSummary, line: int, sku: Optional[str], error: str, max_errors: int):
+    summary.rejected += 1
+    if len(summary.errors) < max_errors:
+        summary.errors.append(ProductImportError(line=line, sku=sku, error=error))
+
+def import_products(
+    db: Session,
+    records: Iterable[Tuple[int, Any]],
+    chunk_size: int = 1000,
+    max_reported_errors: int = 100
+) -> ProductImportSummary:
+    """
+    Upserts a stream of catalog records by SKU.
+    Category names are resolved from one in-memory map. Records are processed
+    in chunks of ``chunk_size``: per chunk, one query loads and locks the
+    existing products, new products are inserted with one executemany
+    ``INSERT ... ON CONFLICT (sku) DO NOTHING`` (a SKU created concurrently is
+    updated instead), changed ones are updated with one executemany, and
+    quantity changes are logged in bulk (INITIAL_STOCK for new products,
+    ADJUSTMENT for existing ones). Each chunk
+    is committed on its own, so a failure only loses the current chunk.
+    Within a chunk, a later record for the same SKU replaces the earlier one.
+    """
+    summary = ProductImportSummary()
+
+    categories = db.execute(select(CategoryModel.id, CategoryModel.name)).all()
+    category_ids_by_name = {name: category_id for category_id, name in categories}
+    known_category_ids = set(category_ids_by_name.values())
+
+    chunk: Dict[str, Tuple[int, ProductImportRow, int]] = {}
+    for line, record in records:
+        if isinstance(record, Exception):
+            _reject_import_row(summary, line, None, str(record), max_reported_errors)
+            continue
+        try:
+            row = ProductImportRow.model_validate(record)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            message = f"{field}: {error['msg']}" if field else error["msg"]
+            _reject_import_row(summary, line, record.get("sku"), message, max_reported_errors)
+            continue
+
+        if row.category is not None:
+            category_id = category_ids_by_name.get(row.category)
+            if category_id is None:
+                _reject_import_row(summary, line, row.sku, f"Category '{row.category}' not found.", max_reported_errors)
+                continue
+        elif row.category_id in known_category_ids:
+            category_id = row.category_id
+        elif row.category_id is not None:
+            _reject_import_row(summary, line, row.sku, f"Category with ID {row.category_id} not found.", max_reported_errors)
+            continue
+        else:
+            _reject_import_row(summary, line, row.sku, "Either 'category' or 'category_id' is required.", max_reported_errors)
+            continue
+
+        chunk[row.sku] = (line, row, category_id)
+        if len(chunk) >= chunk_size:
+            _upsert_product_chunk(db, chunk, summary, max_reported_errors)
+            chunk = {}
+
+    if chunk:
+        _upsert_product_chunk(db, chunk, summary, max_reported_errors)
+    return summary
+
+def _insert_new_products_statement(db: Session):
+    """INSERT that skips SKUs which already exist: ON CONFLICT (sku) DO NOTHING, or INSERT IGNORE."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        return insert(ProductModel).prefix_with("IGNORE")
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(ProductModel).on_conflict_do_nothing(index_elements=[ProductModel.sku])
+
+def _insert_new_products(db: Session, rows: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Inserts the rows, skipping SKUs created since they were looked up.
+    Returns the new product IDs by SKU, for the rows actually inserted.
+    """
+    stmt = _insert_new_products_statement(db)
+    if db.get_bind().dialect.insert_executemany_returning:
+        return dict(db.execute(stmt.returning(ProductModel.sku, ProductModel.id), rows).all())
+    new_ids = {}
+    for row in rows:
+        result = db.execute(stmt, row)
+        if result.rowcount:
+            new_ids[row["sku"]] = result.inserted_primary_key[0]
+    return new_ids
+
+def _load_existing_products(db: Session, skus: Iterable[str]) -> Dict[str, Any]:
+    """
+    The products with these SKUs, locked in ID order (as orders lock them) so
+    no order or restock commits between this read and the chunk's UPDATE,
+    which writes the quantity back.
+    """
+    return {
+        row.sku: row
+        for row in db.execute(
+            select(
+                ProductModel.id, ProductModel.sku, ProductModel.name, ProductModel.description,
+                ProductModel.price, ProductModel.quantity, ProductModel.category_id
+            )
+            .where(ProductModel.sku.in_(list(skus)))
+            .order_by(ProductModel.id)
+            .with_for_update()
+        ).all()
+    }
+
+def _upsert_product_chunk(
+    db: Session,
+    chunk: Dict[str, Tuple[int, ProductImportRow, int]],
+    summary: ProductImportSummary,
+    max_reported_errors: int
+) -> None:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    inserts, updates, logs = [], [], []
+    shard_writes = {}
+    counts = {}
+    unchanged = 0
+
+    def plan(skus: Iterable[str], existing: Dict[str, Any]) -> None:
+        """Sorts the chunk's rows for ``skus`` into inserts, updates and logs against ``existing``."""
+        nonlocal unchanged
+        # Sharded stock is compared against, and overwritten in, its shards.
+        # Warehouse stock is compared against its total but cannot be overwritten.
+        sharded = crud.crud_stock_shards.get_sharded_products(db)
+        shard_totals = crud.crud_stock_shards.get_shard_totals(
+            db, [row.id for row in existing.values() if row.id in sharded])
+        warehoused = crud.crud_warehouse_stock.get_warehouse_products(db)
+        warehouse_totals = crud.crud_warehouse_stock.get_warehouse_totals(
+            db, [row.id for row in existing.values() if row.id in warehoused])
+        for sku in skus:
+            line, row, category_id = chunk[sku]
+            values = {
+                "name": row.name,
+                "description": row.description,
+                "price": row.price,
+                "category_id": category_id,
+            }
+            current = existing.get(sku)
+            if current is None:
+                inserts.append(dict(values, sku=sku, quantity=row.quantity or 0, updated_at=now))
+                continue
+
+            on_hand = shard_totals.get(current.id, warehouse_totals.get(current.id, current.quantity))
+            quantity = on_hand if row.quantity is None else row.quantity
+            if quantity != on_hand and current.id in warehouse_totals:
+                _reject_import_row(
+                    summary, line, sku,
+                    f"Product ID {current.id} is stocked per warehouse; its quantity cannot be imported.",
+                    max_reported_errors)
+                continue
+            if quantity != on_hand:
+                if current.id in shard_totals:
+                    shard_writes[current.id] = quantity
+                logs.append({
+                    "product_id": current.id,
+                    "change_amount": quantity - on_hand,
+                    "new_quantity": quantity,
+                    "reason": InventoryLogReasonEnum.ADJUSTMENT,
+                    "notes": _IMPORT_NOTES,
+                })
+            elif all(getattr(current, field) == values[field] for field in _IMPORT_FIELDS):
+                unchanged += 1
+                continue
+            if category_id != current.category_id:
+                add_delta(counts, PRODUCTS_BY_CATEGORY, current.category_id, -1)
+                add_delta(counts, PRODUCTS_BY_CATEGORY, category_id)
+            # Same key set on every row keeps this a single executemany.
+            updates.append(dict(values, id=current.id, quantity=quantity, updated_at=now))
+
+    try:
+        plan(list(chunk), _load_existing_products(db, chunk))
+        inserted = []
+        if inserts:
+            new_ids = _insert_new_products(db, inserts)
+            inserted = [row for row in inserts if row["sku"] in new_ids]
+            # SKUs created concurrently since the lookup are updated instead.
+            lost = [row["sku"] for row in inserts if row["sku"] not in new_ids]
+            if lost:
+                inserts.clear()
+                plan(lost, _load_existing_products(db, lost))
+                for row in inserts:
+                    line = chunk[row["sku"]][0]
+                    _reject_import_row(summary, line, row["sku"], "SKU changed during the import.", max_reported_errors)
+            for row in inserted:
+                add_delta(counts, PRODUCTS_BY_CATEGORY, row["category_id"])
+            logs.extend(
+                {
+                    "product_id": new_ids[row["sku"]],
+                    "change_amount": row["quantity"],
+                    "new_quantity": row["quantity"],
+                    "reason": InventoryLogReasonEnum.INITIAL_STOCK,
+                    "notes": _IMPORT_NOTES,
+                }
+                for row in inserted if row["quantity"] > 0
+            )
+        if updates:
+            db.execute(update(ProductModel), updates)
+        for product_id, quantity in shard_writes.items():
+            crud.crud_stock_shards.set_stock(db, product_id, quantity)
+        if logs:
+            db.execute(insert(InventoryLogModel), logs)
+            for log in logs:
+                add_delta(counts, LOGS_BY_PRODUCT, log["product_id"])
+        adjust_counters(db, counts)
+        if inserted or updates:
+            bus.publish(db, "products")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error importing a chunk of {len(chunk)} products: {e}")
+        for sku, (line, _, _) in chunk.items():
+            _reject_import_row(summary, line, sku, f"Chunk failed: {e}", max_reported_errors)
+        return
+
+    summary.inserted += len(inserted)
+    summary.updated += len(updates)
+    summary.unchanged += unchanged
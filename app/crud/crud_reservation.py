@@ -0,0 +1,191 @@
+from sqlalchemy import DateTime, Integer, bindparam, delete, func, insert, select
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+import datetime
+
+from app.core.config import settings
+from app.models.product import Product as ProductModel
+from app.models.stock_reservation import StockReservation as StockReservationModel
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+# Reserved by unexpired reservations of the product being reserved.
+_active_reserved = (
+    select(func.coalesce(func.sum(StockReservationModel.quantity), 0))
+    .where(
+        StockReservationModel.product_id == ProductModel.id,
+        StockReservationModel.expires_at > bindparam("now", type_=DateTime(timezone=True)),
+    )
+    .scalar_subquery()
+)
+
+# Reservations of a product are serialized on its row lock, which sales
+# (create_order, completing orders) take through lock_products before they
+# read reservations. Plain-stock sales take the same exclusive lock. Sales of
+# sharded or warehouse stock take a shared one (FOR SHARE) while the product
+# has no active reservations: no reservation can appear while it is held, so
+# they run concurrently with each other. Once it has some, they take the
+# exclusive lock too, since each only sees its own uncommitted take, and check
+# after taking that the stock left covers them (get_oversold_products). The
+# exclusive lock is FOR NO KEY UPDATE on PostgreSQL, which the KEY SHARE locks
+# of foreign key checks (order items, inventory logs) do not wait for; it
+# refreshes the loaded product, which may have been read before the lock.
+_lock_product = (
+    select(ProductModel)
+    .where(ProductModel.id == bindparam("product_id"))
+    .with_for_update(key_share=True)
+    .execution_options(populate_existing=True)
+)
+_share_product = (
+    select(ProductModel.id)
+    .where(ProductModel.id == bindparam("product_id"))
+    .with_for_update(read=True)
+)
+
+# INSERT ... SELECT that only produces a row while on-hand minus active
+# reservations still covers the quantity. Built on the Core table: ORM
+# inserts treat a parameter dict as bulk rows, not bind values.
+_reserve_stock = insert(StockReservationModel.__table__).from_select(
+    ["product_id", "order_id", "quantity", "expires_at"],
+    select(
+        ProductModel.id,
+        bindparam("order_id", type_=Integer),
+        bindparam("quantity", type_=Integer),
+        bindparam("expires_at", type_=DateTime(timezone=True)),
+    ).where(
+        ProductModel.id == bindparam("product_id"),
+        ProductModel.on_hand_quantity - _active_reserved >= bindparam("quantity"),
+    ),
+)
+
+def reservation_expiry() -> datetime.datetime:
+    return _utcnow() + datetime.timedelta(seconds=settings.RESERVATION_TTL)
+
+def reserve_stock(
+    db: Session,
+    order_id: int,
+    product_id: int,
+    quantity: int,
+    expires_at: datetime.datetime
+) -> bool:
+    """
+    Reserves ``quantity`` of a product for an order in the caller's transaction.
+    Returns False (and reserves nothing) when not enough stock is available.
+    Locks the product row first (SELECT ... FOR UPDATE) until the caller
+    commits: without it, two reservations, or a reservation and a sale, under
+    READ COMMITTED could both pass their check. Callers reserving several
+    products lock them with ``lock_products`` first.
+    """
+    db.execute(_lock_product, {"product_id": product_id}).all()
+    result = db.execute(_reserve_stock, {
+        "order_id": order_id,
+        "product_id": product_id,
+        "quantity": quantity,
+        "expires_at": expires_at,
+        "now": _utcnow(),
+    })
+    return result.rowcount == 1
+
+def lock_products(db: Session, product_ids: Iterable[int], shared_ids: Iterable[int] = ()) -> None:
+    """
+    Locks the products in ID order: those in ``shared_ids`` (sharded or
+    warehouse stock being sold) FOR SHARE unless they have active
+    reservations, the others exclusively, loading them into the session, as
+    ``reserve_stock`` does. One statement per product, since the two kinds
+    interleave in ID order.
+    """
+    shared_ids = set(shared_ids)
+    for product_id in sorted(set(product_ids)):
+        if product_id not in shared_ids or not _share_unreserved(db, product_id):
+            db.execute(_lock_product, {"product_id": product_id}).all()
+
+def _share_unreserved(db: Session, product_id: int) -> bool:
+    """
+    Share-locks a product and reports whether it has no active reservations.
+    If it has, the lock is released again (rolled back to a savepoint) so the
+    caller can take the exclusive one without waiting on itself. Reservations
+    are read by a second statement: under READ COMMITTED the locking one keeps
+    the snapshot from before it waited, missing a reservation that held it.
+    """
+    savepoint = db.begin_nested()
+    db.execute(_share_product, {"product_id": product_id}).all()
+    if get_reserved_quantities(db, [product_id]):
+        savepoint.rollback()
+        return False
+    savepoint.commit()
+    return True
+
+def get_oversold_products(db: Session, product_ids: Iterable[int]) -> List[int]:
+    """
+    Products among ``product_ids`` whose on-hand stock no longer covers their
+    unexpired reservations, in ID order. Sales that take sharded or warehouse
+    stock call it after taking, and roll back when it finds any.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return []
+    return db.execute(
+        select(ProductModel.id)
+        .where(ProductModel.id.in_(product_ids), ProductModel.on_hand_quantity < _active_reserved)
+        .order_by(ProductModel.id),
+        {"now": _utcnow()},
+    ).scalars().all()
+
+def get_reserved_quantities(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Sums the unexpired reservations per product. Products without any are omitted.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    return dict(db.execute(
+        select(StockReservationModel.product_id, func.sum(StockReservationModel.quantity))
+        .where(
+            StockReservationModel.product_id.in_(product_ids),
+            StockReservationModel.expires_at > _utcnow(),
+        )
+        .group_by(StockReservationModel.product_id)
+    ).all())
+
+def get_stock_availability(db: Session, product_ids: List[int]) -> List[Tuple[int, int, int]]:
+    """
+    Returns (product_id, on_hand, reserved) for each existing product, in ID order.
+    Available stock is on_hand - reserved; on_hand sums the shards of a
+    product with sharded stock.
+    """
+    on_hand = db.execute(
+        select(ProductModel.id, ProductModel.on_hand_quantity)
+        .where(ProductModel.id.in_(product_ids))
+        .order_by(ProductModel.id)
+    ).all()
+    reserved = get_reserved_quantities(db, [product_id for product_id, _ in on_hand])
+    return [(product_id, quantity, reserved.get(product_id, 0)) for product_id, quantity in on_hand]
+
+def release_reservations(db: Session, order_ids: List[int]) -> int:
+    """
+    Deletes every reservation (expired or not) of the given orders in the
+    caller's transaction. Returns how many were removed.
+    """
+    if not order_ids:
+        return 0
+    result = db.execute(
+        delete(StockReservationModel)
+        .where(StockReservationModel.order_id.in_(order_ids))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def sweep_expired_reservations(db: Session, now: Optional[datetime.datetime] = None) -> int:
+    """
+    Deletes expired reservations and commits. Expired rows are already ignored
+    by every availability check; sweeping keeps the table, and the sums over
+    it, small.
+    """
+    result = db.execute(
+        delete(StockReservationModel)
+        .where(StockReservationModel.expires_at <= (now or _utcnow()))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
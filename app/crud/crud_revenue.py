@@ -0,0 +1,294 @@
+from sqlalchemy import and_, bindparam, func, literal, or_, select, true, union_all, update
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import datetime
+
+from app.db.invalidation import InvalidatingCache
+from app.models.archived_order import ArchivedOrder as ArchivedOrderModel
+from app.models.enums import OrderStatusEnum
+from app.models.order import Order as OrderModel
+from app.models.revenue_bucket import RevenueBucket as RevenueBucketModel
+from .crud_sales_series import _as_utc, _utcnow
+
+# Revenue of COMPLETED orders per period bucket, UTC. A bucket that has ended
+# only changes when an order dated inside it is completed, cancelled after
+# completion or deleted, so its sum is stored once in revenue_buckets and read
+# back from there by every worker. Those writes mark exactly the buckets of
+# the orders' dates stale (invalidate_closed_revenue) and the next summary
+# recomputes them. The open bucket and buckets cut by start_date / end_date
+# are always summed live. Live sums cover archived orders too, from their
+# index rows (see crud_archive), so archival changes no bucket.
+PERIOD_FORMATS = {
+    "daily": "%Y-%m-%d",
+    "weekly": "%Y-%W",  # weeks start on Monday; week 00 holds the days before the first Monday
+    "monthly": "%Y-%m",
+    "annual": "%Y",
+}
+
+# Date of the earliest COMPLETED order, which bounds the buckets an unbounded
+# summary expects to find stored. It only moves earlier through writes that
+# publish "sales"; anything older than a stale value is still summed live.
+_first_order_date_cache = InvalidatingCache("sales")
+
+# Bind names differ from the column names: those are reserved for SET values.
+_refresh_bucket = (
+    update(RevenueBucketModel.__table__)
+    .where(
+        RevenueBucketModel.period == bindparam("b_period"),
+        RevenueBucketModel.bucket == bindparam("b_bucket"),
+        RevenueBucketModel.version == bindparam("b_version"),
+    )
+    .values(order_count=bindparam("b_order_count"), total_revenue=bindparam("b_total_revenue"), is_stale=False)
+)
+
+def _bucket_start(at: datetime.datetime, period: str) -> datetime.datetime:
+    """Start of the ``period`` bucket containing ``at``, as strftime labels it."""
+    day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "daily":
+        return day
+    new_year = day.replace(month=1, day=1)
+    if period == "weekly":
+        return max(day - datetime.timedelta(days=day.weekday()), new_year)
+    if period == "monthly":
+        return day.replace(day=1)
+    return new_year
+
+def _bucket_end(start: datetime.datetime, period: str) -> datetime.datetime:
+    if period == "daily":
+        return start + datetime.timedelta(days=1)
+    next_year = start.replace(year=start.year + 1, month=1, day=1)
+    if period == "weekly":
+        return min(start - datetime.timedelta(days=start.weekday()) + datetime.timedelta(weeks=1), next_year)
+    if period == "monthly":
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return next_year
+
+def _insert_buckets_statement(db: Session):
+    """INSERT that leaves rows another session stored or marked stale meanwhile alone."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        return mysql_insert(RevenueBucketModel).prefix_with("IGNORE")
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    return dialect_insert(RevenueBucketModel).on_conflict_do_nothing(
+        index_elements=[RevenueBucketModel.period, RevenueBucketModel.bucket])
+
+def _mark_stale_statement(db: Session):
+    """INSERT ... ON CONFLICT that marks an existing bucket stale and bumps its version."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(RevenueBucketModel)
+        return stmt.on_duplicate_key_update(is_stale=True, version=RevenueBucketModel.version + 1)
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(RevenueBucketModel)
+    return stmt.on_conflict_do_update(
+        index_elements=[RevenueBucketModel.period, RevenueBucketModel.bucket],
+        set_={"is_stale": True, "version": RevenueBucketModel.version + 1},
+    )
+
+def _first_order_date(db: Session) -> Optional[datetime.datetime]:
+    first = _first_order_date_cache.get("first")
+    if first is None:
+        firsts = union_all(*(
+            select(func.min(model.order_date).label("first")).where(model.status == OrderStatusEnum.COMPLETED)
+            for model in (OrderModel, ArchivedOrderModel)
+        )).subquery()
+        first = db.execute(select(func.min(firsts.c.first))).scalar()
+        if first is not None:
+            first = _as_utc(first)
+            _first_order_date_cache.set("first", first)
+    return first
+
+def _completed_in(ranges: List[Tuple[Optional[datetime.datetime], Optional[datetime.datetime]]], model=OrderModel):
+    """WHERE clause for COMPLETED orders dated in any of the [lo, hi) ranges (None: unbounded)."""
+    conditions = []
+    for lo, hi in ranges:
+        bounds = []
+        if lo is not None:
+            bounds.append(model.order_date >= lo)
+        if hi is not None:
+            bounds.append(model.order_date < hi)
+        conditions.append(and_(*bounds) if bounds else true())
+    return and_(model.status == OrderStatusEnum.COMPLETED, or_(*conditions))
+
+def _grouped_revenue(label_format: str, ranges, source: str):
+    """Live sums per bucket, over live and archived orders; each side is filtered through its own index."""
+    completed = union_all(*(
+        select(model.order_date, model.total_amount).where(_completed_in(ranges, model))
+        for model in (OrderModel, ArchivedOrderModel)
+    )).subquery()
+    label = func.strftime(label_format, completed.c.order_date).label("bucket")
+    return (
+        select(
+            literal(source).label("source"),
+            label,
+            func.count().label("order_count"),
+            func.sum(completed.c.total_amount).label("total_revenue"),
+            literal(False).label("is_stale"),
+            literal(0).label("version"),
+        )
+        .group_by(label)
+    )
+
+def _store_buckets(
+    db: Session,
+    period: str,
+    starts: List[datetime.datetime],
+    stale_versions: Dict[str, int]
+) -> Dict[str, Tuple[int, float]]:
+    """
+    Sums the buckets starting at ``starts`` with one grouped query, stores
+    them (new rows, or stale rows whose version is unchanged) and commits.
+    Returns {label: (order_count, total_revenue)}.
+    """
+    label_format = PERIOD_FORMATS[period]
+    found = {
+        bucket: (order_count, total_revenue or 0.0)
+        for _, bucket, order_count, total_revenue, _, _ in db.execute(
+            _grouped_revenue(label_format, [(starts[0], _bucket_end(starts[-1], period))], "live")).all()
+    }
+    sums, inserts, refreshes = {}, [], []
+    for start in starts:
+        bucket = start.strftime(label_format)
+        order_count, total_revenue = sums[bucket] = found.get(bucket, (0, 0.0))
+        if bucket in stale_versions:
+            refreshes.append({
+                "b_period": period, "b_bucket": bucket, "b_version": stale_versions[bucket],
+                "b_order_count": order_count, "b_total_revenue": total_revenue,
+            })
+        else:
+            inserts.append({
+                "period": period, "bucket": bucket, "starts_at": start, "ends_at": _bucket_end(start, period),
+                "order_count": order_count, "total_revenue": total_revenue, "is_stale": False, "version": 0,
+            })
+    if inserts:
+        db.execute(_insert_buckets_statement(db), inserts)
+    if refreshes:
+        db.execute(_refresh_bucket, refreshes)
+    db.commit()
+    return sums
+
+def get_revenue_summary(
+    db: Session,
+    period: str,
+    start_date: Optional[datetime.date] = None,
+    end_date: Optional[datetime.date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Total revenue of COMPLETED orders per ``period`` bucket between
+    ``start_date`` and ``end_date`` (inclusive), buckets without orders
+    omitted. One statement reads the stored closed buckets that lie wholly in
+    the range together with the live sums of the rest (the open bucket and
+    partial buckets at either end). Closed buckets that are missing or stale
+    are then summed with one more grouped query and stored.
+    """
+    period = period.lower()
+    label_format = PERIOD_FORMATS.get(period)
+    if not label_format:
+        raise ValueError("Invalid period specified. Use 'daily', 'weekly', 'monthly', or 'annual'.")
+
+    utc = datetime.timezone.utc
+    lower = datetime.datetime.combine(start_date, datetime.time(), tzinfo=utc) if start_date else None
+    upper = (datetime.datetime.combine(end_date, datetime.time(), tzinfo=utc) + datetime.timedelta(days=1)
+             if end_date else None)
+
+    # [stored_start, stored_end): the closed buckets wholly inside the range.
+    stored_end = _bucket_start(_utcnow(), period)
+    if upper is not None:
+        stored_end = min(stored_end, _bucket_start(upper, period))
+    if lower is None:
+        first = _first_order_date(db)
+        stored_start = _bucket_start(first, period) if first is not None else stored_end
+    else:
+        stored_start = _bucket_start(lower, period)
+        if stored_start < lower:
+            stored_start = _bucket_end(stored_start, period)
+
+    if stored_start < stored_end:
+        live_ranges = [(lower, stored_start), (stored_end, upper)]
+        live_ranges = [(lo, hi) for lo, hi in live_ranges if lo is None or hi is None or lo < hi]
+    else:
+        live_ranges = [(lower, upper)]
+    parts = []
+    if stored_start < stored_end:
+        parts.append(
+            select(
+                literal("stored").label("source"),
+                RevenueBucketModel.bucket,
+                RevenueBucketModel.order_count,
+                RevenueBucketModel.total_revenue,
+                RevenueBucketModel.is_stale,
+                RevenueBucketModel.version,
+            )
+            .where(
+                RevenueBucketModel.period == period,
+                RevenueBucketModel.starts_at >= stored_start,
+                RevenueBucketModel.starts_at < stored_end,
+            )
+        )
+    if live_ranges:
+        parts.append(_grouped_revenue(label_format, live_ranges, "live"))
+
+    totals: Dict[str, Tuple[int, float]] = {}
+    def add(bucket: str, order_count: int, total_revenue: float) -> None:
+        previous_count, previous_revenue = totals.get(bucket, (0, 0.0))
+        totals[bucket] = (previous_count + order_count, previous_revenue + (total_revenue or 0.0))
+
+    stored: Dict[str, Tuple[bool, int]] = {}
+    statement = union_all(*parts) if len(parts) > 1 else parts[0]
+    for source, bucket, order_count, total_revenue, is_stale, version in db.execute(statement).all():
+        if source == "stored":
+            stored[bucket] = (bool(is_stale), version)
+            if is_stale:
+                continue
+        add(bucket, order_count, total_revenue)
+
+    missing = []
+    start = stored_start
+    while start < stored_end:
+        bucket = start.strftime(label_format)
+        if bucket not in stored or stored[bucket][0]:
+            missing.append(start)
+        start = _bucket_end(start, period)
+    if missing:
+        stale_versions = {bucket: version for bucket, (is_stale, version) in stored.items() if is_stale}
+        for bucket, (order_count, total_revenue) in _store_buckets(db, period, missing, stale_versions).items():
+            add(bucket, order_count, total_revenue)
+
+    return [
+        {"period": bucket, "total_revenue": total_revenue}
+        for bucket, (order_count, total_revenue) in sorted(totals.items())
+        if order_count
+    ]
+
+def invalidate_closed_revenue(db: Session, order_ids: Iterable[int]) -> None:
+    """
+    Marks the stored bucket of every period that holds one of the orders,
+    whose completed status is changing, stale in the caller's transaction.
+    Buckets still open are not stored and need nothing.
+    """
+    order_ids = list(order_ids)
+    if not order_ids:
+        return
+    now = _utcnow()
+    rows = {}
+    for order_date in db.execute(
+            select(OrderModel.order_date).where(OrderModel.id.in_(order_ids)).distinct()).scalars():
+        order_date = _as_utc(order_date)
+        for period, label_format in PERIOD_FORMATS.items():
+            start = _bucket_start(order_date, period)
+            end = _bucket_end(start, period)
+            if end <= now:
+                rows[(period, start)] = {
+                    "period": period, "bucket": start.strftime(label_format), "starts_at": start, "ends_at": end,
+                    "order_count": 0, "total_revenue": 0.0, "is_stale": True, "version": 1,
+                }
+    if rows:
+        db.execute(_mark_stale_statement(db), list(rows.values()))
@@ -0,0 +1,192 @@
+from sqlalchemy import exists, func, select, union_all
+from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, Optional, Tuple
+import datetime
+import math
+
+from app.core.config import settings
+from app.db.invalidation import bus, InvalidatingCache
+from app.models.archived_order import ArchivedProductSales as ArchivedProductSalesModel
+from app.models.enums import OrderStatusEnum
+from app.models.order import Order as OrderModel
+from app.models.order_item import OrderItem as OrderItemModel
+
+# Per-product sales (COMPLETED orders, by order date) in hour / day / week
+# buckets, UTC, weeks starting on Monday. Buckets that ended before today's
+# UTC midnight rarely change, so each worker caches them per requested range.
+# They only move when an order placed before today is completed, cancelled
+# after completion or deleted; those writes publish the "sales" topic.
+# Today's part of the range is always read live. Sales of archived orders come
+# from their hourly rollup (see crud_archive), so archival changes no bucket.
+_closed_buckets_cache = InvalidatingCache("sales", ttl=settings.SALES_SERIES_CACHE_TTL)
+
+BUCKET_WIDTHS = {
+    "hour": datetime.timedelta(hours=1),
+    "day": datetime.timedelta(days=1),
+    "week": datetime.timedelta(weeks=1),
+}
+# Range shown when the caller gives no start.
+DEFAULT_SPANS = {
+    "hour": datetime.timedelta(days=2),
+    "day": datetime.timedelta(days=90),
+    "week": datetime.timedelta(weeks=52),
+}
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+def _as_utc(at: datetime.datetime) -> datetime.datetime:
+    if at.tzinfo is None:  # naive input and SQLite timestamps are UTC
+        return at.replace(tzinfo=datetime.timezone.utc)
+    return at.astimezone(datetime.timezone.utc)
+
+def _floor(at: datetime.datetime, bucket: str) -> datetime.datetime:
+    """Start of the bucket containing ``at``."""
+    if bucket == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "week":
+        return day - datetime.timedelta(days=day.weekday())
+    return day
+
+def _bucket_start_expression(db: Session, bucket: str, order_date=OrderModel.order_date):
+    """SQL expression for the start of the bucket containing ``order_date`` (orders.order_date)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return func.date_trunc(bucket, order_date)
+    if dialect == "mysql":
+        if bucket == "hour":
+            return func.date_format(order_date, "%Y-%m-%d %H:00:00")
+        if bucket == "week":
+            return func.subdate(func.date(order_date), func.weekday(order_date))
+        return func.date(order_date)
+    if bucket == "hour":
+        return func.strftime("%Y-%m-%d %H:00:00", order_date)
+    if bucket == "week":
+        return func.strftime("%Y-%m-%d 00:00:00", order_date, "weekday 0", "-6 days")
+    return func.strftime("%Y-%m-%d 00:00:00", order_date)
+
+def _parse_bucket_start(value: Any) -> datetime.datetime:
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    elif not isinstance(value, datetime.datetime):  # MySQL DATE
+        value = datetime.datetime.combine(value, datetime.time())
+    return _as_utc(value)
+
+def _sales_by_bucket(
+    db: Session, product_id: int, bucket: str, start: datetime.datetime, end: datetime.datetime
+) -> Dict[datetime.datetime, Tuple[int, float]]:
+    """
+    (units, revenue) per non-empty bucket for orders placed in [start, end):
+    one statement that groups the product's items, found through the
+    (product_id, order_id) index with their orders joined by primary key,
+    and its archived hours, found by primary key.
+    """
+    bucket_start = _bucket_start_expression(db, bucket).label("bucket_start")
+    archived_start = _bucket_start_expression(db, bucket, ArchivedProductSalesModel.hour).label("bucket_start")
+    rows = db.execute(union_all(
+        select(
+            bucket_start,
+            func.sum(OrderItemModel.quantity),
+            func.sum(OrderItemModel.quantity * OrderItemModel.price_per_unit),
+        )
+        .join(OrderModel, OrderModel.id == OrderItemModel.order_id)
+        .where(
+            OrderItemModel.product_id == product_id,
+            OrderModel.status == OrderStatusEnum.COMPLETED,
+            OrderModel.order_date >= start,
+            OrderModel.order_date < end,
+        )
+        .group_by(bucket_start),
+        select(
+            archived_start,
+            func.sum(ArchivedProductSalesModel.units),
+            func.sum(ArchivedProductSalesModel.revenue),
+        )
+        .where(
+            ArchivedProductSalesModel.product_id == product_id,
+            ArchivedProductSalesModel.hour >= start,
+            ArchivedProductSalesModel.hour < end,
+        )
+        .group_by(archived_start),
+    )).all()
+    sales: Dict[datetime.datetime, Tuple[int, float]] = {}
+    for value, units, revenue in rows:
+        bucket_start_at = _parse_bucket_start(value)
+        previous_units, previous_revenue = sales.get(bucket_start_at, (0, 0.0))
+        sales[bucket_start_at] = (previous_units + (units or 0), previous_revenue + (revenue or 0.0))
+    return sales
+
+def get_product_sales(
+    db: Session,
+    product_id: int,
+    bucket: str = "day",
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    max_points: int = 500
+) -> Dict[str, Any]:
+    """
+    Units sold and revenue of a product per ``bucket`` between ``start``
+    (default: ``DEFAULT_SPANS`` before ``end``) and ``end`` (default: now),
+    widened to whole buckets. Empty buckets are included as zeros. When the
+    range holds more than ``max_points`` buckets, every point merges the same
+    number of consecutive buckets (``bucket_span``) so at most ``max_points``
+    are returned. Closed buckets come from the per-worker cache.
+    """
+    now = _utcnow()
+    width = BUCKET_WIDTHS[bucket]
+    end = _as_utc(end) if end is not None else now
+    start = _floor(_as_utc(start) if start is not None else end - DEFAULT_SPANS[bucket], bucket)
+    if _floor(end, bucket) < end:
+        end = _floor(end, bucket) + width
+
+    totals: Dict[datetime.datetime, Tuple[int, float]] = {}
+    def add(sales: Dict[datetime.datetime, Tuple[int, float]]) -> None:
+        for bucket_start, (units, revenue) in sales.items():
+            previous_units, previous_revenue = totals.get(bucket_start, (0, 0.0))
+            totals[bucket_start] = (previous_units + units, previous_revenue + revenue)
+
+    # The bucket holding today's midnight (this week, for weeks) gets both parts.
+    cutoff = _floor(now, "day")
+    closed_end = min(end, cutoff)
+    if start < closed_end:
+        add(_closed_buckets_cache.get_or_set(
+            (product_id, bucket, start, closed_end),
+            lambda: _sales_by_bucket(db, product_id, bucket, start, closed_end)))
+    live_start = max(start, cutoff)
+    if live_start < end:
+        add(_sales_by_bucket(db, product_id, bucket, live_start, end))
+
+    bucket_count = (end - start) // width
+    span = max(1, math.ceil(bucket_count / max_points))
+    points = [
+        {"start": start + index * width, "end": min(start + (index + span) * width, end), "units": 0, "revenue": 0.0}
+        for index in range(0, bucket_count, span)
+    ]
+    for bucket_start, (units, revenue) in totals.items():
+        point = points[((bucket_start - start) // width) // span]
+        point["units"] += units
+        point["revenue"] += revenue
+
+    return {
+        "product_id": product_id,
+        "bucket": bucket,
+        "bucket_span": span,
+        "start": start,
+        "end": end,
+        "total_units": sum(point["units"] for point in points),
+        "total_revenue": sum(point["revenue"] for point in points),
+        "points": points,
+    }
+
+def invalidate_closed_sales(db: Session, order_ids: Iterable[int]) -> None:
+    """
+    Publishes "sales" in the caller's transaction when any of the orders,
+    whose completed status is changing, was placed before today, i.e. when
+    the change reaches into cached closed buckets.
+    """
+    order_ids = list(order_ids)
+    if order_ids and db.execute(select(exists().where(
+            OrderModel.id.in_(order_ids),
+            OrderModel.order_date < _floor(_utcnow(), "day")))).scalar():
+        bus.publish(db, "sales")
@@ -0,0 +1,196 @@
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List, Optional
+import datetime
+import math
+
+from app.core.tasks import after_commit
+from app.models.enums import InventoryLogReasonEnum
+from app.models.inventory_log import InventoryLog as InventoryLogModel
+from app.models.product import Product as ProductModel
+from app.models.sales_velocity import ProductSalesVelocity as VelocityModel
+
+# Exponentially weighted sales rate per product, in units/day: for a window of
+# ``tau`` days, a sale of q units at time t contributes q / tau * exp(-(now - t) / tau)
+# to the rate at ``now``. Each product row stores sum(q * exp((t - VELOCITY_EPOCH) / tau)),
+# its "score", so recording a sale is a blind ``score = score + delta`` upsert
+# (no read, and concurrent sales cannot lose updates), and the rate at any time
+# is score * exp(-(now - VELOCITY_EPOCH) / tau) / tau. That factor is the same
+# for every product, so filtering and ordering by rate work on the stored,
+# indexed score. Scores grow by a factor e per window: the 7-day score stays
+# within float range until about 13 years after the epoch. Move the epoch
+# forward and rebuild well before then.
+VELOCITY_EPOCH = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+WINDOWS = {"7d": 7.0, "30d": 30.0}
+_SCORE_COLUMNS = {"7d": VelocityModel.score_7d, "30d": VelocityModel.score_30d}
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
+
+def _days_since_epoch(at: datetime.datetime) -> float:
+    if at.tzinfo is None:  # SQLite returns stored UTC timestamps naive
+        at = at.replace(tzinfo=datetime.timezone.utc)
+    return (at - VELOCITY_EPOCH).total_seconds() / 86400.0
+
+def _score_weights(at: datetime.datetime) -> Dict[str, float]:
+    days = _days_since_epoch(at)
+    return {f"score_{window}": math.exp(days / tau) for window, tau in WINDOWS.items()}
+
+def rate_factor(window: str, now: Optional[datetime.datetime] = None) -> float:
+    """Multiplier that turns a stored ``window`` score into units/day at ``now``."""
+    tau = WINDOWS[window]
+    return math.exp(-_days_since_epoch(now or _utcnow()) / tau) / tau
+
+def _upsert_scores_statement(db: Session):
+    """INSERT ... ON CONFLICT that adds the given score deltas to an existing row."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(VelocityModel)
+        return stmt.on_duplicate_key_update(
+            score_7d=VelocityModel.score_7d + stmt.inserted["score_7d"],
+            score_30d=VelocityModel.score_30d + stmt.inserted["score_30d"],
+            last_sale_at=stmt.inserted["last_sale_at"],
+        )
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(VelocityModel)
+    return stmt.on_conflict_do_update(
+        index_elements=[VelocityModel.product_id],
+        set_={
+            "score_7d": VelocityModel.score_7d + stmt.excluded["score_7d"],
+            "score_30d": VelocityModel.score_30d + stmt.excluded["score_30d"],
+            "last_sale_at": stmt.excluded["last_sale_at"],
+        },
+    )
+
+def record_sales(db: Session, quantities: Dict[int, int], at: Optional[datetime.datetime] = None) -> None:
+    """
+    Adds units sold per product to the velocity scores in the caller's
+    transaction with one executemany upsert: constant work per product,
+    however long its sales history.
+    """
+    at = at or _utcnow()
+    weights = _score_weights(at)
+    rows = [
+        dict({column: quantity * weight for column, weight in weights.items()},
+             product_id=product_id, last_sale_at=at)
+        for product_id, quantity in sorted(quantities.items())
+        if quantity
+    ]
+    if rows:
+        db.execute(_upsert_scores_statement(db), rows)
+
+def _record_sales_task(db: Session, quantities: Dict[int, int], at: datetime.datetime) -> None:
+    record_sales(db, quantities, at)
+    db.commit()
+
+def record_sales_after_commit(db: Session, quantities: Dict[int, int]) -> None:
+    """
+    Records the sales once the caller's transaction commits, as a background
+    task (app/core/tasks.py), so the sale's own transaction does not lock the
+    velocity rows. Scores are stamped with the time of the sale. A sale whose
+    task is lost (queue full, crash) is recovered by rebuild_sales_velocity.
+    """
+    quantities = {product_id: quantity for product_id, quantity in quantities.items() if quantity}
+    if quantities:
+        after_commit(db, "record sales", _record_sales_task, quantities, _utcnow())
+
+def rebuild_sales_velocity(db: Session, batch_size: int = 10000) -> int:
+    """
+    Recomputes every score from the SALE inventory logs (after bulk
+    maintenance, or to fold in history that predates the table). Reads the
+    logs through one cursor in batches of ``batch_size``. Commits and returns
+    the number of products with sales.
+    """
+    db.execute(delete(VelocityModel))
+    scores: Dict[int, Dict[str, Any]] = {}
+    statement = (
+        select(InventoryLogModel.product_id, InventoryLogModel.timestamp, InventoryLogModel.change_amount)
+        .join(ProductModel, ProductModel.id == InventoryLogModel.product_id)
+        .where(InventoryLogModel.reason == InventoryLogReasonEnum.SALE)
+        .execution_options(yield_per=batch_size)
+    )
+    for product_id, timestamp, change_amount in db.execute(statement):
+        row = scores.setdefault(product_id, {"product_id": product_id, "score_7d": 0.0, "score_30d": 0.0, "last_sale_at": None})
+        for column, weight in _score_weights(timestamp).items():
+            row[column] += -change_amount * weight
+        if row["last_sale_at"] is None or timestamp > row["last_sale_at"]:
+            row["last_sale_at"] = timestamp
+
+    if scores:
+        db.execute(insert(VelocityModel), list(scores.values()))
+    db.commit()
+    return len(scores)
+
+# Natural direction of each sort key: most urgent first.
+FORECAST_SORT_DESCENDING = {"days_of_cover": False, "velocity": True, "reorder_quantity": True}
+
+def get_forecast(
+    db: Session,
+    window: str = "7d",
+    sort: str = "days_of_cover",
+    descending: Optional[bool] = None,
+    category_id: Optional[int] = None,
+    max_days_of_cover: Optional[float] = None,
+    min_velocity: Optional[float] = None,
+    lead_time_days: float = 7.0,
+    target_cover_days: float = 30.0,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Days of cover (on-hand quantity / units per day over ``window``) and a
+    suggested reorder quantity (enough for ``lead_time_days`` plus
+    ``target_cover_days`` at that rate) for every product with recorded sales.
+    Filtering and sorting happen in the database, in one query joining the
+    velocity rows to their products by primary key.
+    """
+    now = _utcnow()
+    factors = {name: rate_factor(name, now) for name in WINDOWS}
+    score = _SCORE_COLUMNS[window]
+    rate = score * factors[window]
+    horizon = lead_time_days + target_cover_days
+
+    query = (
+        select(
+            ProductModel.id, ProductModel.name, ProductModel.category_id, ProductModel.on_hand_quantity,
+            VelocityModel.score_7d, VelocityModel.score_30d,
+        )
+        .join(ProductModel, ProductModel.id == VelocityModel.product_id)
+        .where(score > 0)
+    )
+    if category_id is not None:
+        query = query.where(ProductModel.category_id == category_id)
+    if min_velocity is not None:
+        query = query.where(score >= min_velocity / factors[window])
+    if max_days_of_cover is not None:
+        query = query.where(ProductModel.on_hand_quantity <= rate * max_days_of_cover)
+
+    sort_expression = {
+        "days_of_cover": ProductModel.on_hand_quantity / rate,
+        "velocity": score,
+        "reorder_quantity": rate * horizon - ProductModel.on_hand_quantity,
+    }[sort]
+    if descending is None:
+        descending = FORECAST_SORT_DESCENDING[sort]
+    query = query.order_by(sort_expression.desc() if descending else sort_expression, ProductModel.id)
+
+    forecast = []
+    for product_id, name, product_category_id, quantity, score_7d, score_30d in db.execute(
+            query.offset(skip).limit(limit)):
+        velocities = {"7d": score_7d * factors["7d"], "30d": score_30d * factors["30d"]}
+        velocity = velocities[window]
+        forecast.append({
+            "product_id": product_id,
+            "name": name,
+            "category_id": product_category_id,
+            "quantity": quantity,
+            "velocity_7d": velocities["7d"],
+            "velocity_30d": velocities["30d"],
+            "days_of_cover": quantity / velocity if velocity > 0 else None,
+            "reorder_quantity": max(0, math.ceil(velocity * horizon - quantity)),
+        })
+    return forecast
@@ -0,0 +1,264 @@
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+import random
+
+from app import crud
+from app.db.invalidation import bus, InvalidatingCache
+from app.models.product import Product as ProductModel
+from app.models.stock_shard import StockShard as StockShardModel
+from .crud_product import product_by_id_for_update
+
+# A hot product's stock can be split across several stock_shards rows, so
+# concurrent orders decrement different rows instead of all queueing on the
+# product's own row. For a sharded product the shards are authoritative:
+# reads take quantity, is_low_stock and the category figures from their sum
+# (Product.on_hand_quantity). products.quantity is only a copy of it,
+# refreshed by rebalance_stock_shards every STOCK_SHARD_REBALANCE_INTERVAL
+# seconds. Which products are sharded changes rarely, so every worker keeps
+# that in memory.
+_sharded_products_cache = InvalidatingCache("stock_shards")
+
+MAX_SHARDS = 64
+
+# Bind names differ from the column names: those are reserved for SET values.
+_take_from_shard = (
+    update(StockShardModel.__table__)
+    .where(
+        StockShardModel.product_id == bindparam("b_product_id"),
+        StockShardModel.shard == bindparam("b_shard"),
+        StockShardModel.quantity >= bindparam("b_amount"),
+    )
+    .values(quantity=StockShardModel.quantity - bindparam("b_amount"))
+)
+_add_to_shard = (
+    update(StockShardModel.__table__)
+    .where(
+        StockShardModel.product_id == bindparam("b_product_id"),
+        StockShardModel.shard == bindparam("b_shard"),
+    )
+    .values(quantity=StockShardModel.quantity + bindparam("b_amount"))
+)
+_set_shard_quantity = (
+    update(StockShardModel.__table__)
+    .where(
+        StockShardModel.product_id == bindparam("b_product_id"),
+        StockShardModel.shard == bindparam("b_shard"),
+    )
+    .values(quantity=bindparam("b_quantity"))
+)
+
+def _split(total: int, shard_count: int) -> List[int]:
+    """Even split of ``total``; the remainder goes to the lowest shards."""
+    base, remainder = divmod(total, shard_count)
+    return [base + (1 if shard < remainder else 0) for shard in range(shard_count)]
+
+def _locked_shards(db: Session, product_id: int) -> List[Tuple[int, int]]:
+    return db.execute(
+        select(StockShardModel.shard, StockShardModel.quantity)
+        .where(StockShardModel.product_id == product_id)
+        .order_by(StockShardModel.shard)
+        .with_for_update()
+    ).all()
+
+def get_sharded_products(db: Session) -> Dict[int, int]:
+    """Returns the shard count of every sharded product, from the per-worker cache."""
+    return _sharded_products_cache.get_or_set("all", lambda: dict(db.execute(
+        select(StockShardModel.product_id, func.count())
+        .group_by(StockShardModel.product_id)
+    ).all()))
+
+def get_shards(db: Session, product_id: int) -> List[StockShardModel]:
+    return db.execute(
+        select(StockShardModel)
+        .where(StockShardModel.product_id == product_id)
+        .order_by(StockShardModel.shard)
+    ).scalars().all()
+
+def get_shard_totals(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Sums the shards of the given products without locking them. Products
+    without shards are omitted.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    return dict(db.execute(
+        select(StockShardModel.product_id, func.sum(StockShardModel.quantity))
+        .where(StockShardModel.product_id.in_(product_ids))
+        .group_by(StockShardModel.product_id)
+    ).all())
+
+def take_stock(db: Session, product_id: int, quantity: int, shard_count: int) -> bool:
+    """
+    Takes ``quantity`` from a sharded product in the caller's transaction.
+    Shards are tried one at a time from a random starting point, each with a
+    conditional UPDATE that only locks that row. When no single shard holds
+    enough, the shards are locked in shard order and drained together.
+    Returns False, taking nothing, when all of them together hold too little.
+    """
+    start = random.randrange(shard_count)
+    for offset in range(shard_count):
+        result = db.execute(_take_from_shard, {
+            "b_product_id": product_id,
+            "b_shard": (start + offset) % shard_count,
+            "b_amount": quantity,
+        })
+        if result.rowcount == 1:
+            return True
+
+    shards = _locked_shards(db, product_id)
+    if sum(available for _, available in shards) < quantity:
+        return False
+    remaining, rows = quantity, []
+    for shard, available in shards:
+        taken = min(available, remaining)
+        if taken:
+            rows.append({"b_product_id": product_id, "b_shard": shard, "b_quantity": available - taken})
+            remaining -= taken
+        if not remaining:
+            break
+    db.execute(_set_shard_quantity, rows)
+    return True
+
+def add_stock(db: Session, product_id: int, quantity: int, shard_count: int) -> None:
+    """
+    Adds ``quantity`` to one random shard of a sharded product in the caller's
+    transaction. Falls back to shard 0 when the cached shard count is stale,
+    and to products.quantity if the product is no longer sharded at all.
+    """
+    for shard in (random.randrange(shard_count), 0):
+        result = db.execute(_add_to_shard, {"b_product_id": product_id, "b_shard": shard, "b_amount": quantity})
+        if result.rowcount == 1:
+            return
+    db.execute(
+        update(ProductModel)
+        .where(ProductModel.id == product_id)
+        .values(quantity=ProductModel.quantity + quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+def set_stock(db: Session, product_id: int, total: int) -> None:
+    """
+    Overwrites a sharded product's stock with ``total``, split evenly over its
+    shards, in the caller's transaction. Locks every shard of the product.
+    """
+    shards = _locked_shards(db, product_id)
+    db.execute(_set_shard_quantity, [
+        {"b_product_id": product_id, "b_shard": shard, "b_quantity": quantity}
+        for (shard, _), quantity in zip(shards, _split(total, len(shards)))
+    ])
+
+def shard_product(db: Session, product_id: int, shard_count: int) -> Tuple[Optional[List[StockShardModel]], str]:
+    """
+    Splits a product's stock evenly across ``shard_count`` shards, or re-splits
+    an already sharded product across a new count, and commits.
+    Returns (shards, "") or (None, error message).
+    """
+    if not 1 <= shard_count <= MAX_SHARDS:
+        return None, f"Shard count must be between 1 and {MAX_SHARDS}."
+    try:
+        product = db.execute(product_by_id_for_update, {"product_id": product_id}).scalars().first()
+        if not product:
+            db.rollback()
+            return None, f"Product with ID {product_id} not found."
+        if product_id in crud.crud_warehouse_stock.get_warehouse_products(db):
+            db.rollback()
+            return None, f"Product ID {product_id} is stocked per warehouse and cannot be sharded."
+
+        shards = _locked_shards(db, product_id)
+        total = sum(quantity for _, quantity in shards) if shards else product.quantity
+        db.execute(delete(StockShardModel).where(StockShardModel.product_id == product_id))
+        db.execute(insert(StockShardModel), [
+            {"product_id": product_id, "shard": shard, "quantity": quantity}
+            for shard, quantity in enumerate(_split(total, shard_count))
+        ])
+        product.quantity = total
+        bus.publish(db, "stock_shards", "products")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error sharding stock of product {product_id}: {e}")
+        return None, f"An unexpected error occurred while sharding stock: {e}"
+    return get_shards(db, product_id), ""
+
+def unshard_product(db: Session, product_id: int) -> Tuple[Optional[ProductModel], str]:
+    """
+    Folds a sharded product's shards back into products.quantity and commits.
+    Returns (product, "") or (None, error message).
+    """
+    try:
+        product = db.execute(product_by_id_for_update, {"product_id": product_id}).scalars().first()
+        if not product:
+            db.rollback()
+            return None, f"Product with ID {product_id} not found."
+        shards = _locked_shards(db, product_id)
+        if not shards:
+            db.rollback()
+            return None, f"Stock of product ID {product_id} is not sharded."
+
+        product.quantity = sum(quantity for _, quantity in shards)
+        db.execute(delete(StockShardModel).where(StockShardModel.product_id == product_id))
+        bus.publish(db, "stock_shards", "products")
+        db.commit()
+        db.refresh(product)
+        return product, ""
+    except Exception as e:
+        db.rollback()
+        print(f"Error unsharding stock of product {product_id}: {e}")
+        return None, f"An unexpected error occurred while unsharding stock: {e}"
+
+def delete_shards(db: Session, product_id: int) -> None:
+    """Drops a product's shards in the caller's transaction (before deleting the product)."""
+    result = db.execute(delete(StockShardModel).where(StockShardModel.product_id == product_id))
+    if result.rowcount:
+        bus.publish(db, "stock_shards")
+
+def refresh_cached_quantities(db: Session, product_ids: Iterable[int]) -> int:
+    """
+    Sets products.quantity of the given products to their on-hand stock,
+    reading shard or warehouse rows without locking them, and commits.
+    Returns how many changed.
+    """
+    result = db.execute(
+        update(ProductModel)
+        .where(ProductModel.id.in_(sorted(product_ids)), ProductModel.quantity != ProductModel.on_hand_quantity)
+        .values(quantity=ProductModel.on_hand_quantity)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        bus.publish(db, "products")
+    db.commit()
+    return result.rowcount
+
+def rebalance_stock_shards(db: Session) -> int:
+    """
+    Evens out the shards of every sharded product, so single-shard takes keep
+    succeeding, and refreshes its cached products.quantity. Runs one short
+    transaction per product. Returns how many cached quantities changed.
+    """
+    refreshed = 0
+    for product_id in sorted(get_sharded_products(db)):
+        shards = _locked_shards(db, product_id)
+        if not shards:
+            db.rollback()
+            continue
+        total = sum(quantity for _, quantity in shards)
+        moves = [
+            {"b_product_id": product_id, "b_shard": shard, "b_quantity": target}
+            for (shard, quantity), target in zip(shards, _split(total, len(shards)))
+            if quantity != target
+        ]
+        if moves:
+            db.execute(_set_shard_quantity, moves)
+        result = db.execute(
+            update(ProductModel)
+            .where(ProductModel.id == product_id, ProductModel.quantity != total)
+            .values(quantity=total)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            bus.publish(db, "products")
+            refreshed += 1
+        db.commit()
+    return refreshed
@@ -0,0 +1,69 @@
+from sqlalchemy import bindparam, exists, select
+from sqlalchemy.orm import Session
+from typing import List, Optional, Tuple
+
+from app.models.inventory_log import InventoryLog as InventoryLogModel
+from app.models.warehouse import Warehouse as WarehouseModel, WarehouseStock as WarehouseStockModel
+from app.schemas.warehouse import WarehouseCreate, WarehouseUpdate
+
+_warehouse_by_id = select(WarehouseModel).where(WarehouseModel.id == bindparam("warehouse_id"))
+_warehouse_by_name = select(WarehouseModel).where(WarehouseModel.name == bindparam("name"))
+
+def get_warehouse(db: Session, warehouse_id: int) -> Optional[WarehouseModel]:
+    return db.execute(_warehouse_by_id, {"warehouse_id": warehouse_id}).scalars().first()
+
+def get_warehouse_by_name(db: Session, name: str) -> Optional[WarehouseModel]:
+    return db.execute(_warehouse_by_name, {"name": name}).scalars().first()
+
+def get_warehouses(db: Session, skip: int = 0, limit: int = 100) -> List[WarehouseModel]:
+    return db.execute(
+        select(WarehouseModel).order_by(WarehouseModel.priority, WarehouseModel.id).offset(skip).limit(limit)
+    ).scalars().all()
+
+def get_missing_warehouse_ids(db: Session, warehouse_ids) -> List[int]:
+    """The given warehouse IDs that do not exist, sorted."""
+    warehouse_ids = set(warehouse_ids)
+    found = set(db.execute(select(WarehouseModel.id).where(WarehouseModel.id.in_(warehouse_ids))).scalars())
+    return sorted(warehouse_ids - found)
+
+def create_warehouse(db: Session, warehouse: WarehouseCreate) -> WarehouseModel:
+    db_warehouse = WarehouseModel(**warehouse.model_dump())
+    db.add(db_warehouse)
+    db.commit()
+    db.refresh(db_warehouse)
+    return db_warehouse
+
+def update_warehouse(db: Session, db_warehouse: WarehouseModel, warehouse_in: WarehouseUpdate) -> WarehouseModel:
+    """Only provided fields are updated. Priorities apply to the next allocation."""
+    for field, value in warehouse_in.model_dump(exclude_unset=True).items():
+        setattr(db_warehouse, field, value)
+    db.commit()
+    db.refresh(db_warehouse)
+    return db_warehouse
+
+def delete_warehouse(db: Session, warehouse_id: int) -> Tuple[Optional[WarehouseModel], str]:
+    """
+    Deletes a warehouse that never held stock. Returns (warehouse, "") or
+    (None, error message).
+    """
+    db_warehouse = get_warehouse(db, warehouse_id)
+    if db_warehouse is None:
+        return None, f"Warehouse with ID {warehouse_id} not found."
+    in_use = db.execute(select(
+        exists().where(WarehouseStockModel.warehouse_id == warehouse_id)
+        | exists().where(InventoryLogModel.warehouse_id == warehouse_id)
+    )).scalar()
+    if in_use:
+        return None, f"Warehouse with ID {warehouse_id} has stock or stock history and cannot be deleted."
+    db.delete(db_warehouse)
+    db.commit()
+    return db_warehouse, ""
+
+def get_warehouse_stock(db: Session, warehouse_id: int, skip: int = 0, limit: int = 100) -> List[WarehouseStockModel]:
+    """Stock rows held by a warehouse, by product ID."""
+    return db.execute(
+        select(WarehouseStockModel)
+        .where(WarehouseStockModel.warehouse_id == warehouse_id)
+        .order_by(WarehouseStockModel.product_id)
+        .offset(skip).limit(limit)
+    ).scalars().all()
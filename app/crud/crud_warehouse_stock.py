@@ -0,0 +1,335 @@
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.core.config import settings
+from app.db.invalidation import bus, InvalidatingCache
+from app.models.enums import InventoryLogReasonEnum
+from app.models.inventory_log import InventoryLog as InventoryLogModel
+from app.models.product import Product as ProductModel
+from app.models.warehouse import Warehouse as WarehouseModel, WarehouseStock as WarehouseStockModel
+from .crud_counters import LOGS_BY_PRODUCT, adjust_counters
+from .crud_product import product_by_id_for_update
+from . import crud_stock_shards, crud_warehouse
+
+# A product with warehouse_stock rows keeps its stock per warehouse. Orders
+# that take stock right away do so with one conditional UPDATE per (product,
+# warehouse) row they draw from and, while it has no active reservations,
+# only share-lock the product row. Their
+# other writes are inserts and one randomly picked row_counters slot (see
+# crud_counters), so for the product itself they only contend with orders
+# drawing from the same warehouse rows. Orders that reserve stock lock the
+# product row exclusively (see crud_reservation), against the sum of its
+# warehouses, so reservations and those sales wait for each other.
+# These rows are authoritative: reads take quantity, is_low_stock and the
+# category figures from their sum (Product.on_hand_quantity).
+# products.quantity is only a copy of it, refreshed by refresh_warehouse_totals
+# every WAREHOUSE_TOTALS_REFRESH_INTERVAL seconds and by the admin operations
+# below. A product is either sharded or stocked per warehouse, never both.
+_warehouse_products_cache = InvalidatingCache("warehouse_stock")
+
+
+class StockLocation(NamedTuple):
+    warehouse_id: int
+    quantity: int
+    priority: int
+
+
+# Allocation strategy: (quantity, the product's locations) -> [(warehouse_id,
+# amount), ...]. Amounts must be positive and within each location's quantity;
+# a plan summing to less than ``quantity`` means the stock is insufficient.
+AllocationStrategy = Callable[[int, List[StockLocation]], List[Tuple[int, int]]]
+
+def _fill(quantity: int, locations: Iterable[StockLocation]) -> List[Tuple[int, int]]:
+    plan = []
+    for location in locations:
+        if quantity <= 0:
+            break
+        amount = min(location.quantity, quantity)
+        if amount > 0:
+            plan.append((location.warehouse_id, amount))
+            quantity -= amount
+    return plan
+
+def allocate_by_priority(quantity: int, locations: List[StockLocation]) -> List[Tuple[int, int]]:
+    """Drains warehouses in priority order (lowest first, then by ID)."""
+    return _fill(quantity, sorted(locations, key=lambda location: (location.priority, location.warehouse_id)))
+
+def allocate_fewest_warehouses(quantity: int, locations: List[StockLocation]) -> List[Tuple[int, int]]:
+    """
+    Ships from the highest-priority warehouse that can cover the whole
+    quantity; otherwise from the fullest warehouses first, so the order is
+    split across as few of them as possible.
+    """
+    whole = [location for location in locations if location.quantity >= quantity]
+    if whole:
+        best = min(whole, key=lambda location: (location.priority, location.warehouse_id))
+        return [(best.warehouse_id, quantity)]
+    return _fill(quantity, sorted(locations, key=lambda location: (-location.quantity, location.priority, location.warehouse_id)))
+
+ALLOCATION_STRATEGIES: Dict[str, AllocationStrategy] = {
+    "priority": allocate_by_priority,
+    "fewest_warehouses": allocate_fewest_warehouses,
+}
+
+def register_allocation_strategy(name: str, strategy: AllocationStrategy) -> None:
+    """Makes ``strategy`` selectable with ``WAREHOUSE_ALLOCATION_STRATEGY=<name>``."""
+    ALLOCATION_STRATEGIES[name] = strategy
+
+def get_allocation_strategy() -> AllocationStrategy:
+    strategy = ALLOCATION_STRATEGIES.get(settings.WAREHOUSE_ALLOCATION_STRATEGY)
+    if strategy is None:
+        raise ValueError(f"Unknown warehouse allocation strategy '{settings.WAREHOUSE_ALLOCATION_STRATEGY}'.")
+    return strategy
+
+# Bind names differ from the column names: those are reserved for SET values.
+_take_from_location = (
+    update(WarehouseStockModel.__table__)
+    .where(
+        WarehouseStockModel.product_id == bindparam("b_product_id"),
+        WarehouseStockModel.warehouse_id == bindparam("b_warehouse_id"),
+        WarehouseStockModel.quantity >= bindparam("b_amount"),
+    )
+    .values(quantity=WarehouseStockModel.quantity - bindparam("b_amount"))
+)
+_set_location_quantity = (
+    update(WarehouseStockModel.__table__)
+    .where(
+        WarehouseStockModel.product_id == bindparam("b_product_id"),
+        WarehouseStockModel.warehouse_id == bindparam("b_warehouse_id"),
+    )
+    .values(quantity=bindparam("b_quantity"))
+)
+
+def _upsert_stock_statement(db: Session):
+    """INSERT ... ON CONFLICT that adds the given quantity to an existing row."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+        stmt = mysql_insert(WarehouseStockModel)
+        return stmt.on_duplicate_key_update(quantity=WarehouseStockModel.quantity + stmt.inserted["quantity"])
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    stmt = dialect_insert(WarehouseStockModel)
+    return stmt.on_conflict_do_update(
+        index_elements=[WarehouseStockModel.product_id, WarehouseStockModel.warehouse_id],
+        set_={"quantity": WarehouseStockModel.quantity + stmt.excluded["quantity"]},
+    )
+
+def _stock_locations(db: Session, product_id: int, lock: bool = False) -> List[StockLocation]:
+    query = (
+        select(WarehouseStockModel.warehouse_id, WarehouseStockModel.quantity, WarehouseModel.priority)
+        .join(WarehouseModel, WarehouseModel.id == WarehouseStockModel.warehouse_id)
+        .where(WarehouseStockModel.product_id == product_id)
+        .order_by(WarehouseStockModel.warehouse_id)
+    )
+    if lock:
+        query = query.with_for_update(of=WarehouseStockModel)
+    return [StockLocation(*row) for row in db.execute(query).all()]
+
+def get_warehouse_products(db: Session) -> Dict[int, int]:
+    """Returns the number of warehouses of every product stocked per warehouse, from the per-worker cache."""
+    return _warehouse_products_cache.get_or_set("all", lambda: dict(db.execute(
+        select(WarehouseStockModel.product_id, func.count())
+        .group_by(WarehouseStockModel.product_id)
+    ).all()))
+
+def get_stock(db: Session, product_id: int) -> List[WarehouseStockModel]:
+    return db.execute(
+        select(WarehouseStockModel)
+        .where(WarehouseStockModel.product_id == product_id)
+        .order_by(WarehouseStockModel.warehouse_id)
+    ).scalars().all()
+
+def get_warehouse_totals(db: Session, product_ids: Iterable[int]) -> Dict[int, int]:
+    """
+    Sums the warehouse stock of the given products without locking it.
+    Products not stocked per warehouse are omitted.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return {}
+    return dict(db.execute(
+        select(WarehouseStockModel.product_id, func.sum(WarehouseStockModel.quantity))
+        .where(WarehouseStockModel.product_id.in_(product_ids))
+        .group_by(WarehouseStockModel.product_id)
+    ).all())
+
+def take_stock(db: Session, product_id: int, quantity: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Takes ``quantity`` of a product stocked per warehouse in the caller's
+    transaction, split across warehouses by the configured allocation strategy,
+    and returns [(warehouse_id, amount), ...]. The plan is made from an
+    unlocked read and applied with one conditional UPDATE per warehouse, which
+    only locks that row. If another order got there first, the product's rows
+    are locked in warehouse order and the rest is re-planned on fresh
+    quantities. Returns None when the warehouses together hold too little;
+    the caller must then roll back.
+    """
+    strategy = get_allocation_strategy()
+    taken: Dict[int, int] = {}
+    remaining = quantity
+    for warehouse_id, amount in strategy(quantity, _stock_locations(db, product_id)):
+        result = db.execute(_take_from_location, {
+            "b_product_id": product_id, "b_warehouse_id": warehouse_id, "b_amount": amount})
+        if result.rowcount != 1:
+            break
+        taken[warehouse_id] = amount
+        remaining -= amount
+
+    if remaining:
+        locations = _stock_locations(db, product_id, lock=True)
+        available = {location.warehouse_id: location.quantity for location in locations}
+        plan = strategy(remaining, locations)
+        if sum(amount for _, amount in plan) < remaining or any(
+                not 0 < amount <= available.get(warehouse_id, 0) for warehouse_id, amount in plan):
+            return None
+        db.execute(_set_location_quantity, [
+            {"b_product_id": product_id, "b_warehouse_id": warehouse_id, "b_quantity": available[warehouse_id] - amount}
+            for warehouse_id, amount in plan
+        ])
+        for warehouse_id, amount in plan:
+            taken[warehouse_id] = taken.get(warehouse_id, 0) + amount
+    return sorted(taken.items())
+
+def add_stock(db: Session, product_id: int, quantity: int, warehouse_id: Optional[int] = None) -> int:
+    """
+    Adds ``quantity`` to a product's stock at ``warehouse_id`` in the caller's
+    transaction, creating the row if the product had none there. Without a
+    warehouse (returns of sales made before the product was stocked per
+    warehouse) it goes to the product's first warehouse by priority.
+    Returns the warehouse used.
+    """
+    if warehouse_id is None:
+        warehouse_id = min(
+            _stock_locations(db, product_id), key=lambda location: (location.priority, location.warehouse_id)
+        ).warehouse_id
+    db.execute(_upsert_stock_statement(db), [
+        {"product_id": product_id, "warehouse_id": warehouse_id, "quantity": quantity}])
+    return warehouse_id
+
+def set_stock(
+    db: Session, product_id: int, quantities: Dict[int, int]
+) -> Tuple[Optional[List[WarehouseStockModel]], str]:
+    """
+    Replaces a product's stock with ``quantities`` ({warehouse_id: quantity}),
+    starts stocking it per warehouse if it was not, and commits. Every changed
+    warehouse is logged as a MANUAL_UPDATE; when a product switches to
+    warehouse stock, one log records any difference to its old quantity.
+    Returns (stock rows, "") or (None, error message).
+    """
+    if any(quantity < 0 for quantity in quantities.values()):
+        return None, "Warehouse quantities cannot be negative."
+    try:
+        product = db.execute(product_by_id_for_update, {"product_id": product_id}).scalars().first()
+        if not product:
+            db.rollback()
+            return None, f"Product with ID {product_id} not found."
+        missing_ids = crud_warehouse.get_missing_warehouse_ids(db, quantities)
+        if missing_ids:
+            db.rollback()
+            return None, f"Warehouse(s) with ID {', '.join(map(str, missing_ids))} not found."
+        if product_id in crud_stock_shards.get_sharded_products(db):
+            db.rollback()
+            return None, f"Stock of product ID {product_id} is sharded; unshard it before stocking it per warehouse."
+
+        current = {location.warehouse_id: location.quantity for location in _stock_locations(db, product_id, lock=True)}
+        total = sum(quantities.values())
+        if current:
+            running = sum(current.values())
+            changes = []
+            for warehouse_id in sorted(set(current) | set(quantities)):
+                change = quantities.get(warehouse_id, 0) - current.get(warehouse_id, 0)
+                if change:
+                    running += change
+                    changes.append((warehouse_id, change, running))
+        else:
+            changes = [(None, total - product.quantity, total)] if total != product.quantity else []
+        logs = [
+            {
+                "product_id": product_id,
+                "change_amount": change,
+                "new_quantity": new_quantity,
+                "reason": InventoryLogReasonEnum.MANUAL_UPDATE,
+                "order_id": None,
+                "warehouse_id": warehouse_id,
+                "notes": "Warehouse stock set via API",
+            }
+            for warehouse_id, change, new_quantity in changes
+        ]
+
+        db.execute(delete(WarehouseStockModel).where(WarehouseStockModel.product_id == product_id))
+        db.execute(insert(WarehouseStockModel), [
+            {"product_id": product_id, "warehouse_id": warehouse_id, "quantity": quantity}
+            for warehouse_id, quantity in sorted(quantities.items())
+        ])
+        product.quantity = total
+        if logs:
+            db.execute(insert(InventoryLogModel), logs)
+            adjust_counters(db, {(LOGS_BY_PRODUCT, str(product_id)): len(logs)})
+        bus.publish(db, "warehouse_stock", "products")
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"Error setting warehouse stock of product {product_id}: {e}")
+        return None, f"An unexpected error occurred while setting warehouse stock: {e}"
+    return get_stock(db, product_id), ""
+
+def unstock_product(db: Session, product_id: int) -> Tuple[Optional[ProductModel], str]:
+    """
+    Folds a product's warehouse stock back into products.quantity and commits.
+    Returns (product, "") or (None, error message).
+    """
+    try:
+        product = db.execute(product_by_id_for_update, {"product_id": product_id}).scalars().first()
+        if not product:
+            db.rollback()
+            return None, f"Product with ID {product_id} not found."
+        locations = _stock_locations(db, product_id, lock=True)
+        if not locations:
+            db.rollback()
+            return None, f"Product ID {product_id} is not stocked per warehouse."
+
+        product.quantity = sum(location.quantity for location in locations)
+        db.execute(delete(WarehouseStockModel).where(WarehouseStockModel.product_id == product_id))
+        bus.publish(db, "warehouse_stock", "products")
+        db.commit()
+        db.refresh(product)
+        return product, ""
+    except Exception as e:
+        db.rollback()
+        print(f"Error removing warehouse stock of product {product_id}: {e}")
+        return None, f"An unexpected error occurred while removing warehouse stock: {e}"
+
+def delete_stock(db: Session, product_id: int) -> None:
+    """Drops a product's warehouse stock in the caller's transaction (before deleting the product)."""
+    result = db.execute(delete(WarehouseStockModel).where(WarehouseStockModel.product_id == product_id))
+    if result.rowcount:
+        bus.publish(db, "warehouse_stock")
+
+def refresh_warehouse_totals(db: Session) -> int:
+    """
+    Sets products.quantity of every product stocked per warehouse to its
+    current sum, with one set-based UPDATE that reads the stock rows without
+    locking them, and commits. Returns how many products changed.
+    """
+    total = (
+        select(func.sum(WarehouseStockModel.quantity))
+        .where(WarehouseStockModel.product_id == ProductModel.id)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(ProductModel)
+        .where(
+            ProductModel.id.in_(select(WarehouseStockModel.product_id)),
+            ProductModel.quantity != total,
+        )
+        .values(quantity=total)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        bus.publish(db, "products")
+    db.commit()
+    return result.rowcount
@@ -4,3 +4,11 @@ from app.models.product import Product
 from app.models.order import Order
 from app.models.order_item import OrderItem
 from app.models.inventory_log import InventoryLog
+from app.models.change_version import ChangeVersion
+from app.models.row_counter import RowCounter
+from app.models.stock_reservation import StockReservation
+from app.models.stock_shard import StockShard
+from app.models.sales_velocity import ProductSalesVelocity
+from app.models.warehouse import Warehouse, WarehouseStock
+from app.models.revenue_bucket import RevenueBucket
+from app.models.archived_order import ArchivedOrder, ArchivedProductSales
@@ -0,0 +1,196 @@
+"""
+Cross-process cache invalidation.
+
+Crud write paths call ``bus.publish(db, topic, ...)``, which only records the
+topic on the session: an invalidation is only published if the write commits,
+and nothing is written in the writer's own transaction. Once the session
+commits, the topics are applied locally right away and the topic's row in
+``change_versions`` is bumped in a short transaction of its own, by a
+post-commit task (app/core/tasks.py). That task is coalesced per worker, so
+concurrent writers do not queue on the version rows. Topics whose bump has not
+run yet (queue full, failed attempts) stay pending and go with the next bump
+or poll.
+
+Every worker runs ``bus.poll(db)`` from ``get_db``; at most once per
+``CACHE_INVALIDATION_POLL_INTERVAL`` seconds it reads the (tiny) version table
+and clears every cache subscribed to a topic whose version moved. Other
+workers therefore see a write once its bump has run and their next poll
+comes. A worker that dies between a commit and its bump loses that
+invalidation until the topic's next write (or the cache's TTL, if it has one).
+"""
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.change_version import ChangeVersion, TRACKED_TOPICS
+
+_PENDING_KEY = "pending_invalidations"
+
+
+class InvalidationBus:
+    def __init__(self, poll_interval: float):
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[str, List[Callable[[], None]]] = defaultdict(list)
+        self._versions: Dict[str, int] = {}
+        self._last_poll = 0.0
+        self._poll_lock = threading.Lock()
+        # Committed topics whose version has not been bumped yet, per engine.
+        self._unpublished: Dict[Engine, Set[str]] = defaultdict(set)
+        self._unpublished_lock = threading.Lock()
+
+    def subscribe(self, topic: str, callback: Callable[[], None]) -> None:
+        """Registers a callback that runs whenever the topic is invalidated."""
+        if topic not in TRACKED_TOPICS:
+            raise ValueError(f"Unknown invalidation topic '{topic}'.")
+        self._subscribers[topic].append(callback)
+
+    def publish(self, db: Session, *topics: str) -> None:
+        """
+        Invalidates each topic once the session commits: local subscribers are
+        notified right away, other workers after the post-commit bump.
+        """
+        unknown = set(topics) - set(TRACKED_TOPICS)
+        if unknown:
+            raise ValueError(f"Unknown invalidation topic(s): {sorted(unknown)}.")
+        db.info.setdefault(_PENDING_KEY, set()).update(topics)
+
+    def committed(self, bind: Engine, topics: Iterable[str]) -> None:
+        """Notifies local subscribers and queues the version bump for other workers."""
+        from app.core.tasks import Task, task_executor
+
+        with self._unpublished_lock:
+            self._unpublished[bind].update(topics)
+        self.notify(topics)
+        # One queued bump per engine publishes everything committed before it runs.
+        task_executor.submit(Task("publish invalidations", _flush_task, (), bind, ("publish invalidations", bind)))
+
+    def flush(self, bind: Engine) -> None:
+        """Bumps the versions of the committed topics not yet published, in one short transaction."""
+        with self._unpublished_lock:
+            topics = self._unpublished.pop(bind, None)
+        if not topics:
+            return
+        try:
+            with bind.begin() as conn:
+                conn.execute(
+                    update(ChangeVersion)
+                    .where(ChangeVersion.topic.in_(sorted(topics)))
+                    .values(version=ChangeVersion.version + 1)
+                )
+        except Exception:
+            with self._unpublished_lock:
+                self._unpublished[bind].update(topics)
+            raise
+
+    def notify(self, topics: Iterable[str]) -> None:
+        for topic in topics:
+            for callback in list(self._subscribers.get(topic, ())):
+                callback()
+
+    def poll(self, db: Session, force: bool = False) -> None:
+        """
+        Picks up invalidations published by other processes.
+        Cheap to call on every request: it is throttled, and concurrent
+        callers skip the check while another thread is running it.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_poll < self.poll_interval:
+            return
+        if not self._poll_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_poll = now
+            if self._unpublished:
+                try:
+                    self.flush(db.get_bind())
+                except Exception as e:
+                    print(f"Error publishing invalidations, will retry: {e}")
+            rows = db.execute(select(ChangeVersion.topic, ChangeVersion.version)).all()
+            changed = [topic for topic, version in rows if self._versions.get(topic) != version]
+            self._versions.update(dict(rows))
+        finally:
+            self._poll_lock.release()
+
+        self.notify(changed)
+
+
+bus = InvalidationBus(poll_interval=settings.CACHE_INVALIDATION_POLL_INTERVAL)
+
+
+def _flush_task(db: Session) -> None:
+    bus.flush(db.get_bind())
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session: Session) -> None:
+    topics = session.info.pop(_PENDING_KEY, None)
+    if topics:
+        bus.committed(session.get_bind(), topics)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+
+class InvalidatingCache:
+    """
+    Process-local cache that is cleared whenever one of its topics is invalidated,
+    by this worker or any other. With ``ttl`` (seconds), entries also expire on
+    their own, which bounds staleness even between invalidation polls.
+    """
+
+    def __init__(self, *topics: str, ttl: Optional[float] = None):
+        self._data: Dict[Hashable, Tuple[Any, float]] = {}
+        self._generation = 0
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        for topic in topics:
+            bus.subscribe(topic, self.clear)
+
+    def _lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at = entry
+        if self._ttl is not None and time.monotonic() >= expires_at:
+            return False, None
+        return True, value
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        expires_at = time.monotonic() + self._ttl if self._ttl is not None else 0.0
+        self._data[key] = (value, expires_at)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        found, value = self._lookup(key)
+        return value if found else default
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached value or computes and stores it. A value computed
+        while an invalidation arrived is returned but not stored.
+        """
+        found, value = self._lookup(key)
+        if found:
+            return value
+        generation = self._generation
+        value = compute()
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
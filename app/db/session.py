@@ -1,16 +1,77 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from app.core.config import settings, Settings
+from app.db.invalidation import bus
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} 
-)
+def build_engine(app_settings: Settings):
+    """
+    Creates the engine for ``app_settings``. SQLite connections get the
+    configured pragmas applied once, when the pool opens them.
+    """
+    url = app_settings.DATABASE_URL
+    if not url.startswith("sqlite"):
+        return create_engine(
+            url,
+            pool_size=app_settings.DB_POOL_SIZE,
+            max_overflow=app_settings.DB_MAX_OVERFLOW,
+            pool_pre_ping=True,
+        )
+
+    db_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        **({} if ":memory:" in url else {
+            "pool_size": app_settings.DB_POOL_SIZE,
+            "max_overflow": app_settings.DB_MAX_OVERFLOW,
+        }),
+    )
+
+    pragmas = dict(app_settings.SQLITE_PRAGMAS)
+
+    @event.listens_for(db_engine, "connect")
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return db_engine
+
+engine = build_engine(settings)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def configure_engine(app_settings: Settings):
+    """
+    Replaces the module engine (e.g. for an app built with other settings)
+    and rebinds SessionLocal to it.
+    """
+    global engine
+    engine.dispose()
+    engine = build_engine(app_settings)
+    SessionLocal.configure(bind=engine)
+    return engine
+
+def warm_pool(connections: int) -> int:
+    """
+    Opens and validates up to ``connections`` pooled connections so the first
+    requests do not pay for connecting. Returns how many were opened.
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.exec_driver_sql("SELECT 1")
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
+
 def get_db():
     db = SessionLocal()
     try:
+        bus.poll(db)
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
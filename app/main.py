@@ -1,22 +1,166 @@
+import importlib
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, Optional, Tuple
+
 from fastapi import FastAPI
-from app.db.base import Base
-from app.db.session import engine
-from app.routers import categories, products, orders, inventory
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-def create_db_and_tables():
-    Base.metadata.create_all(bind=engine)
+from app.core.config import Settings, settings
+from app.db import session as db_session
+from app.db.invalidation import bus
 
-app = FastAPI(
-    title="E-commerce Admin API",
-    description="API for managing e-commerce sales, inventory, and products.",
-    version="0.1.0"
+# Imported inside create_app, in this order, so the startup report can
+# attribute import time to each layer (later entries only pay for what the
+# earlier ones did not already pull in).
+STARTUP_MODULES = (
+    "app.db.base",
+    "app.schemas",
+    "app.crud",
+    "app.routers.categories",
+    "app.routers.products",
+    "app.routers.orders",
+    "app.routers.inventory",
+    "app.routers.warehouses",
+    "app.routers.monitoring",
+    "app.routers.dashboard",
 )
 
-@app.get("/")
-async def read_root():
-    return {"message": "Welcome to the E-commerce Admin API"}
+def create_db_and_tables():
+    from app.db.base import Base
+    Base.metadata.create_all(bind=db_session.engine)
+
+class StartupReport:
+    """Wall-clock time of each import and warmup step of one app instance."""
+
+    def __init__(self):
+        self.steps: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def step(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - started))
+
+    def format(self) -> str:
+        width = max(len(name) for name, _ in self.steps)
+        lines = [f"  {name:<{width}}  {seconds * 1000:8.1f} ms" for name, seconds in self.steps]
+        total = sum(seconds for _, seconds in self.steps)
+        lines.append(f"  {'total':<{width}}  {total * 1000:8.1f} ms")
+        return "Startup report:\n" + "\n".join(lines)
+
+def _response_models(app: FastAPI) -> List[type]:
+    models = []
+    for route in app.routes:
+        if isinstance(route, APIRoute) and route.response_field is not None:
+            annotation = route.response_field.field_info.annotation
+            for candidate in (annotation, *getattr(annotation, "__args__", ())):
+                if isinstance(candidate, type) and issubclass(candidate, BaseModel) and candidate not in models:
+                    models.append(candidate)
+    return models
+
+def warm_up(app: FastAPI) -> None:
+    """
+    Everything the first requests would otherwise pay for: pooled connections
+    (with pragmas), fully built response schemas, the OpenAPI document, the
+    in-memory category map and the dashboard snapshot.
+    """
+    from app import crud
+    from app.core.dashboard import dashboard_snapshot
+
+    app_settings: Settings = app.state.settings
+    report: StartupReport = app.state.startup_report
+
+    with report.step(f"warm {app_settings.DB_POOL_WARM_CONNECTIONS} pooled connections"):
+        db_session.warm_pool(app_settings.DB_POOL_WARM_CONNECTIONS)
+
+    with report.step("build response schemas"):
+        for model in _response_models(app):
+            if not model.__pydantic_complete__:
+                model.model_rebuild()
+        app.openapi()
+
+    with report.step("load category map"):
+        with db_session.SessionLocal() as db:
+            bus.poll(db, force=True)
+            crud.crud_category.get_category_map(db)
+
+    with report.step("compute dashboard snapshot"):
+        try:
+            dashboard_snapshot.refresh()
+        except Exception as e:  # the first dashboard request computes it instead
+            print(f"Error computing the dashboard snapshot: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.core.reservation_sweeper import reservation_sweeper
+    from app.core.stock_shard_rebalancer import stock_shard_rebalancer
+    from app.core.warehouse_totals import warehouse_totals_refresher
+    from app.core.dashboard import dashboard_refresher
+    from app.core.tasks import task_executor
+
+    await run_in_threadpool(warm_up, app)
+    if app.state.settings.STARTUP_REPORT:
+        print(app.state.startup_report.format())
+    task_executor.start()
+    reservation_sweeper.start()
+    stock_shard_rebalancer.start()
+    warehouse_totals_refresher.start()
+    dashboard_refresher.start()
+    yield
+    await dashboard_refresher.stop()
+    await warehouse_totals_refresher.stop()
+    await stock_shard_rebalancer.stop()
+    await reservation_sweeper.stop()
+    await run_in_threadpool(task_executor.shutdown, 10.0)
+    db_session.engine.dispose()
+
+def create_app(app_settings: Optional[Settings] = None) -> FastAPI:
+    """
+    Builds the API. Routers are imported here rather than at module import,
+    and the lifespan hook warms the pool and schemas before the first request.
+    Run with ``uvicorn app.main:app`` or ``uvicorn app.main:create_app --factory``.
+    """
+    app_settings = app_settings or settings
+    report = StartupReport()
+
+    if app_settings.DATABASE_URL != db_session.engine.url.render_as_string(hide_password=False):
+        with report.step("configure engine"):
+            db_session.configure_engine(app_settings)
+
+    app = FastAPI(
+        title="E-commerce Admin API",
+        description="API for managing e-commerce sales, inventory, and products.",
+        version="0.1.0",
+        lifespan=lifespan
+    )
+    app.state.settings = app_settings
+    app.state.startup_report = report
+
+    if app_settings.PROFILE_TOKEN or app_settings.PROFILE_SAMPLE_RATE > 0:
+        from app.core.profiling import ProfilingMiddleware
+        app.add_middleware(
+            ProfilingMiddleware,
+            token=app_settings.PROFILE_TOKEN,
+            sample_rate=app_settings.PROFILE_SAMPLE_RATE,
+            directory=app_settings.PROFILE_DIR,
+            interval=app_settings.PROFILE_SAMPLE_INTERVAL,
+        )
+
+    @app.get("/")
+    async def read_root():
+        return {"message": "Welcome to the E-commerce Admin API"}
+
+    for module_name in STARTUP_MODULES:
+        with report.step(f"import {module_name}"):
+            module = importlib.import_module(module_name)
+        if hasattr(module, "router"):
+            app.include_router(module.router)
+
+    return app
 
-app.include_router(categories.router)
-app.include_router(products.router) 
-app.include_router(orders.router)
-app.include_router(inventory.router)
+app = create_app()
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, Float, String, DateTime, Index, Enum as SQLAlchemyEnum
+
+from app.db.base_class import Base
+from .enums import OrderStatusEnum
+
+# Index of an order moved, with its items, out of orders / order_items into an
+# archive file (see crud_archive). Keeps what the revenue summary and the
+# order lists filter on, so those need not open the files.
+class ArchivedOrder(Base):
+    __tablename__ = "archived_orders"
+    __table_args__ = (
+        Index("ix_archived_orders_status_order_date", "status", "order_date"),
+    )
+
+    id = Column(Integer, primary_key=True)  # the order's own ID
+    order_date = Column(DateTime(timezone=True), nullable=False, index=True)
+    total_amount = Column(Float, nullable=False)
+    status = Column(SQLAlchemyEnum(OrderStatusEnum), nullable=False)
+    archive_file = Column(String(255), nullable=False)  # relative to ORDER_ARCHIVE_DIR
+
+    def __repr__(self):
+        return f"<ArchivedOrder(id={self.id}, date='{self.order_date}', status='{self.status.value}', file='{self.archive_file}')>"
+
+# Units and revenue of a product's archived COMPLETED order items per hour of
+# order date, for the sales series. No foreign key: the history outlives the
+# product.
+class ArchivedProductSales(Base):
+    __tablename__ = "archived_product_sales"
+
+    product_id = Column(Integer, primary_key=True)
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    units = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchivedProductSales(product_id={self.product_id}, hour='{self.hour}', units={self.units})>"
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, event
+
+from app.db.base_class import Base
+
+TRACKED_TOPICS = ("products", "categories", "orders", "stock_shards", "sales", "warehouse_stock", "order_archive")
+
+class ChangeVersion(Base):
+    __tablename__ = "change_versions"
+
+    topic = Column(String(50), primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<ChangeVersion(topic='{self.topic}', version={self.version})>"
+
+
+@event.listens_for(ChangeVersion.__table__, "after_create")
+def _seed_topics(target, connection, **kw):
+    """Every tracked topic needs a row so publishers can bump it with a plain UPDATE."""
+    connection.execute(target.insert(), [{"topic": topic, "version": 0} for topic in TRACKED_TOPICS])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, func, ForeignKey, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, Integer, String, DateTime, Index, func, ForeignKey, Enum as SQLAlchemyEnum
 
 
 from app.db.base_class import Base
@@ -6,6 +6,9 @@ from .enums import InventoryLogReasonEnum
 
 class InventoryLog(Base):
     __tablename__ = "inventory_logs"
+    __table_args__ = (
+        Index("ix_inventory_logs_product_id_timestamp", "product_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -15,7 +18,10 @@ class InventoryLog(Base):
     notes = Column(String(255), nullable=True)
 
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=True, index=True)
+    # No foreign key: archived orders leave the orders table, their logs stay.
+    order_id = Column(Integer, nullable=True, index=True)
+    # Set for products stocked per warehouse: the warehouse whose stock changed.
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=True, index=True)
 
     def __repr__(self):
         return f"<InventoryLog(id={self.id}, product_id={self.product_id}, change={self.change_amount}, new_qty={self.new_quantity}, reason='{self.reason.value}')>"
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, func, Enum as SQLAlchemyEnum
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index, func, Enum as SQLAlchemyEnum
 from sqlalchemy.orm import relationship
 import datetime
 
@@ -7,6 +7,9 @@ from .enums import OrderStatusEnum
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        Index("ix_orders_status_order_date", "status", "order_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_date = Column(DateTime(timezone=True), server_default=func.now(), index=True, nullable=False)
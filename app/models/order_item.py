@@ -1,16 +1,19 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey
+from sqlalchemy import Column, Integer, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from app.db.base_class import Base
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = (
+        Index("ix_order_items_product_id_order_id", "product_id", "order_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     quantity = Column(Integer, nullable=False)
     price_per_unit = Column(Float, nullable=False)
 
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
 
     order = relationship("Order", back_populates="order_items")
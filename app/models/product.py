@@ -1,19 +1,37 @@
-from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, func
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Float, ForeignKey, DateTime, Index, func, select
+from sqlalchemy.orm import column_property, relationship
 import datetime
 
 from app.db.base_class import Base
+from app.models.stock_shard import StockShard
+from app.models.warehouse import WarehouseStock
 
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        Index("ix_products_category_id_name", "category_id", "name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    sku = Column(String(64), unique=True, index=True, nullable=True)
     name = Column(String(100), index=True, nullable=False)
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
     quantity = Column(Integer, default=0, nullable=False)
     category_id = Column(Integer, ForeignKey("categories.id"), nullable=False)
 
+    # On-hand stock: the sum of the product's stock_shards or warehouse_stock
+    # rows when it has any (quantity is then only a periodically refreshed
+    # copy), quantity otherwise. Deferred: read paths undefer it.
+    on_hand_quantity = column_property(
+        func.coalesce(
+            select(func.sum(StockShard.quantity)).where(StockShard.product_id == id).scalar_subquery(),
+            select(func.sum(WarehouseStock.quantity)).where(WarehouseStock.product_id == id).scalar_subquery(),
+            quantity,
+        ),
+        deferred=True,
+    )
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc))
 
@@ -0,0 +1,22 @@
+from sqlalchemy import Boolean, Column, DateTime, Float, Integer, String
+
+from app.db.base_class import Base
+
+# Revenue of COMPLETED orders in one closed period bucket (see crud_revenue).
+class RevenueBucket(Base):
+    __tablename__ = "revenue_buckets"
+
+    period = Column(String(10), primary_key=True)  # daily, weekly, monthly, annual
+    bucket = Column(String(10), primary_key=True)  # the period label, e.g. 2024-07
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    ends_at = Column(DateTime(timezone=True), nullable=False)
+    order_count = Column(Integer, default=0, nullable=False)
+    total_revenue = Column(Float, default=0.0, nullable=False)
+    # Set when an order in the bucket changes; the next read recomputes it.
+    # version makes that recompute conditional, so a read that started before
+    # the change cannot overwrite the mark.
+    is_stale = Column(Boolean, default=False, nullable=False)
+    version = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<RevenueBucket(period='{self.period}', bucket='{self.bucket}', total_revenue={self.total_revenue}, is_stale={self.is_stale})>"
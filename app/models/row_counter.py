@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String
+
+from app.db.base_class import Base
+
+class RowCounter(Base):
+    __tablename__ = "row_counters"
+
+    scope = Column(String(50), primary_key=True)
+    key = Column(String(50), primary_key=True)
+    # A counter is the sum of its slots (see crud_counters.adjust_counters).
+    slot = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<RowCounter(scope='{self.scope}', key='{self.key}', slot={self.slot}, count={self.count})>"
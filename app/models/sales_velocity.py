@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+
+from app.db.base_class import Base
+
+class ProductSalesVelocity(Base):
+    __tablename__ = "product_sales_velocity"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    # Decayed sales sums relative to a fixed epoch (see crud_sales_velocity),
+    # not rates: multiply by the current window factor to get units/day.
+    score_7d = Column(Float, default=0.0, nullable=False, index=True)
+    score_30d = Column(Float, default=0.0, nullable=False, index=True)
+    last_sale_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<ProductSalesVelocity(product_id={self.product_id}, score_7d={self.score_7d}, score_30d={self.score_30d})>"
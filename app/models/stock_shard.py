@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, ForeignKey
+
+from app.db.base_class import Base
+
+class StockShard(Base):
+    __tablename__ = "stock_shards"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    quantity = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<StockShard(product_id={self.product_id}, shard={self.shard}, quantity={self.quantity})>"
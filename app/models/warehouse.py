@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, ForeignKey
+
+from app.db.base_class import Base
+
+class Warehouse(Base):
+    __tablename__ = "warehouses"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    location = Column(String(255), nullable=True)
+    # Lower values are allocated from first by the "priority" strategy.
+    priority = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<Warehouse(id={self.id}, name='{self.name}', priority={self.priority})>"
+
+class WarehouseStock(Base):
+    __tablename__ = "warehouse_stock"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), primary_key=True, index=True)
+    quantity = Column(Integer, default=0, nullable=False)
+
+    def __repr__(self):
+        return f"<WarehouseStock(product_id={self.product_id}, warehouse_id={self.warehouse_id}, quantity={self.quantity})>"
@@ -2,12 +2,19 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app import crud, schemas
+from app.core.admission import AdmissionRoute
 from app.db.session import get_db
 
 router = APIRouter(
     prefix="/categories",
     tags=["Categories"],
-    responses={404: {"description": "Not found"}},)
+    responses={404: {"description": "Not found"}},
+    route_class=AdmissionRoute,)
+
+def _with_stats(category, stats) -> schemas.CategoryWithStats:
+    return schemas.CategoryWithStats(
+        id=category.id, name=category.name, description=category.description,
+        **stats.get(category.id, crud.crud_category.EMPTY_CATEGORY_STATS))
 
 @router.post(
     "/",
@@ -30,7 +37,7 @@ def create_category(
 
 @router.get(
     "/",
-    response_model=List[schemas.Category],
+    response_model=List[schemas.CategoryWithStats],
     summary="Retrieve a list of categories"
 )
 def read_categories(
@@ -38,27 +45,30 @@ def read_categories(
     limit: int = 100,
     db: Session = Depends(get_db)):
     """
-    Retrieve a list of categories with optional pagination.
+    Retrieve a list of categories with optional pagination, each with its
+    product count, units on hand, stock value and low-stock count.
     """
     categories = crud.crud_category.get_categories(db, skip=skip, limit=limit)
-    return categories
+    stats = crud.crud_category.get_category_stats(db)
+    return [_with_stats(category, stats) for category in categories]
 
 @router.get(
     "/{category_id}",
-    response_model=schemas.Category,
+    response_model=schemas.CategoryWithStats,
     summary="Retrieve a specific category by ID")
 def read_category(
     category_id: int,
     db: Session = Depends(get_db)):
     """
-    Retrieve details for a specific category using its ID.
+    Retrieve details for a specific category using its ID, with its product
+    aggregates.
     """
     db_category = crud.crud_category.get_category(db, category_id=category_id)
     if db_category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Category with ID {category_id} not found")
-    return db_category
+    return _with_stats(db_category, crud.crud_category.get_category_stats(db))
 
 @router.patch(
     "/{category_id}",
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Response
+
+from app import schemas
+from app.core.admission import AdmissionRoute
+from app.core.dashboard import dashboard_snapshot
+
+router = APIRouter(
+    prefix="/dashboard",
+    tags=["Dashboard"],
+    route_class=AdmissionRoute,)
+
+@router.get(
+    "/summary",
+    response_model=schemas.DashboardSummary,
+    summary="Admin dashboard: counts, low stock, pending orders and revenue")
+async def read_dashboard_summary(response: Response):
+    """
+    Order counts per status, product and category totals, the lowest-stock
+    products, the latest pending orders and monthly revenue for the last year,
+    served from a snapshot that is refreshed in the background. `stale` is true
+    when writes have happened since `generated_at`; the refresh is already
+    under way, so poll again shortly for fresh numbers.
+    """
+    summary = await dashboard_snapshot.get()
+    response.headers["Age"] = str(int(dashboard_snapshot.age))
+    return summary
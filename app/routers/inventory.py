@@ -1,14 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import asyncio
+import csv
+import io
+
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 
 from app import crud, models, schemas
-from app.db.session import get_db
+from app.core.admission import AdmissionRoute
+from app.core.config import settings
+from app.core.pagination import set_total_count
+from app.core.streaming import StreamFormat, stream_list
+from app.core.stock_feed import stock_feed, fetch_log_entries, latest_log_id, iter_events, FETCH_BATCH_SIZE
+from app.db.session import SessionLocal, get_db
 
 router = APIRouter(
     prefix="/inventory",
     tags=["Inventory"],
-    responses={404: {"description": "Not found"}},)
+    responses={404: {"description": "Not found"}},
+    route_class=AdmissionRoute,)
 @router.post(
     "/restock",
     response_model=schemas.Product,
@@ -20,7 +33,7 @@ def restock_product_endpoint(
     """
     Increase the inventory quantity for a specific product.
     """
-    updated_product, error_message = crud.crud_inventory.restock_product(
+    updated_product, _, error_message = crud.crud_inventory.restock_product(
         db=db, restock_info=restock_data)
 
     if error_message:
@@ -35,14 +48,80 @@ def restock_product_endpoint(
     product_with_category = crud.crud_product.get_product(db=db, product_id=updated_product.id)
     return product_with_category
 
+def _apply_restock_batch(db: Session, restock_items: List[schemas.RestockCreate]):
+    updated_products, error_message = crud.crud_inventory.restock_products(
+        db=db, restock_items=restock_items)
+
+    if error_message:
+        status_code = status.HTTP_400_BAD_REQUEST
+        if "not found" in error_message.lower():
+            status_code = status.HTTP_404_NOT_FOUND
+        raise HTTPException(
+            status_code=status_code,
+            detail=error_message
+        )
+    return updated_products
+
+@router.post(
+    "/restock/batch",
+    response_model=List[schemas.Product],
+    status_code=status.HTTP_200_OK,
+    summary="Restock many products in one transaction")
+def restock_products_batch_endpoint(
+    restock_items: List[schemas.RestockCreate],
+    db: Session = Depends(get_db)):
+    """
+    Apply a whole shipment of restocks in a single transaction and return the updated products.
+    """
+    return _apply_restock_batch(db, restock_items)
+
+@router.post(
+    "/restock/batch/csv",
+    response_model=List[schemas.Product],
+    status_code=status.HTTP_200_OK,
+    summary="Restock many products from a CSV upload",
+    openapi_extra={"requestBody": {"content": {"text/csv": {"schema": {"type": "string"}}}, "required": True}})
+async def restock_products_csv_endpoint(
+    request: Request,
+    db: Session = Depends(get_db)):
+    """
+    Same as `/restock/batch`, with the shipment sent as a `text/csv` body
+    with a header row: `product_id,quantity_added[,notes][,warehouse_id]`.
+    The body must be UTF-8 (a byte order mark is allowed).
+    """
+    try:
+        text = (await request.body()).decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"CSV body is not valid UTF-8 ({e.reason} at byte {e.start + 1}); re-export it as UTF-8.")
+    restock_items = []
+    for line_number, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+        try:
+            restock_items.append(schemas.RestockCreate(
+                product_id=row.get("product_id"),
+                quantity_added=row.get("quantity_added"),
+                notes=row.get("notes") or None,
+                warehouse_id=row.get("warehouse_id") or None))
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid CSV line {line_number}: {e.errors()[0]['msg']}")
+
+    return await run_in_threadpool(_apply_restock_batch, db, restock_items)
+
 @router.get(
     "/logs",
     response_model=List[schemas.InventoryLog],
     summary="Retrieve inventory change logs")
 def read_inventory_logs(
+    response: Response,
     product_id: Optional[int] = Query(None, description="Filter logs by Product ID"),
     skip: int = 0,
     limit: int = 100,
+    include_total: bool = Query(False, description="Return the total number of the product's logs in the X-Total-Count header"),
+    stream: Optional[StreamFormat] = Query(None, description="Stream the page as a JSON array (`json`) or NDJSON (`ndjson`), compressed per Accept-Encoding"),
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db)):
     """
     Retrieve a list of inventory change logs, optionally filtered by product.
@@ -52,6 +131,123 @@ def read_inventory_logs(
              status_code=status.HTTP_400_BAD_REQUEST,
              detail="Query parameter 'product_id' is required.")
 
+    if stream is not None:
+        def batches():
+            with SessionLocal() as stream_db:
+                yield from crud.crud_inventory.iter_inventory_logs_for_product(
+                    stream_db, product_id=product_id, skip=skip, limit=limit,
+                    batch_size=settings.STREAM_BATCH_SIZE)
+        response = stream_list(batches(), schemas.InventoryLog, stream, accept_encoding)
+
+    if include_total:
+        total, age = crud.crud_counters.count_inventory_logs(db, product_id=product_id)
+        set_total_count(response, total, age)
+    if stream is not None:
+        return response
+
     logs = crud.crud_inventory.get_inventory_logs_for_product(
         db=db, product_id=product_id, skip=skip, limit=limit)
     return logs
+
+@router.get(
+    "/availability",
+    response_model=List[schemas.StockAvailability],
+    summary="Available stock after pending-order reservations")
+def read_stock_availability(
+    product_id: List[int] = Query(..., description="Product IDs (repeat the parameter for several)"),
+    db: Session = Depends(get_db)):
+    """
+    On-hand quantity, quantity reserved by pending orders, and what is left to sell.
+    """
+    availability = crud.crud_reservation.get_stock_availability(db, product_ids=product_id)
+    found = {row[0] for row in availability}
+    missing_ids = [pid for pid in product_id if pid not in found]
+    if missing_ids:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product(s) with ID {', '.join(map(str, missing_ids))} not found.")
+    return [
+        schemas.StockAvailability(product_id=pid, on_hand=on_hand, reserved=reserved, available=on_hand - reserved)
+        for pid, on_hand, reserved in availability
+    ]
+
+@router.get(
+    "/forecast",
+    response_model=List[schemas.ProductForecast],
+    summary="Sales velocity, days of cover and reorder suggestions")
+def read_stock_forecast(
+    window: Literal["7d", "30d"] = Query("7d", description="Velocity window used for days of cover and reorder quantities"),
+    sort: Literal["days_of_cover", "velocity", "reorder_quantity"] = Query("days_of_cover"),
+    descending: Optional[bool] = Query(None, description="Defaults to most urgent first: ascending for days_of_cover, descending otherwise"),
+    category_id: Optional[int] = Query(None, description="Filter by Category ID"),
+    max_days_of_cover: Optional[float] = Query(None, ge=0, description="Only products that run out within this many days"),
+    min_velocity: Optional[float] = Query(None, ge=0, description="Only products selling at least this many units per day"),
+    lead_time_days: float = Query(settings.FORECAST_LEAD_TIME_DAYS, ge=0),
+    target_cover_days: float = Query(settings.FORECAST_TARGET_COVER_DAYS, ge=0),
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)):
+    """
+    Per-product exponentially weighted sales velocity (units/day over 7 and 30
+    days), days of on-hand cover at the `window` rate, and the quantity to
+    reorder to last `lead_time_days` + `target_cover_days`. Products without
+    recorded sales are omitted. Velocity is maintained incrementally by every
+    sale, so this is one query however long the sales history.
+    """
+    return crud.crud_sales_velocity.get_forecast(
+        db, window=window, sort=sort, descending=descending, category_id=category_id,
+        max_days_of_cover=max_days_of_cover, min_velocity=min_velocity,
+        lead_time_days=lead_time_days, target_cover_days=target_cover_days,
+        skip=skip, limit=limit)
+
+@router.get(
+    "/stream",
+    summary="Stream stock changes and low-stock alerts (server-sent events)")
+async def stream_inventory_events(
+    request: Request,
+    product_id: Optional[List[int]] = Query(None, description="Only stream changes for these Product IDs"),
+    category_id: Optional[List[int]] = Query(None, description="Only stream changes for products in these Category IDs"),
+    last_event_id: Optional[int] = Header(None, description="Resume after this inventory log ID")):
+    """
+    Server-sent event stream with one `stock_change` event per inventory log row,
+    plus `low_stock` / `low_stock_cleared` when a change crosses the low-stock
+    threshold. Event IDs are inventory log IDs, so reconnecting clients resume
+    from `Last-Event-ID` without gaps.
+    """
+    subscription = await stock_feed.subscribe(product_ids=product_id, category_ids=category_id)
+
+    async def event_source():
+        try:
+            last_id = last_event_id
+            if last_id is None:
+                last_id = await run_in_threadpool(latest_log_id)
+            else:
+                while True:
+                    entries = await run_in_threadpool(
+                        fetch_log_entries, last_id, product_id, category_id)
+                    for event_id, message in iter_events(entries, subscription, last_id):
+                        last_id = event_id
+                        yield message
+                    if len(entries) < FETCH_BATCH_SIZE:
+                        break
+                    last_id = max(last_id, entries[-1][0]["id"])
+
+            while not await request.is_disconnected():
+                try:
+                    entries = await asyncio.wait_for(
+                        subscription.queue.get(), timeout=settings.STOCK_STREAM_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if entries is None:
+                    break
+                for event_id, message in iter_events(entries, subscription, last_id):
+                    last_id = event_id
+                    yield message
+        finally:
+            stock_feed.unsubscribe(subscription)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,34 @@
+from fastapi import APIRouter
+from typing import List
+
+from app import schemas
+from app.core import admission
+from app.core.tasks import task_executor
+
+router = APIRouter(
+    prefix="/monitoring",
+    tags=["Monitoring"],)
+
+@router.get(
+    "/admission",
+    response_model=List[schemas.AdmissionStats],
+    summary="Admission control counters per route")
+def read_admission_stats():
+    """
+    Active and queued requests, admissions, rejections (queue full / timed
+    out) and queue wait times for every route limiter of this worker process.
+    """
+    return [limiter.snapshot() for limiter in admission.all_limiters()]
+
+@router.get(
+    "/tasks",
+    response_model=schemas.TaskStats,
+    summary="Post-commit background task counters")
+def read_task_stats():
+    """
+    State of this worker process's task executor: queue depth, running and
+    finished tasks (completed, failed, retried, dropped on a full queue,
+    coalesced), the age of the oldest queued task and the lag from commit to
+    the start of a task.
+    """
+    return task_executor.snapshot()
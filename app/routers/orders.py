@@ -1,16 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import datetime
 
 from app import crud, schemas
-from app.db.session import get_db
+from app.core.admission import AdmissionRoute
+from app.core.config import settings
+from app.core.pagination import set_total_count
+from app.core.streaming import StreamFormat, stream_list
+from app.db.session import SessionLocal, get_db
 from app.models.enums import OrderStatusEnum
 
 router = APIRouter(
     prefix="/orders",
     tags=["Orders & Sales"],
-    responses={404: {"description": "Not found"}},)
+    responses={404: {"description": "Not found"}},
+    route_class=AdmissionRoute,)
 
 @router.post(
     "/",
@@ -44,6 +49,7 @@ def create_order(
     response_model=List[schemas.Order],
     summary="Retrieve a list of orders")
 def read_orders(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     start_date: Optional[datetime.date] = Query(None, description="Filter by start date (YYYY-MM-DD)"),
@@ -51,11 +57,31 @@ def read_orders(
     product_id: Optional[int] = Query(None, description="Filter by product ID"),
     category_id: Optional[int] = Query(None, description="Filter by category ID"),
     status: Optional[OrderStatusEnum] = Query(None, description="Filter by order status"),
+    include_total: bool = Query(False, description="Return the total number of matching orders in the X-Total-Count header"),
+    stream: Optional[StreamFormat] = Query(None, description="Stream the page as a JSON array (`json`) or NDJSON (`ndjson`), compressed per Accept-Encoding"),
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db)):
     """
     Retrieve a list of orders with various filtering options and pagination.
     """
-    orders = crud.crud_order.get_orders(
+    if stream is not None:
+        def batches():
+            with SessionLocal() as stream_db:
+                yield from crud.crud_order.iter_orders(
+                    stream_db, skip=skip, limit=limit, batch_size=settings.STREAM_BATCH_SIZE,
+                    start_date=start_date, end_date=end_date,
+                    product_id=product_id, category_id=category_id, status=status)
+        response = stream_list(batches(), schemas.Order, stream, accept_encoding)
+
+    if include_total:
+        total, age = crud.crud_counters.count_orders(
+            db, start_date=start_date, end_date=end_date,
+            product_id=product_id, category_id=category_id, status=status)
+        set_total_count(response, total, age)
+    if stream is not None:
+        return response
+
+    orders = crud.crud_order.get_order_rows(
         db,
         skip=skip,
         limit=limit,
@@ -64,19 +90,6 @@ def read_orders(
         product_id=product_id,
         category_id=category_id,
         status=status)
-    if orders:
-        print(f"--- Inspecting first fetched order (ID: {orders[0].id}) ---")
-        print(f" Order Status: {orders[0].status}")
-        print(f"Accessing order.order_items: {orders[0].order_items}")
-        if orders[0].order_items:
-            print(f"Number of items found: {len(orders[0].order_items)}")
-            print(f" First item ID: {orders[0].order_items[0].id}")
-            print(f"First item quantity: {orders[0].order_items[0].quantity}")
-            print(f"  First item product ID: {orders[0].order_items[0].product_id}")
-        else:
-            print(f"No items loaded for this order instance!")
-
-    print("--- Returning orders from endpoint ---") 
     return orders
 @router.get(
     "/{order_id}",
@@ -97,6 +110,37 @@ def read_order(
             detail=f"Order with ID {order_id} not found")
     return db_order
 
+def _status_update_error_code(error_message: str) -> int:
+    if "not found" in error_message.lower():
+        return status.HTTP_404_NOT_FOUND
+    if "invalid status transition" in error_message.lower() or "insufficient stock" in error_message.lower():
+        return status.HTTP_409_CONFLICT
+    return status.HTTP_400_BAD_REQUEST
+
+@router.patch(
+    "/status",
+    response_model=schemas.OrderStatusBulkResult,
+    summary="Update the status of many orders at once")
+def update_orders_status(
+    status_update: schemas.OrderStatusBulkUpdate,
+    db: Session = Depends(get_db)):
+    """
+    Move many orders to one status in a single transaction (all or nothing).
+    Cancelling returns each order's items to stock and logs them as `return`.
+    Allowed transitions: pending -> completed/cancelled, completed -> cancelled.
+    """
+    result, error_message = crud.crud_order.update_orders_status(
+        db=db, order_ids=status_update.order_ids, new_status=status_update.status)
+    if result is None:
+        raise HTTPException(
+            status_code=_status_update_error_code(error_message),
+            detail=error_message
+        )
+    return schemas.OrderStatusBulkResult(
+        status=status_update.status,
+        updated_order_ids=result["updated"],
+        unchanged_order_ids=result["unchanged"])
+
 @router.patch(
     "/{order_id}/status",
     response_model=schemas.Order,
@@ -114,12 +158,12 @@ def update_order_status(
             detail="Status field is required for update."
         )
 
-    updated_order = crud.crud_order.update_order_status(
+    updated_order, error_message = crud.crud_order.update_order_status(
         db=db, order_id=order_id, new_status=status_update.status)
     if updated_order is None:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Order with ID {order_id} not found"
+            status_code=_status_update_error_code(error_message),
+            detail=error_message
         )
     db_order_with_details = crud.crud_order.get_order(db=db, order_id=updated_order.id)
     return db_order_with_details
@@ -136,7 +180,7 @@ def get_revenue_summary(
     Provides a summary of total revenue from completed orders,
     """
     try:
-        summary = crud.crud_order.get_revenue_summary(
+        summary = crud.crud_revenue.get_revenue_summary(
             db=db, period=period, start_date=start_date, end_date=end_date
         )
         return summary
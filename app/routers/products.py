@@ -1,15 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Header, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from starlette.concurrency import run_in_threadpool
+from typing import List, Literal, Optional
 from fastapi import Query
+import datetime
 
 from app import crud, models, schemas
-from app.db.session import get_db
+from app.core.admission import AdmissionRoute
+from app.core.bulk_io import iter_body_lines, iter_records
+from app.core.config import settings
+from app.core.pagination import set_total_count
+from app.core.streaming import StreamFormat, stream_list
+from app.db.session import SessionLocal, get_db
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
 
 router = APIRouter(
     prefix="/products",
     tags=["Products"],
-    responses={404: {"description": "Not found"}},)
+    responses={404: {"description": "Not found"}},
+    route_class=AdmissionRoute,)
 @router.post(
     "/",
     response_model=schemas.Product,
@@ -21,6 +35,10 @@ def create_product(
     """
     Register a new product in the system.
     """
+    if product.sku and crud.crud_product.get_product_by_sku(db, sku=product.sku):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Product with SKU '{product.sku}' already exists.")
     db_product = crud.crud_product.create_product(db=db, product=product)
     if db_product is None:
         raise HTTPException(
@@ -29,21 +47,69 @@ def create_product(
     created_product_with_details = crud.crud_product.get_product(db=db, product_id=db_product.id)
     return created_product_with_details
 
+@router.post(
+    "/import",
+    response_model=schemas.ProductImportSummary,
+    summary="Bulk import / upsert products from CSV or NDJSON",
+    openapi_extra={"requestBody": {"content": {
+        content_type: {"schema": {"type": "string"}} for content_type in IMPORT_CONTENT_TYPES
+    }, "required": True}})
+async def import_products(
+    request: Request,
+    db: Session = Depends(get_db)):
+    """
+    Stream a catalog into the database, upserting products by `sku`.
+    Send `text/csv` (header row) or `application/x-ndjson` with the fields
+    `sku, name, description, price, quantity` and either `category` (name) or
+    `category_id`. Returns counts of inserted, updated, unchanged and rejected rows.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = IMPORT_CONTENT_TYPES.get(content_type)
+    if fmt is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Content-Type must be one of: {', '.join(IMPORT_CONTENT_TYPES)}.")
+
+    def run_import():
+        records = iter_records(iter_body_lines(request.stream()), fmt)
+        return crud.crud_product.import_products(
+            db=db, records=records, chunk_size=settings.PRODUCT_IMPORT_CHUNK_SIZE)
+
+    return await run_in_threadpool(run_import)
+
 @router.get(
     "/",
     response_model=List[schemas.Product],
     summary="Retrieve a list of products")
 def read_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category_id: Optional[int] = Query(None, description="Filter by Category ID"),
     low_stock: Optional[bool] = Query(None, description="Filter by low stock status (True/False)") # Add query param
     ,
+    include_total: bool = Query(False, description="Return the total number of matching products in the X-Total-Count header"),
+    stream: Optional[StreamFormat] = Query(None, description="Stream the page as a JSON array (`json`) or NDJSON (`ndjson`), compressed per Accept-Encoding"),
+    accept_encoding: Optional[str] = Header(None),
     db: Session = Depends(get_db)):
     """
     Retrieve a list of products. Includes low stock flag.
     """
-    products = crud.crud_product.get_products(
+    if stream is not None:
+        def batches():
+            with SessionLocal() as stream_db:
+                yield from crud.crud_product.iter_products(
+                    stream_db, skip=skip, limit=limit, batch_size=settings.STREAM_BATCH_SIZE,
+                    category_id=category_id, low_stock=low_stock)
+        response = stream_list(batches(), schemas.Product, stream, accept_encoding)
+
+    if include_total:
+        total, age = crud.crud_counters.count_products(db, category_id=category_id, low_stock=low_stock)
+        set_total_count(response, total, age)
+    if stream is not None:
+        return response
+
+    products = crud.crud_product.get_product_rows(
         db, skip=skip, limit=limit, category_id=category_id, low_stock=low_stock)
     return products
 
@@ -92,6 +158,8 @@ def update_product(
              cat_check = db.query(models.Category).get(product_in.category_id)
              if not cat_check:
                   detail_msg = f"Category with ID {product_in.category_id} not found. Cannot update product."
+        if product_in.quantity is not None and product_id in crud.crud_warehouse_stock.get_warehouse_products(db):
+             detail_msg = f"Product ID {product_id} is stocked per warehouse; set its quantity per warehouse instead."
 
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -115,3 +183,177 @@ def delete_product(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product with ID {product_id} not found")
     return deleted_product
+
+@router.get(
+    "/{product_id}/sales",
+    response_model=schemas.ProductSalesSeries,
+    summary="Units sold and revenue of a product over time")
+def read_product_sales(
+    product_id: int,
+    bucket: Literal["hour", "day", "week"] = Query("day"),
+    start: Optional[datetime.datetime] = Query(None, alias="from", description="Defaults to 2 days, 90 days or 52 weeks before `to`, by bucket"),
+    end: Optional[datetime.datetime] = Query(None, alias="to", description="Defaults to now"),
+    max_points: int = Query(settings.SALES_SERIES_MAX_POINTS, ge=1, le=settings.SALES_SERIES_MAX_POINTS),
+    db: Session = Depends(get_db)):
+    """
+    Completed sales of one product per hour, day or week (UTC; weeks start on
+    Monday), with empty buckets as zeros, ready to chart. The range is widened
+    to whole buckets. Longer ranges are downsampled: each point then covers
+    `bucket_span` consecutive buckets, so at most `max_points` are returned.
+    """
+    if start is not None and end is not None and start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be before 'to'.")
+    if crud.crud_product.get_product(db, product_id=product_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {product_id} not found")
+    return crud.crud_sales_series.get_product_sales(
+        db, product_id, bucket=bucket, start=start, end=end, max_points=max_points)
+
+@router.get(
+    "/{product_id}/stock-shards",
+    response_model=schemas.StockShards,
+    summary="Show how a product's stock is sharded")
+def read_stock_shards(
+    product_id: int,
+    db: Session = Depends(get_db)):
+    """
+    Quantity per shard of a product with sharded stock (`shards` is empty otherwise)
+    and its exact total, which is the product's `quantity`.
+    """
+    db_product = crud.crud_product.get_product(db, product_id=product_id)
+    if db_product is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {product_id} not found")
+    shards = [shard.quantity for shard in crud.crud_stock_shards.get_shards(db, product_id)]
+    return schemas.StockShards(
+        product_id=product_id, shards=shards, total=sum(shards) if shards else db_product.quantity)
+
+@router.put(
+    "/{product_id}/stock-shards",
+    response_model=schemas.StockShards,
+    summary="Split a product's stock across several counter rows")
+def shard_product_stock(
+    product_id: int,
+    shards_in: schemas.StockShardsUpdate,
+    db: Session = Depends(get_db)):
+    """
+    For flash-sale products: spreads the stock evenly over `shards` rows, so
+    concurrent orders decrement different rows instead of all waiting on the
+    product's row. The product's `quantity` and `is_low_stock` then come from
+    the sum of the shards.
+    Calling it again re-splits the stock across the new count.
+    """
+    shards, error_message = crud.crud_stock_shards.shard_product(db, product_id, shards_in.shards)
+    if shards is None:
+        if "not found" in error_message:
+            status_code = status.HTTP_404_NOT_FOUND
+        elif "stocked per warehouse" in error_message:
+            status_code = status.HTTP_409_CONFLICT
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        raise HTTPException(status_code=status_code, detail=error_message)
+    quantities = [shard.quantity for shard in shards]
+    return schemas.StockShards(product_id=product_id, shards=quantities, total=sum(quantities))
+
+@router.delete(
+    "/{product_id}/stock-shards",
+    response_model=schemas.Product,
+    summary="Fold a product's sharded stock back into its quantity")
+def unshard_product_stock(
+    product_id: int,
+    db: Session = Depends(get_db)):
+    """
+    Sums the shards back into the product's own `quantity` and removes them.
+    """
+    product, error_message = crud.crud_stock_shards.unshard_product(db, product_id)
+    if product is None:
+        if "not found" in error_message:
+            status_code = status.HTTP_404_NOT_FOUND
+        elif "not sharded" in error_message:
+            status_code = status.HTTP_409_CONFLICT
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        raise HTTPException(status_code=status_code, detail=error_message)
+    return crud.crud_product.get_product(db, product_id=product_id)
+
+@router.get(
+    "/{product_id}/warehouse-stock",
+    response_model=schemas.ProductWarehouseStock,
+    summary="Show a product's stock per warehouse")
+def read_warehouse_stock(
+    product_id: int,
+    db: Session = Depends(get_db)):
+    """
+    Quantity per warehouse of a product stocked per warehouse (`stock` is empty
+    otherwise) and its exact total, which is the product's `quantity`.
+    """
+    db_product = crud.crud_product.get_product(db, product_id=product_id)
+    if db_product is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {product_id} not found")
+    rows = crud.crud_warehouse_stock.get_stock(db, product_id)
+    return schemas.ProductWarehouseStock(
+        product_id=product_id,
+        stock=rows,
+        total=sum(row.quantity for row in rows) if rows else db_product.quantity)
+
+@router.put(
+    "/{product_id}/warehouse-stock",
+    response_model=schemas.ProductWarehouseStock,
+    summary="Set a product's stock per warehouse")
+def set_warehouse_stock(
+    product_id: int,
+    stock_in: schemas.WarehouseStockUpdate,
+    db: Session = Depends(get_db)):
+    """
+    Replaces the product's stock with the given quantity per warehouse.
+    Orders then take its stock from its warehouses through the configured
+    allocation strategy (`WAREHOUSE_ALLOCATION_STRATEGY`), locking only the
+    warehouse rows they draw from; the product's `quantity` and `is_low_stock`
+    then come from the sum of its warehouses.
+    Sharded products must be unsharded first.
+    """
+    quantities = {}
+    for entry in stock_in.stock:
+        if entry.warehouse_id in quantities:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Warehouse ID {entry.warehouse_id} is listed more than once.")
+        quantities[entry.warehouse_id] = entry.quantity
+    rows, error_message = crud.crud_warehouse_stock.set_stock(db, product_id, quantities)
+    if rows is None:
+        if "not found" in error_message:
+            status_code = status.HTTP_404_NOT_FOUND
+        elif "sharded" in error_message:
+            status_code = status.HTTP_409_CONFLICT
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        raise HTTPException(status_code=status_code, detail=error_message)
+    return schemas.ProductWarehouseStock(
+        product_id=product_id, stock=rows, total=sum(row.quantity for row in rows))
+
+@router.delete(
+    "/{product_id}/warehouse-stock",
+    response_model=schemas.Product,
+    summary="Fold a product's warehouse stock back into its quantity")
+def unstock_warehouse_stock(
+    product_id: int,
+    db: Session = Depends(get_db)):
+    """
+    Sums the warehouse stock back into the product's own `quantity` and removes it.
+    """
+    product, error_message = crud.crud_warehouse_stock.unstock_product(db, product_id)
+    if product is None:
+        if "not found" in error_message:
+            status_code = status.HTTP_404_NOT_FOUND
+        elif "not stocked per warehouse" in error_message:
+            status_code = status.HTTP_409_CONFLICT
+        else:
+            status_code = status.HTTP_400_BAD_REQUEST
+        raise HTTPException(status_code=status_code, detail=error_message)
+    return crud.crud_product.get_product(db, product_id=product_id)
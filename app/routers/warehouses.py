@@ -0,0 +1,124 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import List
+from app import crud, schemas
+from app.core.admission import AdmissionRoute
+from app.db.session import get_db
+
+router = APIRouter(
+    prefix="/warehouses",
+    tags=["Warehouses"],
+    responses={404: {"description": "Not found"}},
+    route_class=AdmissionRoute,)
+
+@router.post(
+    "/",
+    response_model=schemas.Warehouse,
+    status_code=status.HTTP_201_CREATED,
+    summary="Create a new warehouse")
+def create_warehouse(
+    warehouse: schemas.WarehouseCreate,
+    db: Session = Depends(get_db)):
+    """
+    Create a new warehouse. Products are stocked in it with
+    `PUT /products/{product_id}/warehouse-stock` or a restock naming it.
+    """
+    if crud.crud_warehouse.get_warehouse_by_name(db, name=warehouse.name):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Warehouse with name '{warehouse.name}' already exists."
+        )
+    return crud.crud_warehouse.create_warehouse(db=db, warehouse=warehouse)
+
+@router.get(
+    "/",
+    response_model=List[schemas.Warehouse],
+    summary="Retrieve a list of warehouses")
+def read_warehouses(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)):
+    """
+    Retrieve warehouses in allocation order (by priority, then ID).
+    """
+    return crud.crud_warehouse.get_warehouses(db, skip=skip, limit=limit)
+
+@router.get(
+    "/{warehouse_id}",
+    response_model=schemas.Warehouse,
+    summary="Retrieve a specific warehouse by ID")
+def read_warehouse(
+    warehouse_id: int,
+    db: Session = Depends(get_db)):
+    """
+    Retrieve details for a specific warehouse using its ID.
+    """
+    db_warehouse = crud.crud_warehouse.get_warehouse(db, warehouse_id=warehouse_id)
+    if db_warehouse is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Warehouse with ID {warehouse_id} not found")
+    return db_warehouse
+
+@router.patch(
+    "/{warehouse_id}",
+    response_model=schemas.Warehouse,
+    summary="Update a warehouse")
+def update_warehouse(
+    warehouse_id: int,
+    warehouse_in: schemas.WarehouseUpdate,
+    db: Session = Depends(get_db)):
+    """
+    Update a warehouse's details. Only provided fields are updated.
+    """
+    db_warehouse = crud.crud_warehouse.get_warehouse(db, warehouse_id=warehouse_id)
+    if db_warehouse is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Warehouse with ID {warehouse_id} not found")
+
+    if warehouse_in.name and warehouse_in.name != db_warehouse.name:
+        existing_warehouse = crud.crud_warehouse.get_warehouse_by_name(db, name=warehouse_in.name)
+        if existing_warehouse and existing_warehouse.id != warehouse_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Warehouse name '{warehouse_in.name}' is already taken."
+            )
+
+    return crud.crud_warehouse.update_warehouse(
+        db=db, db_warehouse=db_warehouse, warehouse_in=warehouse_in)
+
+@router.delete(
+    "/{warehouse_id}",
+    response_model=schemas.Warehouse,
+    summary="Delete a warehouse")
+def delete_warehouse(
+    warehouse_id: int,
+    db: Session = Depends(get_db)):
+    """
+    Delete a warehouse that has never held stock.
+    """
+    deleted_warehouse, error_message = crud.crud_warehouse.delete_warehouse(db=db, warehouse_id=warehouse_id)
+    if deleted_warehouse is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND if "not found" in error_message else status.HTTP_409_CONFLICT,
+            detail=error_message)
+    return deleted_warehouse
+
+@router.get(
+    "/{warehouse_id}/stock",
+    response_model=List[schemas.WarehouseProductStock],
+    summary="List the stock held by a warehouse")
+def read_warehouse_stock(
+    warehouse_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)):
+    """
+    Quantity of every product stocked in the warehouse, by product ID.
+    """
+    if crud.crud_warehouse.get_warehouse(db, warehouse_id=warehouse_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Warehouse with ID {warehouse_id} not found")
+    return crud.crud_warehouse.get_warehouse_stock(db, warehouse_id, skip=skip, limit=limit)
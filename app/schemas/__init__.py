@@ -1,7 +1,10 @@
 # app/schemas/__init__.py
-from .category import Category, CategoryCreate, CategoryUpdate
-from .product import Product, ProductCreate, ProductUpdate
+from .category import Category, CategoryCreate, CategoryUpdate, CategoryWithStats
+from .product import Product, ProductCreate, ProductUpdate, ProductImportRow, ProductImportError, ProductImportSummary, ProductSalesSeries
 from .order_item import OrderItem, OrderItemCreate
-from .order import Order, OrderCreate, OrderUpdate, RevenueSummary
+from .order import Order, OrderCreate, OrderUpdate, OrderStatusBulkUpdate, OrderStatusBulkResult, RevenueSummary
 # Add InventoryLog schemas
-from .inventory_log import InventoryLog, InventoryLogCreate, RestockCreate # <--- ADD
\ No newline at end of file
+from .inventory_log import InventoryLog, InventoryLogCreate, RestockCreate, StockAvailability, StockShards, StockShardsUpdate, ProductForecast # <--- ADD
+from .monitoring import AdmissionStats, TaskStats
+from .dashboard import DashboardSummary
+from .warehouse import Warehouse, WarehouseCreate, WarehouseUpdate, WarehouseStockUpdate, ProductWarehouseStock, WarehouseProductStock
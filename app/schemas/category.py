@@ -1,5 +1,5 @@
 # app/schemas/category.py
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional
 
 class CategoryBase(BaseModel):
@@ -20,5 +20,11 @@ class CategoryInDBBase(CategoryBase):
 class Category(CategoryInDBBase):
     pass 
 
+class CategoryWithStats(Category):
+    product_count: int = 0
+    units_on_hand: int = 0
+    stock_value: float = Field(0.0, description="Sum of price * quantity over the category's products")
+    low_stock_count: int = 0
+
 class CategoryInDB(CategoryInDBBase):
     pass 
\ No newline at end of file
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List
+import datetime
+
+from .order import RevenueSummary
+
+class DashboardProduct(BaseModel):
+    id: int
+    name: str
+    category_id: int
+    quantity: int
+
+class DashboardOrder(BaseModel):
+    id: int
+    order_date: datetime.datetime
+    total_amount: float
+
+class DashboardSummary(BaseModel):
+    generated_at: datetime.datetime
+    stale: bool = Field(False, description="A write happened since the snapshot was computed; a refresh is on its way")
+    order_counts: Dict[str, int] = Field(..., description="Orders per status")
+    product_count: int
+    category_count: int
+    low_stock_count: int
+    low_stock_products: List[DashboardProduct] = Field(..., description="Lowest-stock products first")
+    pending_orders: List[DashboardOrder] = Field(..., description="Most recent pending orders first")
+    revenue_by_month: List[RevenueSummary]
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
 import datetime
 from app.models.enums import InventoryLogReasonEnum
 
@@ -10,6 +10,7 @@ class InventoryLogBase(BaseModel):
     reason: InventoryLogReasonEnum
     notes: Optional[str] = None
     order_id: Optional[int] = None
+    warehouse_id: Optional[int] = None
 class InventoryLogCreate(InventoryLogBase):
     pass 
 
@@ -24,4 +25,29 @@ class InventoryLog(InventoryLogInDBBase):
 class RestockCreate(BaseModel):
     product_id: int
     quantity_added: int
-    notes: Optional[str] = None
\ No newline at end of file
+    notes: Optional[str] = None
+    warehouse_id: Optional[int] = Field(None, description="Required for, and only allowed for, products stocked per warehouse")
+
+class StockAvailability(BaseModel):
+    product_id: int
+    on_hand: int
+    reserved: int = Field(..., description="Held by unexpired reservations of pending orders")
+    available: int
+
+class StockShardsUpdate(BaseModel):
+    shards: int = Field(..., ge=1, le=64, description="Number of counter rows to split the product's stock across")
+
+class StockShards(BaseModel):
+    product_id: int
+    shards: List[int] = Field(..., description="Quantity held by each shard, in shard order; empty when not sharded")
+    total: int
+
+class ProductForecast(BaseModel):
+    product_id: int
+    name: str
+    category_id: int
+    quantity: int = Field(..., description="On-hand stock")
+    velocity_7d: float = Field(..., description="Exponentially weighted units sold per day, 7-day window")
+    velocity_30d: float = Field(..., description="Exponentially weighted units sold per day, 30-day window")
+    days_of_cover: Optional[float] = Field(None, description="Days until on-hand stock runs out at the chosen window's rate")
+    reorder_quantity: int = Field(..., description="Units to order to cover the lead time plus the target cover")
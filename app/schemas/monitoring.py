@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import Literal
+
+class AdmissionStats(BaseModel):
+    route: str
+    kind: Literal["read", "write"]
+    concurrency: int
+    queue_size: int
+    active: int
+    queued: int
+    admitted: int
+    rejected_queue_full: int
+    rejected_timeout: int
+    wait_seconds_avg: float
+    wait_seconds_max: float
+    hold_seconds_avg: float
+
+class TaskStats(BaseModel):
+    workers: int
+    synchronous: bool
+    queue_size: int
+    queued: int
+    running: int
+    submitted: int
+    completed: int
+    failed: int
+    retried: int
+    dropped: int
+    coalesced: int
+    oldest_queued_seconds: float
+    lag_seconds_avg: float
+    lag_seconds_max: float
+    run_seconds_avg: float
@@ -11,6 +11,15 @@ class OrderCreate(BaseModel):
 class OrderUpdate(BaseModel):
     status: Optional[OrderStatusEnum] = None 
 
+class OrderStatusBulkUpdate(BaseModel):
+    order_ids: List[int] = Field(..., min_length=1)
+    status: OrderStatusEnum
+
+class OrderStatusBulkResult(BaseModel):
+    status: OrderStatusEnum
+    updated_order_ids: List[int]
+    unchanged_order_ids: List[int] = Field(..., description="Orders that already had the target status")
+
 class OrderBase(BaseModel):
     id: int
     order_date: datetime.datetime
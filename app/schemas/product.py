@@ -1,9 +1,10 @@
 from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional
+from typing import List, Optional
 import datetime
 from .category import Category
 
 class ProductBase(BaseModel):
+    sku: Optional[str] = None
     name: str
     description: Optional[str] = None
     price: float
@@ -13,6 +14,7 @@ class ProductCreate(ProductBase):
     category_id: int
 
 class ProductUpdate(BaseModel):
+    sku: Optional[str] = None
     name: Optional[str] = None
     description: Optional[str] = None
     price: Optional[float] = None
@@ -32,4 +34,42 @@ class Product(ProductInDBBase):
     is_low_stock: bool = Field(..., description="True if product quantity is below the configured threshold")
 
 class ProductInDB(ProductInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+class ProductImportRow(BaseModel):
+    """One record of a bulk catalog import, upserted by ``sku``."""
+    sku: str = Field(..., min_length=1, max_length=64)
+    name: str = Field(..., min_length=1, max_length=100)
+    description: Optional[str] = None
+    price: float = Field(..., ge=0)
+    quantity: Optional[int] = Field(None, ge=0)
+    category: Optional[str] = Field(None, description="Category name; resolved to an ID")
+    category_id: Optional[int] = None
+
+class ProductImportError(BaseModel):
+    line: int
+    sku: Optional[str] = None
+    error: str
+
+class ProductImportSummary(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    rejected: int = 0
+    errors: List[ProductImportError] = Field(default_factory=list, description="First rejected rows")
+
+class ProductSalesPoint(BaseModel):
+    start: datetime.datetime
+    end: datetime.datetime
+    units: int
+    revenue: float
+
+class ProductSalesSeries(BaseModel):
+    product_id: int
+    bucket: str
+    bucket_span: int = Field(..., description="Buckets merged into each point to stay within max_points")
+    start: datetime.datetime
+    end: datetime.datetime
+    total_units: int
+    total_revenue: float
+    points: List[ProductSalesPoint]
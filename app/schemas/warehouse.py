@@ -0,0 +1,37 @@
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+
+class WarehouseBase(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100)
+    location: Optional[str] = Field(None, max_length=255)
+    priority: int = Field(0, description="Lower values are allocated from first by the 'priority' strategy")
+
+class WarehouseCreate(WarehouseBase):
+    pass
+
+class WarehouseUpdate(BaseModel):
+    name: Optional[str] = Field(None, min_length=1, max_length=100)
+    location: Optional[str] = Field(None, max_length=255)
+    priority: Optional[int] = None
+
+class Warehouse(WarehouseBase):
+    id: int
+    model_config = ConfigDict(from_attributes=True)
+
+class WarehouseStockEntry(BaseModel):
+    warehouse_id: int
+    quantity: int = Field(..., ge=0)
+    model_config = ConfigDict(from_attributes=True)
+
+class WarehouseStockUpdate(BaseModel):
+    stock: List[WarehouseStockEntry] = Field(..., min_length=1, description="Quantity per warehouse; replaces the product's current warehouse stock")
+
+class ProductWarehouseStock(BaseModel):
+    product_id: int
+    stock: List[WarehouseStockEntry] = Field(..., description="Quantity per warehouse; empty when the product is not stocked per warehouse")
+    total: int
+
+class WarehouseProductStock(BaseModel):
+    product_id: int
+    quantity: int
+    model_config = ConfigDict(from_attributes=True)
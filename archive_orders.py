@@ -0,0 +1,38 @@
+"""
+Moves COMPLETED and CANCELLED orders older than a cutoff, with their items,
+out of the orders tables into compressed, date-partitioned files under
+ORDER_ARCHIVE_DIR (see app/crud/crud_archive.py). The API keeps serving them
+by ID and date range. Run it periodically, e.g. nightly from cron:
+
+    python archive_orders.py [--older-than-days 365] [--batch-size 5000]
+"""
+import argparse
+import datetime
+import sys
+import time
+
+from app.core.config import settings
+from app.crud import crud_archive
+from app.db.session import SessionLocal
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Archive old completed and cancelled orders.")
+    parser.add_argument("--older-than-days", type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    before = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=args.older_than_days)
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        archived = crud_archive.archive_orders(db, before, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Archived {archived} orders dated before {before:%Y-%m-%d %H:%M} UTC "
+          f"to {settings.ORDER_ARCHIVE_DIR} ({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+Order throughput on a single hot SKU: every worker process places COMPLETED
+orders for the same product, once with its stock in ``products.quantity``
+and once with it split across ``--shards`` stock_shards rows.
+
+Workers are processes, each with its own engine, so the numbers measure the
+database rather than the GIL. Runs against a temporary SQLite file by
+default. SQLite serializes all writers, so there the two modes should come
+out close; pass a PostgreSQL or MySQL URL to measure row-lock contention
+(the tables are created if missing). ``--rtt-ms`` adds that much latency to
+every statement, as a database across the network would: row locks are then
+held for realistic times even when the client machine is CPU-bound. On
+PostgreSQL the average number of backends waiting on a lock is sampled too.
+
+    python -m benchmarks.bench_hot_sku [--workers 8] [--seconds 5] [--shards 8] [--rtt-ms 0] [--database-url URL]
+"""
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import Settings
+from app.db.base import Base, Category, Product
+from app.db.session import build_engine
+from app.crud import crud_order, crud_stock_shards
+from app.models.enums import OrderStatusEnum
+from app.schemas.order import OrderCreate
+from app.schemas.order_item import OrderItemCreate
+
+STOCK = 10 ** 9
+
+
+def _sessionmaker(url: str, pool_size: int):
+    engine = build_engine(Settings(DATABASE_URL=url, DB_POOL_SIZE=pool_size))
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def _new_product(SessionLocal) -> int:
+    with SessionLocal() as db:
+        category = Category(name=f"Bench {uuid.uuid4().hex[:12]}")
+        db.add(category)
+        db.flush()
+        product = Product(name="Flash sale SKU", price=9.99, quantity=STOCK, category_id=category.id)
+        db.add(product)
+        db.commit()
+        return product.id
+
+
+def _worker(url: str, product_id: int, start, seconds: float, rtt: float, results) -> None:
+    engine, SessionLocal = _sessionmaker(url, pool_size=2)
+    if rtt:
+        event.listen(engine, "before_cursor_execute", lambda *args: time.sleep(rtt))
+    order = OrderCreate(
+        status=OrderStatusEnum.COMPLETED,
+        items=[OrderItemCreate(product_id=product_id, quantity=1)],
+    )
+    placed = failed = 0
+    # create_order reports every step on stdout.
+    with SessionLocal() as db, contextlib.redirect_stdout(io.StringIO()):
+        db.connection()  # connect before the clock starts
+        start.wait()
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            created, _ = crud_order.create_order(db, order)
+            if created is None:
+                failed += 1
+            else:
+                placed += 1
+            db.expunge_all()
+    results.put((placed, failed))
+    engine.dispose()
+
+
+def _sample_lock_waits(engine, stop: threading.Event, samples: list) -> None:
+    """Backends of this database waiting on a lock, every 10 ms (PostgreSQL only)."""
+    with engine.connect() as conn:
+        while not stop.wait(0.01):
+            samples.append(conn.execute(text(
+                "SELECT count(*) FROM pg_stat_activity "
+                "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+            )).scalar())
+            conn.rollback()
+
+
+def _run(engine, url: str, product_id: int, workers: int, seconds: float, rtt: float):
+    context = multiprocessing.get_context("spawn")
+    start, results = context.Event(), context.Queue()
+    processes = [
+        context.Process(target=_worker, args=(url, product_id, start, seconds, rtt, results))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    time.sleep(2.0)  # let every worker import and connect
+    stop, samples = threading.Event(), []
+    sampler = None
+    if engine.dialect.name == "postgresql":
+        sampler = threading.Thread(target=_sample_lock_waits, args=(engine, stop, samples))
+        sampler.start()
+    start.set()
+    counts = [results.get() for _ in processes]
+    stop.set()
+    if sampler is not None:
+        sampler.join()
+    for process in processes:
+        process.join()
+    lock_waits = sum(samples) / len(samples) if samples else None
+    return sum(placed for placed, _ in counts) / seconds, sum(failed for _, failed in counts), lock_waits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--shards", type=int, default=8)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Latency added to every statement")
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    url = args.database_url
+    if url is None:
+        url = "sqlite+pysqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench_hot_sku_"), "bench.db")
+    engine, SessionLocal = _sessionmaker(url, pool_size=2)
+    Base.metadata.create_all(engine)
+
+    print(f"{engine.url.get_backend_name()}, {args.workers} worker processes, "
+          f"{args.rtt_ms:g} ms per statement, {args.seconds:g}s per mode")
+    print(f"{'stock':<22}{'orders/s':>10}{'failed':>8}{'lock waits':>12}")
+    for shards in (0, args.shards):
+        product_id = _new_product(SessionLocal)
+        if shards:
+            with SessionLocal() as db:
+                crud_stock_shards.shard_product(db, product_id, shards)
+        label = f"{shards} shards" if shards else "products.quantity"
+        rate, failed, lock_waits = _run(engine, url, product_id, args.workers, args.seconds, args.rtt_ms / 1000)
+        waits = f"{lock_waits:.2f}" if lock_waits is not None else "-"
+        print(f"{label:<22}{rate:>10.1f}{failed:>8}{waits:>12}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
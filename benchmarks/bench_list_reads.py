@@ -0,0 +1,107 @@
+"""
+Per-row CPU time and memory of the list endpoints' read paths: ORM objects
+(``get_products`` / ``get_orders``, with ``_add_low_stock_flag`` and
+``from_attributes`` validation) versus the Core row paths
+(``get_product_rows`` / ``get_order_rows``) that build plain dicts with
+``is_low_stock`` computed in SQL.
+
+Each call covers what a request pays for: the crud read, then validation and
+JSON encoding with the response schema, as FastAPI does. Memory is the
+tracemalloc peak of one call. Runs against an in-memory SQLite database so
+the numbers are dominated by Python work rather than I/O:
+
+    python -m benchmarks.bench_list_reads [--rows 1000] [--repeat 20]
+"""
+import argparse
+import time
+import tracemalloc
+from typing import List
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import schemas
+from app.db.base import Base, Category, Product, Order, OrderItem
+from app.crud import crud_category, crud_product, crud_order
+
+ITEMS_PER_ORDER = 3
+
+
+def _seed(db, rows):
+    db.execute(insert(Category), [{"id": i, "name": f"Category {i}"} for i in range(1, 11)])
+    db.execute(insert(Product), [
+        {"id": i, "name": f"Product {i:06d}", "description": "Benchmark product", "price": 9.99,
+         "quantity": i % 40, "category_id": i % 10 + 1}
+        for i in range(1, rows + 1)
+    ])
+    db.execute(insert(Order), [{"id": i, "total_amount": 29.97, "status": "COMPLETED"} for i in range(1, rows + 1)])
+    db.execute(insert(OrderItem), [
+        {"order_id": i, "product_id": (i * ITEMS_PER_ORDER + n) % rows + 1, "quantity": 1, "price_per_unit": 9.99}
+        for i in range(1, rows + 1) for n in range(ITEMS_PER_ORDER)
+    ])
+    db.commit()
+
+
+def _respond(adapter, rows):
+    return adapter.dump_json(adapter.validate_python(rows))
+
+
+def _measure(SessionLocal, call, repeat):
+    """(seconds per call, peak bytes of one call), the session cleared between calls."""
+    with SessionLocal() as db:
+        call(db)  # warm the compiled cache and the category map
+        db.expunge_all()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            call(db)
+            db.expunge_all()
+        elapsed = (time.perf_counter() - started) / repeat
+
+        tracemalloc.start()
+        call(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        db.expunge_all()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000, help="Products and orders per page")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        _seed(db, args.rows)
+        crud_category.get_category_map(db)
+
+    products = TypeAdapter(List[schemas.Product])
+    orders = TypeAdapter(List[schemas.Order])
+    cases = [
+        ("products",
+         lambda db: _respond(products, crud_product.get_products(db, limit=args.rows)),
+         lambda db: _respond(products, crud_product.get_product_rows(db, limit=args.rows))),
+        ("orders",
+         lambda db: _respond(orders, crud_order.get_orders(db, limit=args.rows)),
+         lambda db: _respond(orders, crud_order.get_order_rows(db, limit=args.rows))),
+    ]
+
+    print(f"{args.rows} rows per call")
+    print(f"{'list':<10}{'ORM us/row':>12}{'rows us/row':>13}{'saved':>8}{'ORM KiB/row':>13}{'rows KiB/row':>14}{'saved':>8}")
+    for name, orm_call, rows_call in cases:
+        orm_time, orm_peak = _measure(SessionLocal, orm_call, args.repeat)
+        rows_time, rows_peak = _measure(SessionLocal, rows_call, args.repeat)
+        print(
+            f"{name:<10}"
+            f"{orm_time / args.rows * 1e6:>12.1f}{rows_time / args.rows * 1e6:>13.1f}{1 - rows_time / orm_time:>8.0%}"
+            f"{orm_peak / args.rows / 1024:>13.2f}{rows_peak / args.rows / 1024:>14.2f}{1 - rows_peak / orm_peak:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
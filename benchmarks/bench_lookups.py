@@ -0,0 +1,103 @@
+"""
+Per-call Python overhead of the hot lookups: statement built on every call
+(the previous ``db.query(...).filter(...)`` form) versus the module-level
+statements in ``app/crud`` that only bind parameters.
+
+Runs against an in-memory SQLite database so the numbers are dominated by
+SQLAlchemy's construction / cache-key / ORM work rather than I/O:
+
+    python -m benchmarks.bench_lookups [--calls 5000]
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import joinedload, sessionmaker, selectinload
+from sqlalchemy.pool import StaticPool
+
+from app.db.base import Base, Category, Product, Order, OrderItem
+from app.crud import crud_category, crud_product, crud_order
+from app.crud.crud_product import product_by_id_for_update
+
+
+def _seed(db):
+    db.execute(insert(Category), [{"id": i, "name": f"Category {i}"} for i in range(1, 11)])
+    db.execute(insert(Product), [
+        {"id": i, "name": f"Product {i}", "price": 9.99, "quantity": 50, "category_id": i % 10 + 1}
+        for i in range(1, 1001)
+    ])
+    db.execute(insert(Order), [{"id": i, "total_amount": 30.0, "status": "PENDING"} for i in range(1, 101)])
+    db.execute(insert(OrderItem), [
+        {"order_id": i, "product_id": i * 3 + n, "quantity": 1, "price_per_unit": 9.99}
+        for i in range(1, 101) for n in range(3)
+    ])
+    db.commit()
+
+
+# The implementations these lookups replaced, kept here as the baseline.
+def _old_get_product(db, product_id):
+    return db.query(Product).options(joinedload(Product.category)).filter(Product.id == product_id).first()
+
+def _old_get_category(db, category_id):
+    return db.query(Category).filter(Category.id == category_id).first()
+
+def _old_get_category_by_name(db, name):
+    return db.query(Category).filter(Category.name == name).first()
+
+def _old_get_order(db, order_id):
+    return (
+        db.query(Order)
+        .options(selectinload(Order.order_items).selectinload(OrderItem.product))
+        .filter(Order.id == order_id)
+        .first()
+    )
+
+def _old_lock_product(db, product_id):
+    return db.query(Product).filter(Product.id == product_id).with_for_update().first()
+
+def _new_lock_product(db, product_id):
+    return db.execute(product_by_id_for_update, {"product_id": product_id}).scalars().first()
+
+
+CASES = [
+    ("get_product", _old_get_product, lambda db, i: crud_product.get_product(db, i), lambda i: i % 1000 + 1),
+    ("get_category", _old_get_category, lambda db, i: crud_category.get_category(db, i), lambda i: i % 10 + 1),
+    ("get_category_by_name", _old_get_category_by_name,
+     lambda db, name: crud_category.get_category_by_name(db, name), lambda i: f"Category {i % 10 + 1}"),
+    ("get_order", _old_get_order, lambda db, i: crud_order.get_order(db, i), lambda i: i % 100 + 1),
+    ("create_order product lock", _old_lock_product, _new_lock_product, lambda i: i % 1000 + 1),
+]
+
+
+def _time_per_call(SessionLocal, fn, arg_for, calls):
+    with SessionLocal() as db:
+        for i in range(200):  # warm the compiled cache
+            fn(db, arg_for(i))
+            db.expunge_all()
+        started = time.perf_counter()
+        for i in range(calls):
+            fn(db, arg_for(i))
+            db.expunge_all()
+        return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        _seed(db)
+
+    print(f"{'lookup':<28}{'before (us)':>12}{'after (us)':>12}{'saved':>8}")
+    for name, old, new, arg_for in CASES:
+        before = _time_per_call(SessionLocal, old, arg_for, args.calls) * 1e6
+        after = _time_per_call(SessionLocal, new, arg_for, args.calls) * 1e6
+        print(f"{name:<28}{before:>12.1f}{after:>12.1f}{(1 - after / before):>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Query-plan regression check for the crud layer.
+
+Seeds a throwaway SQLite database, runs every crud read path against it while
+capturing the SQL the engine emits, runs ``EXPLAIN QUERY PLAN`` on each
+statement and fails when:
+
+* a statement does a bare ``SCAN`` (no index) or builds an automatic index on
+  one of the large tables, or
+* a crud call emits more statements than its budget (N+1 detection).
+
+``SCAN <table> USING INDEX`` is accepted: that is SQLite walking an index in
+ORDER BY order and stopping at the LIMIT.
+
+Run from the project root:
+
+    python check_query_plans.py
+
+Exits with status 1 when any check fails.
+"""
+import datetime
+import os
+import random
+import re
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import create_engine, event, func, insert, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.db.base import Base, Category, Product, Order, OrderItem, InventoryLog, ArchivedOrder
+from app.models.enums import OrderStatusEnum, InventoryLogReasonEnum
+from app.crud import crud_category, crud_product, crud_order, crud_inventory, crud_reservation, crud_stock_shards, crud_sales_velocity, crud_sales_series, crud_warehouse, crud_warehouse_stock, crud_revenue, crud_archive
+
+# Orders older than this are archived after seeding, so both halves are covered.
+ARCHIVE_AFTER_DAYS = 540
+NUM_CATEGORIES = 20
+NUM_PRODUCTS = 5_000
+NUM_ORDERS = 20_000
+ITEMS_PER_ORDER = 3
+LOGS_PER_PRODUCT = 12
+
+# Orders, then their items (one IN query), then the distinct products (one IN
+# query). Categories come from the in-memory category map.
+ORDER_READ_BUDGET = 3
+
+# Tables whose full scan is a regression. categories stays tiny by design.
+LARGE_TABLES = {"products", "orders", "order_items", "inventory_logs", "stock_reservations", "stock_shards",
+                "product_sales_velocity", "warehouse_stock", "revenue_buckets", "archived_orders",
+                "archived_product_sales"}
+
+_PLAN_TABLE = re.compile(r"^(SCAN|SEARCH) (\w+)")
+_ALIAS_SUFFIX = re.compile(r"_\d+$")  # SQLAlchemy aliases joined tables as <table>_<n>
+
+
+def seed(db: Session) -> None:
+    """Bulk-loads enough rows that a full scan is distinguishable from a seek."""
+    rng = random.Random(42)
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    db.execute(insert(Category), [
+        {"id": i, "name": f"Category {i}", "description": None}
+        for i in range(1, NUM_CATEGORIES + 1)
+    ])
+    db.execute(insert(Product), [
+        {
+            "id": i,
+            "name": f"Product {i:05d}",
+            "description": None,
+            "price": round(rng.uniform(1, 500), 2),
+            "quantity": rng.randint(0, 200),
+            "category_id": rng.randint(1, NUM_CATEGORIES),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(1, NUM_PRODUCTS + 1)
+    ])
+
+    statuses = [OrderStatusEnum.COMPLETED, OrderStatusEnum.PENDING, OrderStatusEnum.CANCELLED]
+    orders, items = [], []
+    for order_id in range(1, NUM_ORDERS + 1):
+        order_date = now - datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 365 * 2))
+        orders.append({
+            "id": order_id,
+            "order_date": order_date,
+            "total_amount": 0.0,
+            "status": rng.choices(statuses, weights=[80, 15, 5])[0],
+            "created_at": order_date,
+            "updated_at": order_date,
+        })
+        for _ in range(ITEMS_PER_ORDER):
+            items.append({
+                "order_id": order_id,
+                "product_id": rng.randint(1, NUM_PRODUCTS),
+                "quantity": rng.randint(1, 3),
+                "price_per_unit": 10.0,
+            })
+    db.execute(insert(Order), orders)
+    db.execute(insert(OrderItem), items)
+
+    db.execute(insert(InventoryLog), [
+        {
+            "product_id": product_id,
+            "change_amount": -1,
+            "new_quantity": 0,
+            "reason": InventoryLogReasonEnum.SALE,
+            "timestamp": now - datetime.timedelta(hours=n),
+        }
+        for product_id in range(1, NUM_PRODUCTS + 1)
+        for n in range(LOGS_PER_PRODUCT)
+    ])
+    db.commit()
+    crud_sales_velocity.rebuild_sales_velocity(db)
+
+
+@contextmanager
+def capture_statements(engine):
+    """Collects (statement, parameters) for every cursor execution on the engine."""
+    captured: List[Tuple[str, tuple]] = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def plan_problems(engine, statement: str, parameters) -> List[str]:
+    """Runs EXPLAIN QUERY PLAN and returns the offending plan lines, if any."""
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+
+    problems = []
+    for row in rows:
+        detail = row[-1]
+        match = _PLAN_TABLE.match(detail)
+        if not match:
+            continue
+        table = _ALIAS_SUFFIX.sub("", match.group(2))
+        full_scan = match.group(1) == "SCAN" and " USING " not in detail
+        if table in LARGE_TABLES and (full_scan or "AUTOMATIC" in detail):
+            problems.append(detail)
+    return problems
+
+
+def _cases(archived_order_id: int) -> List[Tuple[str, Callable[[Session], object], int]]:
+    """(name, crud call, statement budget) for every read path under check."""
+    today = datetime.date.today()
+    month_ago = today - datetime.timedelta(days=30)
+    archived_start = today - datetime.timedelta(days=2 * 365)
+    archived_end = today - datetime.timedelta(days=ARCHIVE_AFTER_DAYS + 30)
+
+    cases = [
+        ("get_product", lambda db: crud_product.get_product(db, product_id=123), 1),
+        ("get_products", lambda db: crud_product.get_products(db), 1),
+        ("get_products(category_id)", lambda db: crud_product.get_products(db, category_id=3), 1),
+        ("get_products(low_stock=True)", lambda db: crud_product.get_products(db, low_stock=True), 1),
+        ("get_products(low_stock=False)", lambda db: crud_product.get_products(db, low_stock=False), 1),
+        ("get_products(category_id, low_stock)",
+         lambda db: crud_product.get_products(db, category_id=3, low_stock=True), 1),
+        ("get_product_rows", lambda db: crud_product.get_product_rows(db), 1),
+        ("get_product_rows(category_id, low_stock)",
+         lambda db: crud_product.get_product_rows(db, category_id=3, low_stock=True), 1),
+        ("get_order", lambda db: crud_order.get_order(db, order_id=4321), ORDER_READ_BUDGET),
+        ("get_inventory_logs_for_product",
+         lambda db: crud_inventory.get_inventory_logs_for_product(db, product_id=77), 1),
+        ("get_stock_availability",
+         lambda db: crud_reservation.get_stock_availability(db, product_ids=[5, 77, 123]), 2),
+        ("get_shard_totals", lambda db: crud_stock_shards.get_shard_totals(db, product_ids=[5, 77, 123]), 1),
+        ("get_warehouse_totals",
+         lambda db: crud_warehouse_stock.get_warehouse_totals(db, product_ids=[5, 77, 123]), 1),
+        ("get_warehouse_stock", lambda db: crud_warehouse.get_warehouse_stock(db, warehouse_id=2), 1),
+        ("get_forecast", lambda db: crud_sales_velocity.get_forecast(db), 1),
+        ("get_forecast(category_id, min_velocity)",
+         lambda db: crud_sales_velocity.get_forecast(db, sort="velocity", category_id=3, min_velocity=1.0), 1),
+        # Streamed reads: one cursor, plus the item/product loads once per batch.
+        ("iter_products(category_id)",
+         lambda db: list(crud_product.iter_products(db, limit=200, batch_size=50, category_id=3)), 1),
+        ("iter_inventory_logs_for_product",
+         lambda db: list(crud_inventory.iter_inventory_logs_for_product(db, product_id=77, batch_size=10)), 1),
+        ("iter_orders(status), 2 batches",
+         lambda db: list(crud_order.iter_orders(db, limit=100, batch_size=50, status=OrderStatusEnum.COMPLETED)),
+         1 + 2 * (ORDER_READ_BUDGET - 1)),
+    ]
+
+    order_filters: Dict[str, dict] = {
+        "status": {"status": OrderStatusEnum.COMPLETED},
+        "start_date": {"start_date": month_ago},
+        "end_date": {"end_date": month_ago},
+        "product_id": {"product_id": 42},
+        "category_id": {"category_id": 3},
+    }
+    names = list(order_filters)
+    for mask in range(1 << len(names)):
+        chosen = [names[i] for i in range(len(names)) if mask & (1 << i)]
+        kwargs = {}
+        for name in chosen:
+            kwargs.update(order_filters[name])
+        label = f"get_orders({', '.join(chosen)})"
+        cases.append((label, lambda db, kwargs=kwargs: crud_order.get_orders(db, **kwargs), ORDER_READ_BUDGET))
+        cases.append((
+            label.replace("get_orders", "get_order_rows"),
+            lambda db, kwargs=kwargs: crud_order.get_order_rows(db, **kwargs),
+            ORDER_READ_BUDGET,
+        ))
+
+    # Archived orders: the index lookup, then the products of the archived
+    # orders (one IN query), plus the live page when the range holds any.
+    cases += [
+        ("get_order(archived)", lambda db: crud_order.get_order(db, order_id=archived_order_id), 3),
+        ("get_orders(archived range)",
+         lambda db: crud_order.get_orders(db, start_date=archived_start, end_date=archived_end),
+         ORDER_READ_BUDGET + 2),
+        ("get_order_rows(archived range)",
+         lambda db: crud_order.get_order_rows(db, start_date=archived_start, end_date=archived_end),
+         ORDER_READ_BUDGET + 1),
+        ("get_product_sales(week, archived range)",
+         lambda db: crud_sales_series.get_product_sales(
+             db, product_id=42, bucket="week",
+             start=datetime.datetime.combine(archived_start, datetime.time(), tzinfo=datetime.timezone.utc)),
+         2),
+    ]
+
+    # Closed buckets (cached afterwards) and today's, one grouped query each.
+    for bucket in ("hour", "day", "week"):
+        cases.append((
+            f"get_product_sales({bucket})",
+            lambda db, bucket=bucket: crud_sales_series.get_product_sales(db, product_id=42, bucket=bucket),
+            2,
+        ))
+
+    # The first call also sums and stores the closed buckets (one grouped
+    # query, one insert); afterwards one statement reads stored and live parts.
+    for period in ("daily", "weekly", "monthly", "annual"):
+        for state, budget in (("cold", 3), ("warm", 1)):
+            cases.append((
+                f"get_revenue_summary({period}), {state}",
+                lambda db, period=period: crud_revenue.get_revenue_summary(db, period=period, start_date=month_ago),
+                budget,
+            ))
+    # Unbounded: plus the earliest order date, once per process.
+    for state, budget in (("cold", 4), ("warm", 1)):
+        cases.append((
+            f"get_revenue_summary(annual, all time), {state}",
+            lambda db: crud_revenue.get_revenue_summary(db, period="annual"),
+            budget,
+        ))
+    return cases
+
+
+def run() -> int:
+    tmp_dir = tempfile.mkdtemp(prefix="query_plans_")
+    engine = create_engine(f"sqlite+pysqlite:///{os.path.join(tmp_dir, 'plans.db')}")
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    print("Seeding database...")
+    settings.ORDER_ARCHIVE_DIR = os.path.join(tmp_dir, "archive")
+    with SessionLocal() as db:
+        seed(db)
+        crud_archive.archive_orders(
+            db, datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=ARCHIVE_AFTER_DAYS))
+        archived_order_id = db.execute(select(func.min(ArchivedOrder.id))).scalar()
+        # Budgets describe steady state, where the process-wide category map
+        # and the newest archived order date are warm.
+        crud_category.get_category_map(db)
+        crud_archive.get_newest_archived_date(db)
+
+    failures = 0
+    for name, call, budget in _cases(archived_order_id):
+        with SessionLocal() as db:
+            with capture_statements(engine) as captured:
+                call(db)
+
+        errors = []
+        if len(captured) > budget:
+            errors.append(f"{len(captured)} statements emitted, budget is {budget}")
+        for statement, parameters in captured:
+            for detail in plan_problems(engine, statement, parameters):
+                errors.append(f"{detail}\n      in: {' '.join(statement.split())[:200]}")
+
+        if errors:
+            failures += 1
+            print(f"FAIL {name}")
+            for error in errors:
+                print(f"    - {error}")
+        else:
+            print(f"ok   {name} ({len(captured)} statement(s))")
+
+    engine.dispose()
+    print(f"\n{failures} failing crud call(s)." if failures else "\nAll query plans OK.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
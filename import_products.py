@@ -0,0 +1,48 @@
+"""
+Bulk catalog import from the command line.
+
+Upserts products by SKU from a CSV (header row) or NDJSON file, the same way
+as ``POST /products/import``:
+
+    python import_products.py catalog.csv
+    python import_products.py catalog.ndjson
+    python import_products.py export.txt --format csv --chunk-size 5000
+"""
+import argparse
+import sys
+import time
+
+from app.core.bulk_io import iter_records
+from app.core.config import settings
+from app.crud import crud_product
+from app.db.session import SessionLocal
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk import / upsert products by SKU.")
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension")
+    parser.add_argument("--chunk-size", type=int, default=settings.PRODUCT_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        with open(args.path, newline="", encoding="utf-8-sig") as source:
+            summary = crud_product.import_products(
+                db=db, records=iter_records(source, fmt), chunk_size=args.chunk_size)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"Inserted: {summary.inserted}  Updated: {summary.updated}  "
+          f"Unchanged: {summary.unchanged}  Rejected: {summary.rejected}  ({elapsed:.1f}s)")
+    for error in summary.errors:
+        print(f"  line {error.line} (sku={error.sku}): {error.error}")
+    return 1 if summary.rejected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
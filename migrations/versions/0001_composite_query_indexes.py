@@ -0,0 +1,34 @@
+"""composite indexes for the crud access paths
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+Databases created before migrations were introduced were built with
+``Base.metadata.create_all`` and only carry single-column indexes. This
+revision adds the composite indexes the crud queries actually use:
+
+* ``get_orders`` / ``get_revenue_summary``: filter on ``status``, sort/range on ``order_date``
+* ``get_inventory_logs_for_product``: filter on ``product_id``, sort on ``timestamp``
+* ``get_products``: filter on ``category_id``, sort on ``name``
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_orders_status_order_date", "orders", ["status", "order_date"])
+    op.create_index("ix_inventory_logs_product_id_timestamp", "inventory_logs", ["product_id", "timestamp"])
+    op.create_index("ix_products_category_id_name", "products", ["category_id", "name"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_products_category_id_name", table_name="products")
+    op.drop_index("ix_inventory_logs_product_id_timestamp", table_name="inventory_logs")
+    op.drop_index("ix_orders_status_order_date", table_name="orders")
@@ -0,0 +1,34 @@
+"""change_versions table for cross-process cache invalidation
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 11:00:00
+
+One row per invalidation topic; crud writes bump the version in their own
+transaction and every worker polls the table (see app/db/invalidation.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TOPICS = ("products", "categories", "orders")
+
+
+def upgrade() -> None:
+    change_versions = op.create_table(
+        "change_versions",
+        sa.Column("topic", sa.String(length=50), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("topic", name=op.f("pk_change_versions")),
+    )
+    op.bulk_insert(change_versions, [{"topic": topic, "version": 0} for topic in TOPICS])
+
+
+def downgrade() -> None:
+    op.drop_table("change_versions")
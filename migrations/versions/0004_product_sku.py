@@ -0,0 +1,29 @@
+"""products.sku natural key for bulk catalog imports
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:00:00
+
+Nullable so existing products stay valid; unique so imports can upsert by it.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.add_column(sa.Column("sku", sa.String(length=64), nullable=True))
+        batch_op.create_index("ix_products_sku", ["sku"], unique=True)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("products") as batch_op:
+        batch_op.drop_index("ix_products_sku")
+        batch_op.drop_column("sku")
@@ -0,0 +1,51 @@
+"""row_counters table for cheap list totals
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 13:00:00
+
+Counts per order status, per product category and per product's inventory
+logs, maintained by the crud write paths (see app/crud/crud_counters.py).
+Seeded from the existing rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    row_counters = op.create_table(
+        "row_counters",
+        sa.Column("scope", sa.String(length=50), nullable=False),
+        sa.Column("key", sa.String(length=50), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("scope", "key", name=op.f("pk_row_counters")),
+    )
+    # Built with Core so "key" is quoted and the casts render per dialect.
+    orders = sa.table("orders", sa.column("status", sa.String()))
+    products = sa.table("products", sa.column("category_id", sa.Integer()))
+    inventory_logs = sa.table("inventory_logs", sa.column("product_id", sa.Integer()))
+    # Order statuses are stored by enum name (a native enum on PostgreSQL);
+    # counter keys use the enum value.
+    seeds = [
+        ("orders.status", sa.func.lower(sa.cast(orders.c.status, sa.String(50))), orders.c.status),
+        ("products.category", sa.cast(products.c.category_id, sa.String(50)), products.c.category_id),
+        ("inventory_logs.product", sa.cast(inventory_logs.c.product_id, sa.String(50)), inventory_logs.c.product_id),
+    ]
+    for scope, key, group_by in seeds:
+        op.execute(
+            row_counters.insert().from_select(
+                ["scope", "key", "count"],
+                sa.select(sa.literal(scope, sa.String(50)), key, sa.func.count()).group_by(group_by),
+            )
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("row_counters")
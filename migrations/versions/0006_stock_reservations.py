@@ -0,0 +1,47 @@
+"""stock_reservations table for pending orders
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 14:00:00
+
+Pending orders reserve stock here instead of decrementing products.quantity;
+available stock is on-hand minus unexpired reservations
+(see app/crud/crud_reservation.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_reservations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("order_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint(["order_id"], ["orders.id"], name=op.f("fk_stock_reservations_order_id_orders")),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], name=op.f("fk_stock_reservations_product_id_products")),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_stock_reservations")),
+    )
+    op.create_index(op.f("ix_stock_reservations_id"), "stock_reservations", ["id"], unique=False)
+    op.create_index(op.f("ix_stock_reservations_order_id"), "stock_reservations", ["order_id"], unique=False)
+    op.create_index(op.f("ix_stock_reservations_expires_at"), "stock_reservations", ["expires_at"], unique=False)
+    op.create_index(
+        "ix_stock_reservations_product_id_expires_at", "stock_reservations", ["product_id", "expires_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_stock_reservations_product_id_expires_at", table_name="stock_reservations")
+    op.drop_index(op.f("ix_stock_reservations_expires_at"), table_name="stock_reservations")
+    op.drop_index(op.f("ix_stock_reservations_order_id"), table_name="stock_reservations")
+    op.drop_index(op.f("ix_stock_reservations_id"), table_name="stock_reservations")
+    op.drop_table("stock_reservations")
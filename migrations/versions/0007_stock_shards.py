@@ -0,0 +1,37 @@
+"""stock_shards table for sharded stock counters
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 15:00:00
+
+A product with rows here keeps its stock split across them, and
+products.quantity becomes a cached sum refreshed by the rebalancer
+(see app/crud/crud_stock_shards.py). Also seeds the "stock_shards"
+invalidation topic.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stock_shards",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("shard", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], name=op.f("fk_stock_shards_product_id_products")),
+        sa.PrimaryKeyConstraint("product_id", "shard", name=op.f("pk_stock_shards")),
+    )
+    op.execute("INSERT INTO change_versions (topic, version) VALUES ('stock_shards', 0)")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM change_versions WHERE topic = 'stock_shards'")
+    op.drop_table("stock_shards")
@@ -0,0 +1,41 @@
+"""product_sales_velocity table for demand forecasting
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 16:00:00
+
+Exponentially weighted 7- and 30-day sales rates per product, maintained by
+the SALE write paths (see app/crud/crud_sales_velocity.py). Created empty:
+run ``python rebuild_sales_velocity.py`` afterwards to fold in existing SALE
+history.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_sales_velocity",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("score_7d", sa.Float(), nullable=False),
+        sa.Column("score_30d", sa.Float(), nullable=False),
+        sa.Column("last_sale_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["product_id"], ["products.id"], name=op.f("fk_product_sales_velocity_product_id_products")),
+        sa.PrimaryKeyConstraint("product_id", name=op.f("pk_product_sales_velocity")),
+    )
+    op.create_index(op.f("ix_product_sales_velocity_score_7d"), "product_sales_velocity", ["score_7d"], unique=False)
+    op.create_index(op.f("ix_product_sales_velocity_score_30d"), "product_sales_velocity", ["score_30d"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_product_sales_velocity_score_30d"), table_name="product_sales_velocity")
+    op.drop_index(op.f("ix_product_sales_velocity_score_7d"), table_name="product_sales_velocity")
+    op.drop_table("product_sales_velocity")
@@ -0,0 +1,29 @@
+"""order_items (product_id, order_id) index for per-product sales
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 17:00:00
+
+Serves GET /products/{id}/sales and the product / category filters of
+GET /orders/ from the index instead of scanning order_items. Also seeds the
+"sales" invalidation topic, which clears cached closed sales buckets.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_order_items_product_id_order_id", "order_items", ["product_id", "order_id"], unique=False)
+    op.execute("INSERT INTO change_versions (topic, version) VALUES ('sales', 0)")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM change_versions WHERE topic = 'sales'")
+    op.drop_index("ix_order_items_product_id_order_id", table_name="order_items")
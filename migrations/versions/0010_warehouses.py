@@ -0,0 +1,63 @@
+"""warehouses and per-warehouse stock
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 18:00:00
+
+A product with warehouse_stock rows keeps its stock per warehouse, and
+products.quantity becomes a cached sum refreshed in the background (see
+app/crud/crud_warehouse_stock.py). inventory_logs.warehouse_id records which
+warehouse a change of such a product touched. Also seeds the
+"warehouse_stock" invalidation topic.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "warehouses",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("location", sa.String(length=255), nullable=True),
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_warehouses")),
+        sa.UniqueConstraint("name", name=op.f("uq_warehouses_name")),
+    )
+    op.create_index(op.f("ix_warehouses_id"), "warehouses", ["id"], unique=False)
+    op.create_table(
+        "warehouse_stock",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("warehouse_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["product_id"], ["products.id"], name=op.f("fk_warehouse_stock_product_id_products")),
+        sa.ForeignKeyConstraint(
+            ["warehouse_id"], ["warehouses.id"], name=op.f("fk_warehouse_stock_warehouse_id_warehouses")),
+        sa.PrimaryKeyConstraint("product_id", "warehouse_id", name=op.f("pk_warehouse_stock")),
+    )
+    op.create_index(op.f("ix_warehouse_stock_warehouse_id"), "warehouse_stock", ["warehouse_id"], unique=False)
+    with op.batch_alter_table("inventory_logs") as batch_op:
+        batch_op.add_column(sa.Column("warehouse_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            op.f("fk_inventory_logs_warehouse_id_warehouses"), "warehouses", ["warehouse_id"], ["id"])
+        batch_op.create_index(op.f("ix_inventory_logs_warehouse_id"), ["warehouse_id"], unique=False)
+    op.execute("INSERT INTO change_versions (topic, version) VALUES ('warehouse_stock', 0)")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM change_versions WHERE topic = 'warehouse_stock'")
+    with op.batch_alter_table("inventory_logs") as batch_op:
+        batch_op.drop_index(op.f("ix_inventory_logs_warehouse_id"))
+        batch_op.drop_constraint(op.f("fk_inventory_logs_warehouse_id_warehouses"), type_="foreignkey")
+        batch_op.drop_column("warehouse_id")
+    op.drop_index(op.f("ix_warehouse_stock_warehouse_id"), table_name="warehouse_stock")
+    op.drop_table("warehouse_stock")
+    op.drop_index(op.f("ix_warehouses_id"), table_name="warehouses")
+    op.drop_table("warehouses")
@@ -0,0 +1,38 @@
+"""revenue_buckets table for stored closed-period revenue
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 19:00:00
+
+Revenue of COMPLETED orders per closed daily / weekly / monthly / annual
+bucket, filled on demand by the revenue summary and marked stale by order
+status changes (see app/crud/crud_revenue.py). Created empty.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "revenue_buckets",
+        sa.Column("period", sa.String(length=10), nullable=False),
+        sa.Column("bucket", sa.String(length=10), nullable=False),
+        sa.Column("starts_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("ends_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("order_count", sa.Integer(), nullable=False),
+        sa.Column("total_revenue", sa.Float(), nullable=False),
+        sa.Column("is_stale", sa.Boolean(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("period", "bucket", name=op.f("pk_revenue_buckets")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("revenue_buckets")
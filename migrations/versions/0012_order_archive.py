@@ -0,0 +1,63 @@
+"""order archive index and archived sales rollup
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 21:00:00
+
+archived_orders maps every order moved into the archive files to its file,
+with the date, status and total the revenue summary and the order lists
+filter on; archived_product_sales keeps the hourly sales of archived items
+for the sales series (see app/crud/crud_archive.py). inventory_logs.order_id
+loses its foreign key, since logs outlive the archived orders they name.
+Also seeds the "order_archive" invalidation topic.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The type orders.status already created on PostgreSQL.
+order_status = sa.Enum("PENDING", "COMPLETED", "CANCELLED", name="orderstatusenum").with_variant(
+    postgresql.ENUM("PENDING", "COMPLETED", "CANCELLED", name="orderstatusenum", create_type=False), "postgresql")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "archived_orders",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("order_date", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("status", order_status, nullable=False),
+        sa.Column("archive_file", sa.String(length=255), nullable=False),
+        sa.PrimaryKeyConstraint("id", name=op.f("pk_archived_orders")),
+    )
+    op.create_index(op.f("ix_archived_orders_order_date"), "archived_orders", ["order_date"], unique=False)
+    op.create_index(
+        "ix_archived_orders_status_order_date", "archived_orders", ["status", "order_date"], unique=False)
+    op.create_table(
+        "archived_product_sales",
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("hour", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("units", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("product_id", "hour", name=op.f("pk_archived_product_sales")),
+    )
+    with op.batch_alter_table("inventory_logs") as batch_op:
+        batch_op.drop_constraint(op.f("fk_inventory_logs_order_id_orders"), type_="foreignkey")
+    op.execute("INSERT INTO change_versions (topic, version) VALUES ('order_archive', 0)")
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM change_versions WHERE topic = 'order_archive'")
+    with op.batch_alter_table("inventory_logs") as batch_op:
+        batch_op.create_foreign_key(op.f("fk_inventory_logs_order_id_orders"), "orders", ["order_id"], ["id"])
+    op.drop_table("archived_product_sales")
+    op.drop_index("ix_archived_orders_status_order_date", table_name="archived_orders")
+    op.drop_index(op.f("ix_archived_orders_order_date"), table_name="archived_orders")
+    op.drop_table("archived_orders")
@@ -0,0 +1,60 @@
+"""row_counters.slot so concurrent writers spread over several rows per counter
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-19 22:00:00
+
+A counter becomes the sum of its rows, one per slot (see
+app/crud/crud_counters.py). Existing counts become slot 0.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("row_counters", recreate="always") as batch_op:
+        batch_op.add_column(sa.Column("slot", sa.Integer(), nullable=False, server_default="0"))
+        batch_op.drop_constraint("pk_row_counters", type_="primary")
+        batch_op.create_primary_key("pk_row_counters", ["scope", "key", "slot"])
+    with op.batch_alter_table("row_counters") as batch_op:
+        batch_op.alter_column("slot", server_default=None)
+
+
+def downgrade() -> None:
+    # Fold the slots back into one row per counter. Built with Core so "key"
+    # (reserved in MySQL) is quoted.
+    slotted = sa.table(
+        "row_counters", sa.column("scope", sa.String()), sa.column("key", sa.String()), sa.column("count", sa.Integer()))
+    folded = op.create_table(
+        "row_counters_folded",
+        sa.Column("scope", sa.String(length=50), nullable=False),
+        sa.Column("key", sa.String(length=50), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+    )
+    op.execute(
+        folded.insert().from_select(
+            ["scope", "key", "count"],
+            sa.select(slotted.c.scope, slotted.c.key, sa.func.sum(slotted.c.count))
+            .group_by(slotted.c.scope, slotted.c.key),
+        )
+    )
+    op.drop_table("row_counters")
+    row_counters = op.create_table(
+        "row_counters",
+        sa.Column("scope", sa.String(length=50), nullable=False),
+        sa.Column("key", sa.String(length=50), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("scope", "key", name=op.f("pk_row_counters")),
+    )
+    op.execute(
+        row_counters.insert().from_select(
+            ["scope", "key", "count"], sa.select(folded.c.scope, folded.c.key, folded.c.count))
+    )
+    op.drop_table("row_counters_folded")
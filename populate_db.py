@@ -11,6 +11,12 @@ from app.models.product import Product
 from app.models.order import Order, OrderStatusEnum
 from app.models.order_item import OrderItem
 from app.models.inventory_log import InventoryLog, InventoryLogReasonEnum
+from app.models.sales_velocity import ProductSalesVelocity
+from app.models.warehouse import Warehouse, WarehouseStock
+from app.models.revenue_bucket import RevenueBucket
+from app.models.stock_reservation import StockReservation
+from app.models.stock_shard import StockShard
+from app.models.archived_order import ArchivedOrder, ArchivedProductSales
 
 # Import Schemas
 from app.schemas.category import CategoryCreate
@@ -19,7 +25,7 @@ from app.schemas.order import OrderCreate
 from app.schemas.order_item import OrderItemCreate
 from app.schemas.inventory_log import RestockCreate
 
-from app.crud import crud_category, crud_product, crud_order, crud_inventory
+from app.crud import crud_category, crud_product, crud_order, crud_inventory, crud_counters
 
 print("--- Starting Database Population Script ---")
 
@@ -62,11 +68,20 @@ def populate(db: Session):
     """Populates the database with sample data."""
     print("WARNING: Clearing existing data...")
     db.query(InventoryLog).delete()
+    db.query(StockReservation).delete()
+    db.query(StockShard).delete()
+    db.query(ProductSalesVelocity).delete()
+    db.query(WarehouseStock).delete()
+    db.query(Warehouse).delete()
+    db.query(RevenueBucket).delete()
+    db.query(ArchivedOrder).delete()
+    db.query(ArchivedProductSales).delete()
     db.query(OrderItem).delete()
     db.query(Order).delete()
     db.query(Product).delete()
     db.query(Category).delete()
     db.commit()
+    crud_counters.rebuild_counters(db)
     print("Existing data cleared.")
 
     print("Creating categories...")
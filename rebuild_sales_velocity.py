@@ -0,0 +1,29 @@
+"""
+Recomputes the per-product sales velocity from the SALE inventory logs.
+
+The SALE write paths keep ``product_sales_velocity`` up to date; run this
+after migrating an existing database, or after editing inventory logs
+outside the API:
+
+    python rebuild_sales_velocity.py
+"""
+import sys
+import time
+
+from app.crud import crud_sales_velocity
+from app.db.session import SessionLocal
+
+
+def main() -> int:
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        products = crud_sales_velocity.rebuild_sales_velocity(db)
+    finally:
+        db.close()
+    print(f"Rebuilt sales velocity for {products} products ({time.perf_counter() - started:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())